@@ -1,58 +1,139 @@
-from flask import Flask, jsonify, render_template, request
-import psutil
-import os
-import signal
+from flask import Flask, Response, g, jsonify, render_template, request
+import hmac
+import threading
 import time
-import subprocess
+from logsetup import get_logger, kv, setup_logging
+import metrics
+from events import EVENT_PAGE_SIZE, EventStore
+from recording import RECORDING_DIR, RecordingReader, RecordingWriter
+from shared import SHARED_NAME, SharedSampler
+import fleet
+from payloads import PayloadCache
+import reclaim
+import perf
 from monitor import (
-    find_process, learn_baseline, get_process_data, 
-    get_timestamp, find_heaviest_child_process, is_protected_process
+    find_process, get_timestamp, take_snapshot, get_provider_name, get_memory_attribution,
+    find_heaviest_tab, close_tab, Sampler,
+    TARGET_GROUPS, PRIMARY_GROUP, ABSOLUTE_CPU_THRESHOLD, ABSOLUTE_MEM_THRESHOLD
 )
 
+setup_logging()
+log = get_logger("app")
+
 app = Flask(__name__, template_folder='templates', static_folder='static')
 
+# Fleet state lives in one process - unavailable when several workers serve this app
+FLEET_ENDPOINTS = {"fleet_ingest", "fleet_data", "fleet_tabs", "fleet_anomalies", "fleet_history"}
+# Requests to these don't count as someone watching (a scraper must not pin the sampler at 2s)
+PASSIVE_ENDPOINTS = {"static", "prometheus_metrics", "debug_perf"} | FLEET_ENDPOINTS
+STREAM_KEEPALIVE = 15.0  # Seconds between SSE comments that keep idle proxies from closing /stream
+FIRST_SAMPLE_TIMEOUT = 5.0  # Seconds a request waits for the sampler's first sample before answering 503
+
 # Global state
 chrome_process = None
-baseline_cpu = None
-baseline_mem = None
 initialized = False
+sampler = None  # Background collector - routes only read its latest sample
+events = None   # EventStore for anomaly/kill history (None if the database could not be opened)
+fleet_store = fleet.FleetStore()    # Samples uploaded by fleet agents (see fleet.py)
+fleet_uploads = threading.BoundedSemaphore(fleet.FLEET_MAX_CONCURRENT)
+init_lock = threading.Lock()  # Concurrent first requests must not each start a sampler
 
 def initialize():
-    """Initialize process monitoring"""
-    global chrome_process, baseline_cpu, baseline_mem, initialized
-    
+    """Initialize process monitoring (safe to call from several request threads at once)"""
     if initialized:
         return True
+    with init_lock:
+        if initialized:
+            return True
+        return _initialize()
+
+def _initialize():
+    global chrome_process, initialized, sampler, events
     
-    print("\n" + "="*60)
-    print("INITIALIZING OS MONITOR")
-    print("="*60)
+    if SHARED_NAME:
+        return attach_collector()
     
-    # Find Chrome
-    print("\n[1] Searching for Chrome process...")
+    log.info("initializing OS monitor", extra=kv(provider=get_provider_name()))
     chrome_process = find_process()
     
-    if not chrome_process:
-        print("[ERROR] Chrome not found. Please open Chrome and refresh the page.")
-        return False
-    
     try:
-        pid = chrome_process.pid
-        name = chrome_process.name()
-        print(f"[SUCCESS] Found Chrome: {name} (PID: {pid})\n")
+        if chrome_process:
+            log.info("found Chrome", extra=kv(name=chrome_process.name(), pid=chrome_process.pid))
+        else:
+            # The other target groups are still worth watching - /data reports Chrome as missing
+            log.warning("Chrome not found. Open Chrome and refresh the page.")
+        
+        open_event_store()
         
-        # Learn baseline
-        print("[2] Learning baseline metrics (3 samples)...")
-        baseline_cpu, baseline_mem = learn_baseline(chrome_process)
+        recorder = None
+        if RECORDING_DIR:
+            try:
+                recorder = RecordingWriter(RECORDING_DIR)
+            except OSError as e:
+                log.warning("cannot record to %s: %s", RECORDING_DIR, e)
         
-        print("[3] Initialization complete!")
-        print("="*60 + "\n")
+        # Start background sampling (the baseline is learned from its samples)
+        sampler = Sampler(events=events, recorder=recorder)
+        sampler.start()
+        log.info("background sampler started", extra=kv(interval=sampler.interval))
         
         initialized = True
         return True
     except Exception as e:
-        print(f"[ERROR] Initialization failed: {e}")
+        log.exception("initialization failed: %s", e)
+        return False
+
+def attach_collector():
+    """Worker mode: read the samples a separate collector process publishes (see shared.py)"""
+    global initialized, sampler
+    
+    try:
+        sampler = SharedSampler(SHARED_NAME)
+    except (OSError, ValueError) as e:
+        # Collector not up yet (or the segment is not ours) - the next request tries again
+        log.warning("shared segment unavailable: %s", e, extra=kv(segment=SHARED_NAME))
         return False
+    open_event_store()
+    log.info("attached to collector", extra=kv(segment=SHARED_NAME))
+    initialized = True
+    return True
+
+def open_event_store():
+    global events
+    
+    try:
+        events = EventStore()
+    except Exception as e:
+        # History is a nice-to-have - monitoring works without it
+        log.warning("event store unavailable, events will not be kept: %s", e)
+
+def record_event(kind, message, **fields):
+    """Queue an event for the store (no-op without one) - never blocks the request"""
+    if events is not None:
+        events.record(kind, message, **fields)
+
+# -------- ROUTE TIMING --------
+@app.before_request
+def start_route_timer():
+    g.perf_started = time.perf_counter()
+    if sampler is not None and request.endpoint not in PASSIVE_ENDPOINTS:
+        sampler.touch()
+
+@app.before_request
+def fleet_single_process():
+    """Each worker would keep its own FleetStore - hosts would flip between partial views"""
+    if SHARED_NAME and request.endpoint in FLEET_ENDPOINTS:
+        return jsonify({"error": "Fleet collector needs a single-process app (unset OSMONITOR_SHARED)"}), 503
+
+@app.after_request
+def stop_route_timer(response):
+    """Handler time per route (for /stream this is the setup, not the open connection)"""
+    started = g.pop("perf_started", None)
+    if started is not None:
+        perf.observe(f"route.{request.endpoint or 'unknown'}", time.perf_counter() - started)
+        if response.status_code >= 500:
+            perf.count(f"route.{request.endpoint or 'unknown'}.errors")
+    return response
 
 # -------- ROUTES --------
 @app.route('/')
@@ -69,11 +150,44 @@ def security():
         initialize()
     return render_template('security.html')
 
+def build_data(sample, group=None):
+    """Build the /data payload for a sample (one target group) -> (payload, http_status)"""
+    group = group or PRIMARY_GROUP
+    if group not in sample.groups:
+        return {
+            "timestamp": get_timestamp(sample.snapshot.timestamp),
+            "status": "ERROR",
+            "message": f"Unknown group '{group}'",
+            "groups": list(sample.groups)
+        }, 404
+    
+    snapshot = sample.snapshot.groups[group]
+    if not snapshot.processes:
+        return {
+            "timestamp": get_timestamp(snapshot.timestamp),
+            "status": "ERROR",
+            "message": "Chrome not found. Open Chrome and try again." if group == PRIMARY_GROUP else f"No {group} processes found",
+            "cpu": 0,
+            "memory": 0
+        }, 500
+    
+    data = dict(sample.groups[group])
+    data["timestamp"] = get_timestamp(snapshot.timestamp)
+    
+    # Add process info for modal
+    first = snapshot.processes[0]
+    data["pid"] = first.pid
+    data["process_name"] = first.name
+    return data, 200
+
+data_payloads = PayloadCache(build_data, app.json.dumps)    # /data and /stream bodies, serialized once per sample
+
 @app.route('/data')
 def get_data():
-    """Get current process data"""
-    global chrome_process, baseline_cpu, baseline_mem
-    
+    """Get current process data (latest sample from the background sampler)
+    Conditional: the ETag names the sample, so a poll with If-None-Match gets 304 until
+    the next tick. ?since_seq=N returns only what changed since sample N (tabs included).
+    """
     # Auto-initialize on first request
     if not initialized:
         if not initialize():
@@ -86,41 +200,27 @@ def get_data():
             }), 500
     
     try:
-        # Check if process still exists
-        if chrome_process is None or not chrome_process.is_running():
-            print("[WARN] Chrome process died, reinitializing...")
-            chrome_process = find_process()
-            if chrome_process:
-                baseline_cpu, baseline_mem = learn_baseline(chrome_process)
-            else:
-                return jsonify({
-                    "timestamp": get_timestamp(),
-                    "status": "ERROR",
-                    "message": "Chrome not found",
-                    "cpu": 0,
-                    "memory": 0
-                }), 500
-        
-        # Get current data
-        data = get_process_data(chrome_process, baseline_cpu, baseline_mem)
-        data["timestamp"] = get_timestamp()
-        
-        # Add process info for modal
-        if chrome_process:
-            try:
-                data["pid"] = chrome_process.pid
-                data["process_name"] = chrome_process.name()
-            except:
-                data["pid"] = "unknown"
-                data["process_name"] = "Chrome"
+        group = request.args.get("group") or PRIMARY_GROUP
+        sample = sampler.latest(timeout=FIRST_SAMPLE_TIMEOUT)
+        if sample is None:
+            return jsonify({"error": "No sample collected yet"}), 503
+        payload = data_payloads.get(sample, group)
+        if payload.status != 200:
+            return Response(payload.body, status=payload.status, mimetype="application/json")
+        if request.if_none_match.contains(payload.etag):
+            perf.count("data.not_modified")
+            response = Response(status=304)
         else:
-            data["pid"] = "unknown"
-            data["process_name"] = "Chrome"
-        
-        return jsonify(data)
+            since_seq = request.args.get("since_seq", type=int)
+            body = payload.body if since_seq is None else data_payloads.delta(payload, since_seq, group)
+            response = Response(body, mimetype="application/json")
+        response.set_etag(payload.etag)
+        # Browsers revalidate every poll instead of reusing a stale copy
+        response.headers["Cache-Control"] = "no-cache"
+        return response
     
     except Exception as e:
-        print(f"[ERROR] /data endpoint: {e}")
+        log.exception("/data endpoint failed: %s", e)
         return jsonify({
             "timestamp": get_timestamp(),
             "status": "ERROR",
@@ -129,146 +229,372 @@ def get_data():
             "memory": 0
         }), 500
 
+@app.route('/groups')
+def groups_summary():
+    """Summary of every target group from the latest sample (one scan covers them all)"""
+    if not initialized:
+        initialize()
+    if sampler is None:
+        return jsonify({"error": "Monitor not initialized"}), 503
+    
+    sample = sampler.latest(timeout=FIRST_SAMPLE_TIMEOUT)
+    if sample is None:
+        return jsonify({"error": "No sample collected yet"}), 503
+    summary = []
+    for group in TARGET_GROUPS:
+        data = sample.groups.get(group.name)
+        if data is None:
+            continue
+        summary.append({
+            "group": group.name,
+            "primary": group.name == PRIMARY_GROUP,
+            "processes": len(sample.snapshot.groups[group.name].processes),
+            "cpu": data["cpu"],
+            "memory": data["memory"],
+            "threads": data["threads"],
+            "process_count": data["process_count"],
+            "status": data["status"],
+            "reason": data["reason"],
+            "thresholds": {
+                "cpu": group.cpu_threshold,
+                "memory": group.mem_threshold,
+                "tabs": group.tab_threshold
+            }
+        })
+    return jsonify({"timestamp": get_timestamp(sample.snapshot.timestamp), "groups": summary})
+
+@app.route('/stream')
+def stream():
+    """Server-Sent Events: push every new sample to the dashboard as soon as it exists"""
+    if not initialized:
+        if not initialize():
+            return jsonify({"status": "ERROR", "message": "Chrome not found. Open Chrome and try again."}), 500
+    
+    def stream_frames():
+        seq = 0
+        # An open stream keeps the sampler at its watched rate until the client goes away
+        sampler.add_viewer()
+        try:
+            while True:
+                sample = sampler.wait_for_sample(seq, timeout=STREAM_KEEPALIVE)
+                if sample is None or sample.seq <= seq:
+                    yield ": keepalive\n\n"
+                    continue
+                seq = sample.seq
+                yield data_payloads.frame(data_payloads.get(sample, PRIMARY_GROUP), PRIMARY_GROUP)
+        finally:
+            sampler.remove_viewer()
+    
+    return Response(stream_frames(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+@app.route("/tabs")
+def tabs():
+    """Per-tab rankings from the sampler's in-memory series (never scans)
+    Query: n (ranking size), group, pid (adds that tab's memory/CPU series)
+    """
+    if not initialized:
+        initialize()
+    if sampler is None:
+        return jsonify({"error": "Monitor not initialized"}), 503
+    
+    group = request.args.get("group")
+    if group is not None and group not in {target.name for target in TARGET_GROUPS}:
+        return jsonify({"error": f"Unknown group {group!r}"}), 404
+    n = request.args.get("n", type=int)
+    if n is not None and n <= 0:
+        return jsonify({"error": "n must be positive"}), 400
+    
+    result = sampler.tabs.top(n, group)
+    pid = request.args.get("pid", type=int)
+    if pid is not None:
+        result["series"] = sampler.tabs.series(pid)
+        if result["series"] is None:
+            return jsonify({"error": f"Tab {pid} is not tracked"}), 404
+    return jsonify(result)
+
 @app.route("/system")
 def system_info():
-    """Get system-wide info"""
+    """Get system-wide info (collected by the background sampler)"""
     try:
-        return jsonify({
-            "cpu_count": psutil.cpu_count(),
-            "cpu_percent": psutil.cpu_percent(interval=0.5),
-            "memory_percent": psutil.virtual_memory().percent,
-            "processes": len(psutil.pids())
-        })
+        if not initialized:
+            initialize()
+        if sampler is None:
+            return jsonify({"error": "Monitor not initialized"}), 503
+        sample = sampler.latest(timeout=FIRST_SAMPLE_TIMEOUT)
+        if sample is None:
+            return jsonify({"error": "No sample collected yet"}), 503
+        return jsonify(sample.system)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route("/debug")
 def debug():
     """Debug thresholds"""
+    sample = sampler.latest(timeout=0) if sampler else None
     return jsonify({
-        "baseline_cpu": baseline_cpu,
-        "baseline_mem": baseline_mem,
-        "absolute_cpu_threshold": 80.0,
-        "absolute_mem_threshold": 3500.0,
+        "baseline_cpu": sampler.baseline.cpu if sampler else None,
+        "baseline_mem": sampler.baseline.mem if sampler else None,
+        "baseline": sampler.baseline.to_dict() if sampler else None,
+        "absolute_cpu_threshold": ABSOLUTE_CPU_THRESHOLD,
+        "absolute_mem_threshold": ABSOLUTE_MEM_THRESHOLD,
         "initialized": initialized,
-        "chrome_found": chrome_process is not None
+        "chrome_found": bool(sample.snapshot.processes) if sample else chrome_process is not None,
+        "provider": get_provider_name(),
+        "memory_attribution": get_memory_attribution(),
+        "sample_interval": sampler.interval if sampler else None,
+        "adaptive_sampling": sampler.adaptive if sampler else None,
+        "viewers": sampler.viewers_active() if sampler else None,
+        "pressure": sample.data.get("pressure") if sample else None,
+        "sample_seq": sample.seq if sample else 0,
+        "sample_age": round(time.time() - sample.snapshot.timestamp, 3) if sample else None
     })
 
-@app.route("/kill_process", methods=["POST"])
-def kill_process():
-    """Kill the heaviest Chrome tab process - Windows compatible"""
-    global chrome_process
+@app.route("/metrics")
+def prometheus_metrics():
+    """Prometheus scrape target - rendered from the latest sample, never triggers a scan"""
+    if not initialized:
+        initialize()
+    sample = sampler.latest(timeout=FIRST_SAMPLE_TIMEOUT) if sampler else None
+    if sample is None:
+        return Response("# no sample collected yet\n", status=503, mimetype="text/plain")
+    return Response(metrics.render_cached(sample), content_type=metrics.CONTENT_TYPE)
+
+@app.route("/debug/perf")
+def debug_perf():
+    """Stage/route latency histograms and hot-path counters (?reset=1 clears them after reading)"""
+    report = perf.snapshot()
+    sample = sampler.latest(timeout=0) if sampler else None
+    report["sample_interval"] = sampler.interval if sampler else None
+    report["processes_in_last_sample"] = sum(
+        len(group.processes) for group in sample.snapshot.groups.values()) if sample else 0
+    if request.args.get("reset"):
+        perf.reset()
+    return jsonify(report)
+
+@app.route("/history")
+def history():
+    """Server-side metric history, downsampled to min/max/mean buckets
+    Query: since (unix seconds, negative = seconds ago), until, resolution (seconds),
+    source (memory | recording | auto: recordings when `since` is older than memory holds)
+    """
+    if not initialized:
+        initialize()
+    if sampler is None:
+        return jsonify({"error": "Monitor not initialized"}), 503
     
     try:
-        print("\n" + "="*60)
-        print("[USER CONFIRMED] Closing anomalous tab/process")
-        print("="*60)
+        since = request.args.get("since", type=float)
+        until = request.args.get("until", type=float)
+        resolution = request.args.get("resolution", type=float)
+        if since is not None and since < 0:
+            since = time.time() + since
+        if resolution is not None and resolution <= 0:
+            return jsonify({"error": "resolution must be positive"}), 400
         
-        if not chrome_process or not chrome_process.is_running():
-            chrome_process = find_process()
+        source = request.args.get("source", "auto")
+        if source not in ("memory", "recording", "auto"):
+            return jsonify({"error": "source must be memory, recording or auto"}), 400
+        if source == "auto":
+            oldest = sampler.history.oldest()
+            source = "recording" if RECORDING_DIR and since is not None and (
+                oldest is None or since < oldest) else "memory"
+        if source == "recording":
+            if not RECORDING_DIR:
+                return jsonify({"error": "Recording is off (set OSMONITOR_RECORDING_DIR)"}), 404
+            result = RecordingReader(RECORDING_DIR).downsample(since, resolution, until)
+        else:
+            result = sampler.history.downsample(since, resolution, until)
+        result["source"] = source
+        return jsonify(result)
+    except Exception as e:
+        log.exception("/history endpoint failed: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/kill_process", methods=["POST"])
+def kill_process():
+    """Kill the heaviest Chrome tab process (termination goes through the process provider)"""
+    try:
+        log.info("user confirmed closing the anomalous tab")
         
-        if not chrome_process:
-            print("[ERROR] Chrome process not found")
+        # Fresh snapshot - the tab we close must still exist right now
+        snapshot = take_snapshot()
+        if not snapshot.processes:
+            log.warning("kill requested but Chrome is not running")
             return jsonify({"success": False, "message": "Chrome not found"}), 404
         
-        # Find the heaviest Chrome process to close
-        target = find_heaviest_child_process(chrome_process)
+        # Find the heaviest Chrome tab to close
+        target = find_heaviest_tab(snapshot)
         
         if not target:
-            print("[ERROR] No suitable tab process found to close")
+            log.warning("no suitable tab process found to close")
             return jsonify({"success": False, "message": "No tab process found"}), 404
         
         # SAFETY CHECK: Don't kill protected processes (Flask app, localhost)
-        if is_protected_process(target):
-            print("[BLOCKED] Target is a protected process (Flask/localhost)")
-            print(f"[BLOCKED] Cannot close PID {target.pid} - dashboard protection active")
+        if target.protected:
+            log.warning("refusing to close a protected process (Flask/localhost)", extra=kv(pid=target.pid))
             return jsonify({"success": False, "message": "Cannot close localhost/Flask processes"}), 403
         
-        try:
-            target_name = target.name()
-            target_pid = target.pid
-            target_mem = target.memory_info().rss / (1024 * 1024)
-            
-            print(f"[CLOSING TAB] Target identified:")
-            print(f"  Name: {target_name}")
-            print(f"  PID: {target_pid}")
-            print(f"  Memory: {target_mem:.2f}MB")
-            
-            # METHOD 1: Use Windows taskkill command (most reliable on Windows)
-            print(f"[ACTION] Using taskkill to terminate PID {target_pid}...")
-            result = subprocess.run(
-                ["taskkill", "/PID", str(target_pid), "/F"],
-                capture_output=True,
-                text=True
-            )
-            
-            if result.returncode == 0:
-                print(f"[SUCCESS] Taskkill succeeded for PID {target_pid}")
-                print("="*60)
-                print("[RESULT] Tab successfully closed")
-                print("="*60 + "\n")
-                
-                return jsonify({
-                    "success": True,
-                    "message": f"Tab closed successfully",
-                    "closed_pid": target_pid,
-                    "closed_name": target_name,
-                    "closed_memory": round(target_mem, 2)
-                })
-            else:
-                print(f"[WARN] Taskkill failed: {result.stderr}")
-                print("[FALLBACK] Attempting psutil.kill()...")
-                
-                # Fallback to psutil
-                try:
-                    target.kill()
-                    time.sleep(0.3)
-                    print(f"[SUCCESS] psutil.kill() succeeded")
-                    print("="*60)
-                    print("[RESULT] Tab successfully closed")
-                    print("="*60 + "\n")
-                    
-                    return jsonify({
-                        "success": True,
-                        "message": f"Tab closed successfully",
-                        "closed_pid": target_pid,
-                        "closed_name": target_name,
-                        "closed_memory": round(target_mem, 2)
-                    })
-                except Exception as fallback_error:
-                    print(f"[ERROR] psutil.kill() also failed: {fallback_error}")
-                    raise fallback_error
+        log.info("closing tab", extra=kv(name=target.name, pid=target.pid, memory_mb=round(target.mem_mb, 2)))
         
-        except ProcessLookupError:
-            print("[SUCCESS] Process was already terminated")
-            print("="*60 + "\n")
-            return jsonify({"success": True, "message": "Tab was already closed"})
+        success, method = close_tab(target)
         
-        except Exception as e:
-            print(f"[ERROR] All termination methods failed: {e}")
-            print(f"[ERROR TYPE] {type(e).__name__}")
-            
-            # Last resort: try gentle terminate
-            try:
-                print("[FINAL FALLBACK] Attempting gentle terminate()...")
-                target.terminate()
-                target.wait(timeout=1)
-                print("[SUCCESS] Gentle terminate worked")
-                print("="*60 + "\n")
-                return jsonify({"success": True, "message": "Tab closed (gentle terminate)"})
-            except Exception as final_error:
-                print(f"[FAILED] Even gentle terminate failed: {final_error}")
-                print("="*60 + "\n")
-                return jsonify({
-                    "success": False,
-                    "message": f"Failed to close tab: {str(e)}"
-                }), 500
+        if not success:
+            log.error("all termination methods failed", extra=kv(pid=target.pid, method=method))
+            return jsonify({
+                "success": False,
+                "message": f"Failed to close tab: {method}"
+            }), 500
+        
+        log.info("tab closed", extra=kv(pid=target.pid, method=method))
+        record_event("kill", f"Closed tab PID {target.pid} ({method})", group=target.group, pid=target.pid,
+                     rule="kill_process", data={"memory": round(target.mem_mb, 2), "method": method})
+        
+        return jsonify({
+            "success": True,
+            "message": "Tab was already closed" if method == "already exited" else "Tab closed successfully",
+            "closed_pid": target.pid,
+            "closed_name": target.name,
+            "closed_memory": round(target.mem_mb, 2)
+        })
     
     except Exception as e:
-        print(f"[CRITICAL ERROR] Kill process endpoint: {e}")
-        print("="*60 + "\n")
+        log.exception("/kill_process endpoint failed: %s", e)
         return jsonify({"success": False, "message": str(e)}), 500
 
+@app.route("/reclaim", methods=["POST"])
+def reclaim_memory():
+    """Close the set of tabs that frees a target amount of memory
+    JSON body: free ("1.5GB", "800MB" or MB as a number; omit to get back under the memory
+    threshold), policy (heaviest | fewest | oldest), group, max_kills, dry_run
+    """
+    if not initialized:
+        initialize()
+    
+    body = request.get_json(silent=True) or {}
+    try:
+        free_mb = reclaim.parse_size_mb(body["free"]) if body.get("free") is not None else None
+        max_kills = int(body.get("max_kills", reclaim.RECLAIM_MAX_KILLS))
+    except (TypeError, ValueError) as e:
+        # e.g. "max_kills": null or "free": [1]
+        return jsonify({"success": False, "message": f"Bad request: {e}"}), 400
+    try:
+        report = reclaim.reclaim(
+            free_mb=free_mb,
+            policy=body.get("policy", "heaviest"),
+            group=body.get("group"),
+            max_kills=max_kills,
+            dry_run=bool(body.get("dry_run")),
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        log.exception("/reclaim endpoint failed: %s", e)
+        return jsonify({"success": False, "message": str(e)}), 500
+    
+    memory = {tab["pid"]: tab["memory"] for tab in report["selected"]}
+    for result in report.get("results", []):
+        if result["success"]:
+            record_event("kill", f"Reclaim closed tab PID {result['pid']} ({result['method']})",
+                         group=report["group"], pid=result["pid"], rule=f"reclaim:{report['policy']}",
+                         data={"memory": memory.get(result["pid"]), "method": result["method"]})
+    return jsonify(report), 200 if report["success"] else 500
+
+@app.route("/events")
+def list_events():
+    """Stored anomaly/kill events, newest first
+    Query: type, group, pid, since/until (unix seconds, negative = seconds ago),
+    limit, cursor (next_cursor from the previous page)
+    """
+    if not initialized:
+        initialize()
+    if events is None:
+        return jsonify({"error": "Event store unavailable"}), 503
+    
+    now = time.time()
+    since = request.args.get("since", type=float)
+    until = request.args.get("until", type=float)
+    if since is not None and since < 0:
+        since = now + since
+    if until is not None and until < 0:
+        until = now + until
+    try:
+        page, next_cursor = events.query(
+            since=since, until=until,
+            kind=request.args.get("type"),
+            group=request.args.get("group"),
+            pid=request.args.get("pid", type=int),
+            cursor=request.args.get("cursor", type=int),
+            limit=request.args.get("limit", type=int) or EVENT_PAGE_SIZE,
+        )
+    except Exception as e:
+        log.exception("/events endpoint failed: %s", e)
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"events": page, "next_cursor": next_cursor})
+
+# -------- FLEET (collector side) --------
+@app.route("/fleet/ingest", methods=["POST"])
+def fleet_ingest():
+    """Batch of delta-encoded samples from one agent (zlib body, Content-Encoding: deflate)"""
+    if fleet.FLEET_TOKEN and not hmac.compare_digest(request.headers.get("X-Fleet-Token", "").encode(),
+                                                     fleet.FLEET_TOKEN.encode()):
+        return jsonify({"error": "Bad fleet token"}), 403
+    if request.content_length is not None and request.content_length > fleet.FLEET_MAX_BODY:
+        return jsonify({"error": "Upload too large"}), 413
+    # Backpressure: a busy collector refuses instead of queueing; agents keep the samples
+    if not fleet_uploads.acquire(blocking=False):
+        perf.count("fleet.refused")
+        response = jsonify({"error": "Collector busy"})
+        response.headers["Retry-After"] = str(fleet.FLEET_RETRY_AFTER)
+        return response, 503
+    try:
+        payload = fleet.decode_body(request.get_data(), request.headers.get("Content-Encoding"))
+        accepted = fleet_store.ingest(payload)
+    except ValueError as e:
+        log.warning("fleet upload rejected: %s", e, extra=kv(remote=request.remote_addr))
+        return jsonify({"error": str(e)}), 400
+    finally:
+        fleet_uploads.release()
+    return jsonify({"accepted": accepted})
+
+@app.route("/fleet/data")
+def fleet_data():
+    """Latest state of every host that has uploaded (query: group)"""
+    return jsonify(fleet_store.summary(request.args.get("group")))
+
+@app.route("/fleet/tabs")
+def fleet_tabs():
+    """Heaviest tabs across hosts (query: n, host, group)"""
+    n = request.args.get("n", 10, type=int)
+    if n <= 0:
+        return jsonify({"error": "n must be positive"}), 400
+    return jsonify({"top_memory": fleet_store.top_tabs(n, request.args.get("host"), request.args.get("group"))})
+
+@app.route("/fleet/anomalies")
+def fleet_anomalies():
+    """Anomaly starts across hosts, newest first (query: since, negative = seconds ago; host; limit)"""
+    since = request.args.get("since", type=float)
+    if since is not None and since < 0:
+        since = time.time() + since
+    found = fleet_store.anomalies(since, request.args.get("host"), request.args.get("limit", type=int))
+    return jsonify({"anomalies": found})
+
+@app.route("/fleet/history")
+def fleet_history():
+    """One host's primary-group history, downsampled like /history (query: host, since, until, resolution)"""
+    host = fleet_store.host(request.args.get("host", ""))
+    if host is None:
+        return jsonify({"error": "Unknown host"}), 404
+    since = request.args.get("since", type=float)
+    if since is not None and since < 0:
+        since = time.time() + since
+    resolution = request.args.get("resolution", type=float)
+    if resolution is not None and resolution <= 0:
+        return jsonify({"error": "resolution must be positive"}), 400
+    return jsonify(host.history.downsample(since, resolution, request.args.get("until", type=float)))
+
 if __name__ == "__main__":
-    print("\nStarting OS Monitor Dashboard...\n")
+    log.info("starting OS Monitor dashboard on http://localhost:5000")
     app.run(debug=True, host='localhost', port=5000)
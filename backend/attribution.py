@@ -0,0 +1,68 @@
+import time
+from collections import deque
+from providers import GONE_ERRORS
+import perf
+
+MEMORY_MODES = ("rss", "uss", "pss")
+ATTRIBUTION_BUDGET = 0.05   # Seconds per tick spent reading full memory info (a few ms per process)
+
+
+class MemoryAttribution:
+    """USS/PSS per process, read incrementally under a per-tick time budget.
+    Processes are measured round-robin (new ones first), so every process is refreshed
+    once every few ticks; until a process has been measured its RSS stands in.
+    """
+
+    def __init__(self, mode="uss", budget=ATTRIBUTION_BUDGET):
+        if mode not in ("uss", "pss"):
+            raise ValueError(f"Unknown attribution mode {mode!r}, expected 'uss' or 'pss'")
+        self.mode = mode
+        self.budget = budget
+        self._values = {}       # (pid, create_time) -> attributed MB, None if unreadable
+        self._queue = deque()   # Round-robin order of keys to (re)measure
+        self._queued = set()
+
+    def refresh(self, provider, keys):
+        """Measure as many of `keys` (the live (pid, create_time) set) as the budget allows"""
+        for key in [key for key in self._values if key not in keys]:
+            del self._values[key]
+        for key in keys:
+            if key not in self._queued:
+                # Never measured - jump the queue so new tabs are attributed quickly
+                self._queue.appendleft(key)
+                self._queued.add(key)
+
+        if len(self._queue) > 2 * len(keys) + 64:
+            # Heavy churn left many exited keys behind - drop them in one go
+            self._queue = deque(key for key in self._queue if key in keys)
+            self._queued = set(self._queue)
+
+        deadline = time.perf_counter() + self.budget
+        measured = 0
+        for _ in range(len(self._queue)):
+            if time.perf_counter() >= deadline:
+                break
+            key = self._queue.popleft()
+            if key not in keys:
+                self._queued.discard(key)
+                continue
+            try:
+                uss, pss = provider.full_memory(*key)
+                self._values[key] = pss if self.mode == "pss" and pss is not None else uss
+            except GONE_ERRORS:
+                # Exited, or not ours to read (AccessDenied) - RSS it is
+                self._values[key] = None
+            measured += 1
+            self._queue.append(key)
+        perf.count("attribution.measured", measured)
+
+    def memory(self, key, rss_mb):
+        """Attributed MB for key, or rss_mb until it has been measured"""
+        value = self._values.get(key)
+        return rss_mb if value is None else value
+
+    def coverage(self, keys):
+        """Fraction of keys with a measured value"""
+        if not keys:
+            return 1.0
+        return sum(1 for key in keys if self._values.get(key) is not None) / len(keys)
@@ -0,0 +1,110 @@
+import math
+
+BASELINE_SAMPLES = 10       # Samples before the baseline is trusted (until then it is "warming up")
+BASELINE_EWMA_ALPHA = None  # Set (e.g. 0.05) to weight recent samples more; None = plain running mean
+MIN_BASELINE_CPU = 5.0      # Ensure minimums so tiny baselines don't make every blip look huge
+MIN_BASELINE_MEM = 300.0
+
+
+class RunningStats:
+    """Streaming mean/variance (Welford) - O(1) per sample, no sample storage"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+
+    @property
+    def variance(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+class EwmaStats:
+    """Exponentially weighted mean/variance - follows slow drift, forgets old sessions"""
+
+    def __init__(self, alpha):
+        self.alpha = alpha
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self.variance = 0.0
+
+    def update(self, x):
+        self.count += 1
+        if self.count == 1:
+            self.mean = x
+            return
+        delta = x - self.mean
+        increment = self.alpha * delta
+        self.mean += increment
+        self.variance = (1 - self.alpha) * (self.variance + delta * increment)
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+class Baseline:
+    """Incrementally learned CPU/memory baseline, usable from the very first sample"""
+
+    def __init__(self, warmup=BASELINE_SAMPLES, alpha=BASELINE_EWMA_ALPHA):
+        self.warmup = warmup
+        self.alpha = alpha
+        self.cpu_stats = EwmaStats(alpha) if alpha else RunningStats()
+        self.mem_stats = EwmaStats(alpha) if alpha else RunningStats()
+
+    def reset(self):
+        """Forget everything (e.g. Chrome restarted into a different session)"""
+        self.cpu_stats.reset()
+        self.mem_stats.reset()
+
+    def update(self, cpu, mem):
+        self.cpu_stats.update(cpu)
+        self.mem_stats.update(mem)
+
+    @property
+    def count(self):
+        return self.cpu_stats.count
+
+    @property
+    def warming_up(self):
+        return self.count < self.warmup
+
+    @property
+    def confidence(self):
+        """0.0 (no samples) .. 1.0 (warm-up complete)"""
+        return min(self.count / self.warmup, 1.0) if self.warmup else 1.0
+
+    @property
+    def cpu(self):
+        return max(self.cpu_stats.mean, MIN_BASELINE_CPU)
+
+    @property
+    def mem(self):
+        return max(self.mem_stats.mean, MIN_BASELINE_MEM)
+
+    def to_dict(self):
+        return {
+            "cpu": round(self.cpu, 2),
+            "mem": round(self.mem, 2),
+            "cpu_std": round(self.cpu_stats.std, 2),
+            "mem_std": round(self.mem_stats.std, 2),
+            "samples": self.count,
+            "confidence": round(self.confidence, 2),
+            "warming_up": self.warming_up
+        }
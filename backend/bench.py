@@ -0,0 +1,217 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+
+import monitor
+from events import EventStore
+from providers import SyntheticProvider
+
+SIZES = (100, 1000, 10000)   # Fake process table sizes for the tick benchmarks
+REPEAT = 20                  # Timed runs per stage (after one warm-up run)
+HTTP_CLIENTS = 16            # Concurrent /data pollers
+HTTP_REQUESTS = 200          # Requests per poller
+TOLERANCE = 0.20             # --compare fails when a metric is this much worse than baseline
+
+
+def make_provider(n, seed=0):
+    """Deterministic fake process table of about n processes, shaped like a busy browser"""
+    return SyntheticProvider(
+        renderers=max(int(n * 0.70), 1),
+        background=int(n * 0.25),
+        small_renderers=int(n * 0.05),
+        localhost_tabs=1,
+        seed=seed,
+    )
+
+
+def summarize(samples):
+    """Seconds -> milliseconds summary"""
+    ms = np.asarray(samples) * 1000.0
+    return {
+        "runs": len(ms),
+        "median_ms": round(float(np.median(ms)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "min_ms": round(float(ms.min()), 4),
+    }
+
+
+def timed(fn, repeat):
+    fn()  # Warm-up
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def bench_tick(n, repeat=REPEAT, seed=0):
+    """Time each stage of one monitoring tick, and the whole tick, over ~n fake processes"""
+    provider = make_provider(n, seed)
+    monitor.set_provider(provider)
+    sampler = monitor.Sampler()
+    state = {}
+    results = {}
+
+    def enumerate_stage():
+        state["enumerated"] = monitor._enumerate(provider)
+
+    def classify_cold():
+        monitor._classification_cache.clear()
+        state["classified"] = monitor._classify_all(provider, state["enumerated"])
+
+    def classify_warm():
+        state["classified"] = monitor._classify_all(provider, state["enumerated"])
+
+    def aggregate():
+        by_group, _ = monitor._aggregate(state["classified"], monitor.SAMPLE_INTERVAL)
+        state["snapshot"] = monitor._build_snapshot(by_group, time.time())
+
+    def anomaly_check():
+        snapshot = state["snapshot"]
+        data = monitor.get_process_data(None, sampler.baseline.cpu, sampler.baseline.mem, snapshot)
+        sampler.history.append(snapshot.timestamp, data["cpu"], data["memory"],
+                               data["threads"], data["process_count"])
+        monitor.apply_alerts(data, sampler.detectors.evaluate_history(sampler.history))
+        state["data"] = data
+
+    def serialize():
+        json.dumps(state["data"])
+
+    monitor.take_snapshot()  # Prime CPU counters and the classification cache
+    for stage, fn in (("enumerate", enumerate_stage), ("classify_cold", classify_cold),
+                      ("classify_warm", classify_warm), ("aggregate", aggregate),
+                      ("anomaly_check", anomaly_check), ("serialize", serialize),
+                      ("full_tick", sampler.tick)):
+        results[f"tick.{n}.{stage}"] = summarize(timed(fn, repeat))
+
+    results[f"tick.{n}.full_tick"]["processes"] = len(provider.processes)
+    return results
+
+
+def bench_http(n=1000, clients=HTTP_CLIENTS, requests=HTTP_REQUESTS, seed=0):
+    """/data throughput and latency with many concurrent pollers (Flask test client)"""
+    import app as app_module
+
+    monitor.set_provider(make_provider(n, seed))
+    # Not initialize(): the fake anomalies must not land in the real event store or recordings
+    with tempfile.TemporaryDirectory(prefix="osmonitor-bench-") as scratch:
+        app_module.events = EventStore(os.path.join(scratch, "events.db"))
+        app_module.sampler = monitor.Sampler(events=app_module.events)
+        app_module.sampler.start()
+        app_module.initialized = True
+        try:
+            app_module.sampler.latest(timeout=30)
+
+            latencies = [[] for _ in range(clients)]
+            errors = []
+
+            def poller(out):
+                client = app_module.app.test_client()
+                for _ in range(requests):
+                    started = time.perf_counter()
+                    response = client.get("/data")
+                    out.append(time.perf_counter() - started)
+                    if response.status_code != 200:
+                        errors.append(response.status_code)
+
+            threads = [threading.Thread(target=poller, args=(out,)) for out in latencies]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            app_module.sampler.stop(timeout=5)
+            app_module.events.close()
+            app_module.initialized = False
+            app_module.sampler = app_module.events = None
+
+    ms = np.concatenate([np.asarray(out) for out in latencies]) * 1000.0
+    return {f"http.data.{clients}x{requests}": {
+        "requests": int(len(ms)),
+        "errors": len(errors),
+        "rps": round(len(ms) / elapsed, 1),
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+    }}
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Regressions of results vs baseline -> list of (metric, field, old, new, ratio)"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        # Medians only - p99 over a handful of runs is mostly noise
+        for field in ("median_ms", "p50_ms"):
+            if field in current and previous.get(field):
+                ratio = current[field] / previous[field]
+                if ratio > 1 + tolerance:
+                    regressions.append((name, field, previous[field], current[field], ratio))
+        if "rps" in current and current["rps"] and previous.get("rps"):
+            ratio = previous["rps"] / current["rps"]
+            if ratio > 1 + tolerance:
+                regressions.append((name, "rps", previous["rps"], current["rps"], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the monitoring tick and HTTP endpoints")
+    parser.add_argument("--sizes", default=",".join(str(n) for n in SIZES),
+                        help="comma-separated fake process counts")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--clients", type=int, default=HTTP_CLIENTS)
+    parser.add_argument("--requests", type=int, default=HTTP_REQUESTS)
+    parser.add_argument("--skip-http", action="store_true")
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args(argv)
+
+    results = {}
+    for n in (int(size) for size in args.sizes.split(",") if size):
+        results.update(bench_tick(n, args.repeat))
+        print(f"[BENCH] tick @ {n} processes: {results[f'tick.{n}.full_tick']['median_ms']:.2f}ms median",
+              file=sys.stderr)
+    if not args.skip_http:
+        results.update(bench_http(clients=args.clients, requests=args.requests))
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f).get("results", {})
+        regressions = compare(results, baseline, args.tolerance)
+        for name, field, old, new, ratio in regressions:
+            print(f"[REGRESSION] {name} {field}: {old} -> {new} ({ratio:.2f}x)", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"[BENCH] No regressions beyond {args.tolerance:.0%}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
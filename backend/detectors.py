@@ -0,0 +1,219 @@
+import numpy as np
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from history import COLUMNS
+
+DEFAULT_COOLDOWN = 60.0  # Seconds a rule stays quiet after it fired
+
+# One rule's verdict for the latest sample
+Alert = namedtuple('Alert', ['rule', 'column', 'value', 'score', 'reason'])
+
+
+class Cooldowns:
+    """Per-rule "last fired" times - one noisy rule never silences the others"""
+
+    def __init__(self):
+        self._last = {}
+
+    def ready(self, name, cooldown, now):
+        return now - self._last.get(name, float('-inf')) >= cooldown
+
+    def mark(self, name, now):
+        self._last[name] = now
+
+    def reset(self):
+        self._last.clear()
+
+
+class Rule(ABC):
+    """One named check over one history column.
+    Subclasses implement evaluate_batch() for ALL rules of their kind at once.
+    """
+
+    min_samples = 2
+
+    def __init__(self, name, column, cooldown=DEFAULT_COOLDOWN):
+        if column not in COLUMNS:
+            raise ValueError(f"Unknown column {column!r}, expected one of {COLUMNS}")
+        self.name = name
+        self.column = column
+        self.col = COLUMNS.index(column)
+        self.cooldown = cooldown
+
+    @property
+    def window(self):
+        """Samples of history this rule needs (including the latest)"""
+        return self.min_samples
+
+    @classmethod
+    @abstractmethod
+    def evaluate_batch(cls, rules, ts, values):
+        """-> (score array, fired bool array), one entry per rule"""
+
+
+def _tail_matrix(rules, values, window):
+    """Gather each rule's column over the last `window` samples -> (window, n_rules), plus a mask
+    selecting, per rule, only the samples inside that rule's own window (excluding the latest)
+    """
+    cols = np.array([rule.col for rule in rules])
+    x = values[-window:, cols]
+    n = len(x)
+    lengths = np.array([min(rule.window, n) for rule in rules])
+    # Row i belongs to rule r's history if it is one of its (length - 1) samples before the latest
+    rows = np.arange(n)[:, None]
+    mask = (rows >= n - lengths[None, :]) & (rows < n - 1)
+    return x, mask
+
+
+class ThresholdRule(Rule):
+    """Latest value above a fixed limit"""
+
+    min_samples = 1
+
+    def __init__(self, name, column, threshold, cooldown=DEFAULT_COOLDOWN):
+        super().__init__(name, column, cooldown)
+        self.threshold = threshold
+
+    @classmethod
+    def evaluate_batch(cls, rules, ts, values):
+        latest = values[-1, [rule.col for rule in rules]]
+        thresholds = np.array([rule.threshold for rule in rules])
+        return latest / thresholds, latest > thresholds
+
+    def describe(self, value, score):
+        return f"{self.column.upper()} {value:.1f} above {self.threshold:.1f}"
+
+
+class ZScoreRule(Rule):
+    """Latest value more than `z` rolling standard deviations from the rolling mean"""
+
+    def __init__(self, name, column, window=30, z=4.0, min_std=1.0, cooldown=DEFAULT_COOLDOWN):
+        super().__init__(name, column, cooldown)
+        self.min_samples = window
+        self.z = z
+        self.min_std = min_std
+
+    @classmethod
+    def evaluate_batch(cls, rules, ts, values):
+        x, mask = _tail_matrix(rules, values, max(rule.window for rule in rules))
+        n = np.maximum(mask.sum(axis=0), 1)
+        mean = (x * mask).sum(axis=0) / n
+        var = (((x - mean) ** 2) * mask).sum(axis=0) / np.maximum(n - 1, 1)
+        std = np.maximum(np.sqrt(var), [rule.min_std for rule in rules])
+        score = (x[-1] - mean) / std
+        return score, score > np.array([rule.z for rule in rules])
+
+    def describe(self, value, score):
+        return f"{self.column.upper()} {value:.1f} is {score:.1f} std above its recent mean"
+
+
+class EwmaRule(Rule):
+    """Latest value deviates from the exponentially weighted mean by `k` weighted std"""
+
+    def __init__(self, name, column, alpha=0.1, window=60, k=4.0, min_std=1.0, cooldown=DEFAULT_COOLDOWN):
+        super().__init__(name, column, cooldown)
+        self.alpha = alpha
+        self.min_samples = window
+        self.k = k
+        self.min_std = min_std
+
+    @classmethod
+    def evaluate_batch(cls, rules, ts, values):
+        x, mask = _tail_matrix(rules, values, max(rule.window for rule in rules))
+        n = len(x)
+        # Weight (1 - alpha)^age per rule; ages count back from the sample before the latest
+        ages = (n - 2 - np.arange(n))[:, None]
+        alphas = np.array([rule.alpha for rule in rules])
+        weights = np.where(mask, (1 - alphas[None, :]) ** np.maximum(ages, 0), 0.0)
+        total = np.maximum(weights.sum(axis=0), 1e-12)
+        mean = (weights * x).sum(axis=0) / total
+        var = (weights * (x - mean) ** 2).sum(axis=0) / total
+        std = np.maximum(np.sqrt(var), [rule.min_std for rule in rules])
+        score = (x[-1] - mean) / std
+        return score, score > np.array([rule.k for rule in rules])
+
+    def describe(self, value, score):
+        return f"{self.column.upper()} {value:.1f} is {score:.1f} std above its weighted trend"
+
+
+class RateOfChangeRule(Rule):
+    """Least-squares slope over the window (units per minute) above `max_rate` - slow leaks"""
+
+    def __init__(self, name, column, window=150, max_rate=50.0, cooldown=DEFAULT_COOLDOWN):
+        super().__init__(name, column, cooldown)
+        self.min_samples = window
+        self.max_rate = max_rate
+
+    @classmethod
+    def evaluate_batch(cls, rules, ts, values):
+        window = max(rule.window for rule in rules)
+        x, mask = _tail_matrix(rules, values, window)
+        # The slope includes the latest sample too
+        mask = mask.copy()
+        mask[-1] = True
+        t = (ts[-len(x):] - ts[-1])[:, None] / 60.0
+        n = mask.sum(axis=0)
+        st = (t * mask).sum(axis=0)
+        sx = (x * mask).sum(axis=0)
+        stt = (t * t * mask).sum(axis=0)
+        stx = (t * x * mask).sum(axis=0)
+        denom = n * stt - st * st
+        slope = np.where(denom > 0, (n * stx - st * sx) / np.where(denom > 0, denom, 1.0), 0.0)
+        return slope, slope > np.array([rule.max_rate for rule in rules])
+
+    def describe(self, value, score):
+        return f"{self.column.upper()} climbing {score:.1f}/min (limit {self.max_rate:.1f}/min), now {value:.1f}"
+
+
+# Conservative defaults: catch spikes against recent behaviour and slow memory climbs
+# that never cross the static ABSOLUTE_MEM_THRESHOLD
+DEFAULT_RULES = [
+    ZScoreRule("cpu_spike", "cpu", window=30, z=4.0, min_std=5.0, cooldown=120.0),
+    ZScoreRule("memory_spike", "memory", window=30, z=4.0, min_std=20.0, cooldown=120.0),
+    EwmaRule("memory_drift", "memory", alpha=0.1, window=60, k=5.0, min_std=20.0, cooldown=300.0),
+    RateOfChangeRule("memory_leak", "memory", window=150, max_rate=50.0, cooldown=300.0),
+]
+
+
+class DetectorSet:
+    """Runs every rule over the latest history each tick, one vectorized pass per rule kind"""
+
+    def __init__(self, rules=None):
+        self.rules = list(DEFAULT_RULES if rules is None else rules)
+        self.cooldowns = Cooldowns()
+        names = [rule.name for rule in self.rules]
+        if len(set(names)) != len(names):
+            raise ValueError("Rule names must be unique (they key the cooldowns)")
+
+    @property
+    def window(self):
+        return max((rule.window for rule in self.rules), default=1)
+
+    def evaluate(self, ts, values, now=None):
+        """Alerts for the latest sample in (ts, values), honouring per-rule cooldowns"""
+        if len(ts) == 0:
+            return []
+        now = ts[-1] if now is None else now
+
+        groups = {}
+        for rule in self.rules:
+            # Rules without enough history yet stay silent instead of guessing
+            if len(ts) >= rule.min_samples:
+                groups.setdefault(type(rule), []).append(rule)
+
+        alerts = []
+        for kind, rules in groups.items():
+            scores, fired = kind.evaluate_batch(rules, ts, values)
+            for rule, score, hit in zip(rules, scores, fired):
+                if not hit or not self.cooldowns.ready(rule.name, rule.cooldown, now):
+                    continue
+                self.cooldowns.mark(rule.name, now)
+                value = float(values[-1, rule.col])
+                alerts.append(Alert(rule.name, rule.column, value, float(score),
+                                    rule.describe(value, float(score))))
+        return alerts
+
+    def evaluate_history(self, history, now=None):
+        """Evaluate against a MetricHistory, reading only the samples the rules need"""
+        ts, values = history.tail(self.window)
+        return self.evaluate(ts, values, now)
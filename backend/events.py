@@ -0,0 +1,157 @@
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from logsetup import get_logger
+import perf
+
+log = get_logger("events")
+
+EVENTS_DB = os.environ.get("OSMONITOR_EVENTS_DB",
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), "events.db"))
+EVENT_BATCH_SIZE = 500        # Most events written in one transaction
+EVENT_FLUSH_INTERVAL = 1.0    # Seconds the writer waits for more events before committing a batch
+EVENT_QUEUE_MAX = 10000       # Pending events beyond this are dropped (and counted) - never block
+EVENT_PAGE_SIZE = 50
+EVENT_PAGE_MAX = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts      REAL    NOT NULL,
+    type    TEXT    NOT NULL,
+    grp     TEXT,
+    pid     INTEGER,
+    rule    TEXT,
+    message TEXT,
+    data    TEXT
+);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+CREATE INDEX IF NOT EXISTS events_type_ts ON events (type, ts);
+CREATE INDEX IF NOT EXISTS events_pid_ts ON events (pid, ts);
+"""
+
+_STOP = object()
+
+
+class EventStore:
+    """Anomaly/kill events in SQLite. record() only enqueues; one writer thread
+    commits them in batches, so a burst of events costs the caller a queue put.
+    """
+
+    def __init__(self, path=EVENTS_DB, batch_size=EVENT_BATCH_SIZE, flush_interval=EVENT_FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=EVENT_QUEUE_MAX)
+        self._local = threading.local()
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.commit()
+        self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        # WAL: readers never wait for the writer, and the writer never waits for readers
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _reader(self):
+        """One connection per reading thread (sqlite3 connections are per-thread)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def record(self, kind, message="", group=None, pid=None, rule=None, data=None, ts=None):
+        """Queue one event for writing; returns False if the queue is full and it was dropped"""
+        row = (time.time() if ts is None else ts, kind, group, pid, rule, message,
+               json.dumps(data) if data is not None else None)
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            perf.count("events.dropped")
+            return False
+
+    def _run(self):
+        conn = self._connect()
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            # Gather whatever else arrives shortly after - one transaction for the lot
+            while item is not _STOP:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+            stopping = item is _STOP
+            if batch:
+                self._write(conn, batch)
+            for _ in range(len(batch) + stopping):
+                self._queue.task_done()
+        conn.close()
+
+    def _write(self, conn, batch):
+        try:
+            with perf.probe("events.write"), conn:
+                conn.executemany("INSERT INTO events (ts, type, grp, pid, rule, message, data) "
+                                 "VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+            perf.count("events.written", len(batch))
+        except sqlite3.Error as e:
+            perf.count("events.write_errors")
+            log.error("writing %d events failed: %s", len(batch), e)
+
+    def flush(self):
+        """Block until every queued event is committed"""
+        self._queue.join()
+
+    def close(self):
+        """Commit what is queued and stop the writer (safe to call twice)"""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout=5)
+
+    def query(self, since=None, until=None, kind=None, pid=None, group=None,
+              cursor=None, limit=EVENT_PAGE_SIZE):
+        """Newest-first page of events -> (events, next_cursor). Pass next_cursor back as
+        cursor for the following page; None means there is nothing older.
+        """
+        clauses, params = [], []
+        for clause, value in (("ts >= ?", since), ("ts <= ?", until), ("type = ?", kind),
+                              ("pid = ?", pid), ("grp = ?", group), ("id < ?", cursor)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        limit = max(1, min(int(limit), EVENT_PAGE_MAX))
+        sql = "SELECT * FROM events"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        # Keyset pagination on the primary key - cheap at any depth, stable while rows arrive
+        sql += " ORDER BY id DESC LIMIT ?"
+        rows = self._reader().execute(sql, params + [limit + 1]).fetchall()
+
+        events = [{
+            "id": row["id"],
+            "ts": row["ts"],
+            "type": row["type"],
+            "group": row["grp"],
+            "pid": row["pid"],
+            "rule": row["rule"],
+            "message": row["message"],
+            "data": json.loads(row["data"]) if row["data"] else None,
+        } for row in rows[:limit]]
+        next_cursor = events[-1]["id"] if len(rows) > limit else None
+        return events, next_cursor
@@ -0,0 +1,440 @@
+import argparse
+import heapq
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+import zlib
+from collections import deque
+from history import MetricHistory
+from logsetup import get_logger, kv, setup_logging
+from monitor import PRIMARY_GROUP, Sampler, set_provider
+import perf
+
+log = get_logger("fleet")
+
+FLEET_TOKEN = os.environ.get("OSMONITOR_FLEET_TOKEN")  # Shared secret agents send; unset = no check
+
+# Agent
+FLEET_BATCH_SIZE = 30           # Samples per upload (one minute at the 2s interval)
+FLEET_FLUSH_INTERVAL = 10.0     # Seconds between uploads when fewer samples are waiting
+FLEET_BUFFER_MAX = 5000         # Samples kept while the collector is unreachable (oldest dropped first)
+FLEET_TIMEOUT = 10.0            # Seconds per upload request
+FLEET_RETRY_MIN = 1.0           # Reconnect back-off, doubled per failure up to FLEET_RETRY_MAX
+FLEET_RETRY_MAX = 60.0
+
+# Collector
+FLEET_HISTORY_LENGTH = 3600     # Samples kept per host
+FLEET_MAX_HOSTS = 256
+FLEET_STALE_AFTER = 60.0        # Seconds without an upload before a host is shown as stale
+FLEET_ANOMALY_LOG = 1000        # Anomaly starts kept across the fleet
+FLEET_MAX_BODY = 1024 * 1024    # Compressed upload limit (bytes)
+FLEET_MAX_RECORDS = 1000        # Samples accepted in one upload
+FLEET_MAX_CONCURRENT = 4        # Uploads processed at once; more get 503 + Retry-After
+FLEET_RETRY_AFTER = 2           # Seconds a refused agent is told to wait
+
+GROUP_FIELDS = ("cpu", "memory", "threads", "process_count", "status", "reason")
+
+
+def sample_record(sampler, sample):
+    """Compact, JSON-ready summary of one sample - all a fleet view needs from a host"""
+    return {
+        "seq": sample.seq,
+        "ts": sample.snapshot.timestamp,
+        "interval": sampler.interval,
+        "groups": {name: {field: data.get(field) for field in GROUP_FIELDS}
+                   for name, data in sample.groups.items() if data.get("status") != "ERROR"},
+        "tabs": [[tab["pid"], tab["group"], tab["name"], tab["memory"], tab["cpu"], tab["growth_mb_per_min"]]
+                 for tab in sampler.tabs.top()["top_memory"]],
+        "anomalies": {f"{group}:{rule}": n for (group, rule), n in sample.anomalies.items()},
+    }
+
+
+def encode_batch(records):
+    """Delta-encode records in order: the first is complete, every later one carries only
+    what changed since the record before it (None marks a group that went away).
+    Each batch decodes on its own, so dropped or resent batches never corrupt a host.
+    """
+    encoded = []
+    previous = None
+    for record in records:
+        if previous is None:
+            delta = dict(record, full=True)
+        else:
+            delta = {"seq": record["seq"], "ts": record["ts"]}
+            if record["interval"] != previous["interval"]:
+                delta["interval"] = record["interval"]
+            groups = {}
+            for name, fields in record["groups"].items():
+                before = previous["groups"].get(name, {})
+                changed = {key: value for key, value in fields.items() if before.get(key) != value}
+                if changed:
+                    groups[name] = changed
+            for name in previous["groups"]:
+                if name not in record["groups"]:
+                    groups[name] = None
+            if groups:
+                delta["groups"] = groups
+            for key in ("tabs", "anomalies"):
+                if record[key] != previous[key]:
+                    delta[key] = record[key]
+        encoded.append(delta)
+        previous = record
+    return encoded
+
+
+def decode_body(body, encoding=None):
+    """Upload body (zlib-deflated JSON unless encoding says otherwise) -> dict; ValueError if bad"""
+    if len(body) > FLEET_MAX_BODY:
+        raise ValueError("upload too large")
+    if encoding == "deflate":
+        inflater = zlib.decompressobj()
+        try:
+            body = inflater.decompress(body, 16 * FLEET_MAX_BODY)
+        except zlib.error as e:
+            raise ValueError(f"bad deflate body: {e}") from None
+        if inflater.unconsumed_tail:
+            raise ValueError("upload too large once decompressed")
+    elif encoding not in (None, "", "identity"):
+        raise ValueError(f"unsupported encoding {encoding!r}")
+    try:
+        payload = json.loads(body)
+    except ValueError as e:
+        raise ValueError(f"bad JSON: {e}") from None
+    if not isinstance(payload, dict) or not isinstance(payload.get("host"), str) \
+            or not isinstance(payload.get("records"), list):
+        raise ValueError("upload needs a host and a records list")
+    if len(payload["records"]) > FLEET_MAX_RECORDS:
+        raise ValueError("too many records in one upload")
+    return payload
+
+
+class FleetAgent:
+    """Sampler publisher that uploads samples to a collector in compressed batches.
+    publish() only appends to a bounded buffer; one thread uploads, backs off while the
+    collector is down or busy, and catches up from the buffer when it is back.
+    """
+
+    def __init__(self, url, host=None, token=FLEET_TOKEN, batch_size=FLEET_BATCH_SIZE,
+                 flush_interval=FLEET_FLUSH_INTERVAL, buffer_max=FLEET_BUFFER_MAX, timeout=FLEET_TIMEOUT):
+        self.url = url.rstrip("/") + "/fleet/ingest"
+        self.host = host or socket.gethostname()
+        self.agent_id = uuid.uuid4().hex    # Tells the collector when this host's seq restarted
+        self.token = token
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.dropped = 0
+        self._buffer = deque()
+        self._buffer_max = buffer_max
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._failures = 0
+        self._retry_at = 0.0                # Monotonic time before which a full buffer does not wake us
+        self._thread = threading.Thread(target=self._run, name="fleet-agent", daemon=True)
+        self._thread.start()
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def publish(self, sampler, sample):
+        record = sample_record(sampler, sample)
+        with self._lock:
+            if len(self._buffer) >= self._buffer_max:
+                self._buffer.popleft()
+                self.dropped += 1
+                perf.count("fleet.dropped")
+            self._buffer.append(record)
+            if len(self._buffer) >= self.batch_size and time.monotonic() >= self._retry_at:
+                self._wake.set()
+
+    def stop(self, timeout=None):
+        """Upload what is buffered (one attempt) and stop"""
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        delay = self.flush_interval
+        while True:
+            self._wake.wait(delay)
+            self._wake.clear()
+            stopping = self._stop.is_set()
+            delay = self._drain()
+            if stopping:
+                return
+
+    def _drain(self):
+        """Upload full batches until the buffer is empty or an upload fails -> next wait"""
+        while True:
+            with self._lock:
+                batch = [self._buffer[i] for i in range(min(self.batch_size, len(self._buffer)))]
+            if not batch:
+                return self.flush_interval
+            retry = self._upload(batch)
+            if retry is not None:
+                self._retry_at = time.monotonic() + retry
+                return retry
+            with self._lock:
+                # Overflow may have dropped some of the batch meanwhile - remove by seq
+                last = batch[-1]["seq"]
+                while self._buffer and self._buffer[0]["seq"] <= last:
+                    self._buffer.popleft()
+                if len(self._buffer) < self.batch_size:
+                    return self.flush_interval
+
+    def _upload(self, batch):
+        """POST one batch -> None when done with it, else seconds to wait before retrying"""
+        body = json.dumps({"host": self.host, "agent": self.agent_id, "records": encode_batch(batch)},
+                          separators=(",", ":")).encode()
+        body = zlib.compress(body)
+        headers = {"Content-Type": "application/json", "Content-Encoding": "deflate"}
+        if self.token:
+            headers["X-Fleet-Token"] = self.token
+        request = urllib.request.Request(self.url, data=body, headers=headers, method="POST")
+        try:
+            with perf.probe("fleet.upload"), urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except urllib.error.HTTPError as e:
+            if e.code in (429, 503):
+                # Collector is busy - wait as long as it asks
+                perf.count("fleet.throttled")
+                return _retry_after(e.headers.get("Retry-After"), FLEET_RETRY_MIN)
+            if e.code == 413 and self.batch_size > 1:
+                self.batch_size = max(self.batch_size // 2, 1)
+                log.warning("collector refused the batch size, halving it", extra=kv(batch_size=self.batch_size))
+                return 0.0
+            # Not going to get better by resending - drop the batch
+            perf.count("fleet.rejected", len(batch))
+            log.error("collector rejected a batch", extra=kv(status=e.code, samples=len(batch)))
+            return None
+        except (urllib.error.URLError, OSError) as e:
+            self._failures += 1
+            perf.count("fleet.upload_errors")
+            delay = min(FLEET_RETRY_MIN * 2 ** (self._failures - 1), FLEET_RETRY_MAX)
+            log.warning("collector unreachable, buffering", extra=kv(url=self.url, error=e,
+                                                                   buffered=len(self._buffer), retry_in=delay))
+            return delay
+        if self._failures:
+            log.info("collector reachable again", extra=kv(url=self.url, buffered=len(self._buffer)))
+            self._failures = 0
+        perf.count("fleet.uploaded", len(batch))
+        return None
+
+
+def _retry_after(value, default):
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return default
+
+
+def _number(value, field):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise TypeError(f"{field} must be a number, got {value!r}")
+
+
+def _check_state(state):
+    """TypeError/KeyError unless a rebuilt record has everything _store and the views read"""
+    if isinstance(state["seq"], bool) or not isinstance(state["seq"], int):
+        raise TypeError(f"seq must be an integer, got {state['seq']!r}")
+    _number(state["ts"], "ts")
+    _number(state["interval"], "interval")
+    if not isinstance(state["groups"], dict) or not isinstance(state["anomalies"], dict):
+        raise TypeError("groups and anomalies must be objects")
+    for group, data in state["groups"].items():
+        for field in ("cpu", "memory", "threads", "process_count"):
+            _number(data[field], f"{group}.{field}")
+        if not isinstance(data["status"], str):
+            raise TypeError(f"{group}.status must be a string")
+        if data["reason"] is not None and not isinstance(data["reason"], str):
+            raise TypeError(f"{group}.reason must be a string or null")
+    if not isinstance(state["tabs"], list):
+        raise TypeError("tabs must be a list")
+    for tab in state["tabs"]:
+        if not isinstance(tab, list) or len(tab) != 6:
+            raise TypeError(f"tab must be [pid, group, name, memory, cpu, growth], got {tab!r}")
+        _number(tab[3], "tab memory")
+
+
+class _Host:
+    def __init__(self, name, agent_id, history_length):
+        self.name = name
+        self.agent_id = agent_id
+        self.last_seq = 0
+        self.last_seen = None       # Collector clock at the last upload
+        self.state = None           # Latest decoded record
+        self.history = MetricHistory(history_length)
+
+
+class FleetStore:
+    """Latest state and a metric ring per host, built from agent uploads"""
+
+    def __init__(self, history_length=FLEET_HISTORY_LENGTH, max_hosts=FLEET_MAX_HOSTS, primary_group=PRIMARY_GROUP):
+        self.history_length = history_length
+        self.max_hosts = max_hosts
+        self.primary_group = primary_group
+        self._hosts = {}
+        self._anomalies = deque(maxlen=FLEET_ANOMALY_LOG)
+        self._lock = threading.Lock()
+
+    def ingest(self, payload):
+        """Apply one decoded upload -> number of new samples (resent ones are skipped).
+        Every record is checked first: one bad record rejects the whole batch and stores nothing.
+        """
+        states = []
+        state = None
+        for record in payload["records"]:
+            try:
+                state = self._apply(state, record)
+                _check_state(state)
+            except (KeyError, TypeError, AttributeError) as e:
+                raise ValueError(f"bad record: {e!r}") from None
+            states.append(state)
+
+        name = payload["host"]
+        with self._lock:
+            host = self._hosts.get(name)
+            if host is None:
+                if len(self._hosts) >= self.max_hosts:
+                    raise ValueError(f"fleet is full ({self.max_hosts} hosts)")
+                host = self._hosts[name] = _Host(name, payload.get("agent"), self.history_length)
+            elif host.agent_id != payload.get("agent"):
+                # Agent restarted - its seq starts over
+                host.agent_id = payload.get("agent")
+                host.last_seq = 0
+            host.last_seen = time.time()
+
+            accepted = 0
+            for state in states:
+                if state["seq"] <= host.last_seq:
+                    continue
+                self._store(host, state)
+                accepted += 1
+            perf.count("fleet.ingested", accepted)
+            return accepted
+
+    def _apply(self, state, record):
+        if record.get("full") or state is None:
+            if not record.get("full"):
+                raise KeyError("batch does not start with a full record")
+            return {key: record[key] for key in ("seq", "ts", "interval", "groups", "tabs", "anomalies")}
+        state = dict(state, seq=record["seq"], ts=record["ts"])
+        if "interval" in record:
+            state["interval"] = record["interval"]
+        if "groups" in record:
+            groups = dict(state["groups"])
+            for name, fields in record["groups"].items():
+                if fields is None:
+                    groups.pop(name, None)
+                else:
+                    groups[name] = dict(groups.get(name, {}), **fields)
+            state["groups"] = groups
+        for key in ("tabs", "anomalies"):
+            if key in record:
+                state[key] = record[key]
+        return state
+
+    def _store(self, host, state):
+        before = host.state["groups"] if host.state else {}
+        for group, data in state["groups"].items():
+            if data["status"] == "ANOMALY" and before.get(group, {}).get("status") != "ANOMALY":
+                self._anomalies.append({"host": host.name, "group": group, "ts": state["ts"],
+                                        "reason": data["reason"], "cpu": data["cpu"], "memory": data["memory"]})
+        primary = state["groups"].get(self.primary_group)
+        if primary is not None:
+            host.history.append(state["ts"], primary["cpu"], primary["memory"], primary["threads"],
+                                primary["process_count"])
+        host.state = state
+        host.last_seq = state["seq"]
+
+    def host(self, name):
+        return self._hosts.get(name)
+
+    def summary(self, group=None):
+        """Latest per-host state for /fleet/data, worst hosts first"""
+        now = time.time()
+        with self._lock:
+            hosts = []
+            for host in self._hosts.values():
+                if host.state is None:
+                    continue
+                groups = host.state["groups"]
+                if group is not None:
+                    groups = {group: groups[group]} if group in groups else {}
+                hosts.append({
+                    "host": host.name,
+                    "timestamp": host.state["ts"],
+                    "last_seen": host.last_seen,
+                    "stale": now - host.last_seen > FLEET_STALE_AFTER,
+                    "sample_interval": host.state["interval"],
+                    "status": "ANOMALY" if any(data["status"] == "ANOMALY" for data in groups.values()) else "NORMAL",
+                    "groups": groups,
+                })
+        hosts.sort(key=lambda item: (item["status"] != "ANOMALY", item["stale"], item["host"]))
+        return {
+            "hosts": hosts,
+            "total": len(hosts),
+            "anomalous": sum(1 for item in hosts if item["status"] == "ANOMALY"),
+            "stale": sum(1 for item in hosts if item["stale"]),
+            "cpu": round(sum(data["cpu"] for item in hosts for data in item["groups"].values()), 2),
+            "memory": round(sum(data["memory"] for item in hosts for data in item["groups"].values()), 2),
+        }
+
+    def top_tabs(self, n, host=None, group=None):
+        """The n heaviest tabs across the fleet (from each host's own top-N)"""
+        with self._lock:
+            tabs = [(name, tab) for name, item in self._hosts.items() if item.state and (host is None or name == host)
+                    for tab in item.state["tabs"] if group is None or tab[1] == group]
+        heaviest = heapq.nlargest(n, tabs, key=lambda item: item[1][3])
+        return [{"host": name, "pid": pid, "group": tab_group, "name": tab_name, "memory": memory, "cpu": cpu,
+                 "growth_mb_per_min": growth}
+                for name, (pid, tab_group, tab_name, memory, cpu, growth) in heaviest]
+
+    def anomalies(self, since=None, host=None, limit=None):
+        """Anomaly starts across the fleet, newest first"""
+        with self._lock:
+            found = [item for item in reversed(self._anomalies)
+                     if (since is None or item["ts"] >= since) and (host is None or item["host"] == host)]
+        return found[:limit] if limit else found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the monitor as a fleet agent that uploads to a collector")
+    parser.add_argument("collector", help="collector base URL, e.g. http://monitor-host:5000")
+    parser.add_argument("--host", help="name to report as (default: this machine's hostname)")
+    parser.add_argument("--synthetic", type=int, metavar="SEED",
+                        help="sample a synthetic process tree instead of this machine (local fleet tests)")
+    parser.add_argument("--batch-size", type=int, default=FLEET_BATCH_SIZE)
+    parser.add_argument("--flush-interval", type=float, default=FLEET_FLUSH_INTERVAL)
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    if args.synthetic is not None:
+        from providers import SyntheticProvider
+        set_provider(SyntheticProvider(seed=args.synthetic, leaking_tabs=args.synthetic % 3))
+
+    agent = FleetAgent(args.collector, host=args.host, batch_size=args.batch_size,
+                       flush_interval=args.flush_interval)
+    sampler = Sampler(publisher=agent)
+    sampler.start()
+    log.info("fleet agent started", extra=kv(host=agent.host, collector=args.collector))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sampler.stop(timeout=5)
+        agent.stop(timeout=FLEET_TIMEOUT)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
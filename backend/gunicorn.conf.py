@@ -0,0 +1,42 @@
+# Multi-worker deployment: one collector process samples, every worker only reads.
+#   pip install gunicorn
+#   gunicorn -c gunicorn.conf.py app:app
+import os
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("OSMONITOR_SHARED", "osmonitor")
+
+bind = "127.0.0.1:5000"
+workers = 4
+worker_class = "gthread"
+threads = 8             # /stream holds a thread per open dashboard
+timeout = 60
+
+COLLECTOR_START_TIMEOUT = 10.0  # Seconds to wait for the collector to create its segment
+
+_collector = None
+
+
+def on_starting(server):
+    global _collector
+    here = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, here)
+    from shared import collector_pid
+
+    _collector = subprocess.Popen([sys.executable, os.path.join(here, "shared.py")], cwd=here)
+    # A segment that merely exists could be stale or planted - wait for ours
+    deadline = time.monotonic() + COLLECTOR_START_TIMEOUT
+    while collector_pid(os.environ["OSMONITOR_SHARED"]) != _collector.pid:
+        if _collector.poll() is not None:
+            raise RuntimeError(f"collector exited with {_collector.returncode}")
+        if time.monotonic() >= deadline:
+            raise RuntimeError("collector did not publish its segment in time")
+        time.sleep(0.1)
+
+
+def on_exit(server):
+    if _collector is not None and _collector.poll() is None:
+        _collector.terminate()
+        _collector.wait(timeout=10)
@@ -0,0 +1,104 @@
+import threading
+import numpy as np
+
+HISTORY_CAPACITY = 86400    # Samples kept on the server (48h at the 2s sample interval)
+HISTORY_MAX_POINTS = 500    # Most buckets one /history response returns
+HISTORY_MIN_RESOLUTION = 0.5  # Default bucket floor in seconds (the sampler's MIN_SAMPLE_INTERVAL)
+COLUMNS = ('cpu', 'memory', 'threads', 'tabs')
+
+
+class MetricHistory:
+    """Fixed-capacity ring buffer of monitor samples, one float64 column per metric.
+    Memory use is decided at construction and never grows, however long we run.
+    """
+
+    def __init__(self, capacity=HISTORY_CAPACITY):
+        self.capacity = capacity
+        self._ts = np.zeros(capacity, dtype=np.float64)
+        self._values = np.zeros((capacity, len(COLUMNS)), dtype=np.float64)
+        self._next = 0      # Slot the next sample is written to
+        self._count = 0     # Number of valid samples (<= capacity)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def append(self, ts, cpu, memory, threads, tabs):
+        """Store one sample, overwriting the oldest once the buffer is full"""
+        with self._lock:
+            self._ts[self._next] = ts
+            self._values[self._next] = (cpu, memory, threads, tabs)
+            self._next = (self._next + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def window(self, since=None, until=None):
+        """Samples in [since, until] as (timestamps, values) arrays, oldest first"""
+        with self._lock:
+            if self._count < self.capacity:
+                ts = self._ts[:self._count].copy()
+                values = self._values[:self._count].copy()
+            else:
+                # Unroll the ring: oldest part starts at the write position
+                ts = np.concatenate((self._ts[self._next:], self._ts[:self._next]))
+                values = np.concatenate((self._values[self._next:], self._values[:self._next]))
+
+        # Samples are appended in time order, so the window is one contiguous slice
+        lo = np.searchsorted(ts, since, side='left') if since is not None else 0
+        hi = np.searchsorted(ts, until, side='right') if until is not None else len(ts)
+        return ts[lo:hi], values[lo:hi]
+
+    def oldest(self):
+        """Timestamp of the oldest sample still held (None if empty)"""
+        with self._lock:
+            if not self._count:
+                return None
+            return float(self._ts[self._next if self._count == self.capacity else 0])
+
+    def tail(self, n):
+        """Latest n samples as (timestamps, values) arrays, oldest first (copies only n rows)"""
+        with self._lock:
+            n = min(n, self._count)
+            idx = (self._next - n + np.arange(n)) % self.capacity
+            return self._ts[idx], self._values[idx]
+
+    def downsample(self, since=None, resolution=None, until=None, max_points=HISTORY_MAX_POINTS):
+        """Min/max/mean of every column per `resolution`-second bucket (vectorized)"""
+        ts, values = self.window(since, until)
+        return downsample(ts, values, resolution, max_points)
+
+
+def downsample(ts, values, resolution=None, max_points=HISTORY_MAX_POINTS):
+    """Bucket time-ordered samples into min/max/mean per column without Python loops"""
+    result = {"resolution": resolution, "count": 0, "t": []}
+    for name in COLUMNS:
+        result[name] = {"min": [], "max": [], "mean": []}
+    if len(ts) == 0:
+        return result
+
+    # Never hand out more than max_points buckets, whatever resolution was asked for
+    span = float(ts[-1] - ts[0])
+    min_resolution = span / max_points if max_points else 0.0
+    if not resolution:
+        # Buckets finer than the sampler ever ticks would just be one sample each
+        min_resolution = max(min_resolution, HISTORY_MIN_RESOLUTION)
+    resolution = max(float(resolution or 0.0), min_resolution)
+
+    # Align buckets to multiples of the resolution so repeated queries line up
+    bucket_ids = np.floor(ts / resolution).astype(np.int64)
+    starts = np.flatnonzero(np.diff(bucket_ids, prepend=bucket_ids[0] - 1))
+    counts = np.diff(np.append(starts, len(ts)))
+
+    mins = np.minimum.reduceat(values, starts, axis=0)
+    maxs = np.maximum.reduceat(values, starts, axis=0)
+    means = np.add.reduceat(values, starts, axis=0) / counts[:, None]
+
+    result["resolution"] = resolution
+    result["count"] = int(len(starts))
+    result["t"] = (bucket_ids[starts] * resolution).tolist()
+    for i, name in enumerate(COLUMNS):
+        result[name] = {
+            "min": np.round(mins[:, i], 2).tolist(),
+            "max": np.round(maxs[:, i], 2).tolist(),
+            "mean": np.round(means[:, i], 2).tolist(),
+        }
+    return result
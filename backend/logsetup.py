@@ -0,0 +1,99 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+LOGGER_NAME = "osmonitor"
+LOG_LEVEL = os.environ.get("OSMONITOR_LOG_LEVEL", "INFO")  # Per-tick detail is DEBUG - silent by default
+RATE_LIMIT_WINDOW = 30.0  # Seconds an identical message is suppressed after it was logged
+RATE_LIMIT_KEY_FIELDS = ("group", "rules")  # kv() fields naming what a message is about - part of "identical"
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+def get_logger(name):
+    """Logger under the osmonitor namespace, e.g. get_logger("monitor")"""
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+def kv(**fields):
+    """Structured fields for a log call: log.info("tab closed", extra=kv(pid=123))"""
+    return {"fields": fields}
+
+
+class KeyValueFormatter(logging.Formatter):
+    """time LEVEL logger message key=value ... (fields from extra=kv(...))"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s %(message)s", "%H:%M:%S")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{key}={value!r}" if isinstance(value, str) and " " in value
+                                   else f"{key}={value}" for key, value in fields.items())
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            line += f" (suppressed {suppressed} repeats)"
+        return line
+
+
+class RateLimitFilter(logging.Filter):
+    """Drop repeats of the same message (logger + level + template + RATE_LIMIT_KEY_FIELDS) within
+    `window` seconds - the same warning for another group is not a repeat.
+    The next one that gets through reports how many were dropped. Only records at `level`
+    and above are limited - DEBUG detail is opt-in and should come through whole.
+    """
+
+    def __init__(self, window=RATE_LIMIT_WINDOW, level=logging.WARNING):
+        super().__init__()
+        self.window = window
+        self.level = level
+        self._last = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno < self.level:
+            return True
+        fields = getattr(record, "fields", None) or {}
+        key = (record.name, record.levelno, record.msg) + tuple(str(fields.get(name)) for name in RATE_LIMIT_KEY_FIELDS)
+        now = time.monotonic()
+        with self._lock:
+            last, suppressed = self._last.get(key, (None, 0))
+            if last is not None and now - last < self.window:
+                self._last[key] = (last, suppressed + 1)
+                return False
+            self._last[key] = (now, 0)
+        record.suppressed = suppressed
+        return True
+
+
+def setup_logging(level=None):
+    """Route osmonitor.* logs through a queue; one listener thread does the actual I/O.
+    Safe to call more than once.
+    """
+    global _listener
+    with _setup_lock:
+        logger = logging.getLogger(LOGGER_NAME)
+        level = level or LOG_LEVEL
+        logger.setLevel(level.upper() if isinstance(level, str) else level)
+        if _listener is not None:
+            return logger
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        queue_handler.addFilter(RateLimitFilter())
+        logger.addHandler(queue_handler)
+        logger.propagate = False
+
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(KeyValueFormatter())
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+        return logger
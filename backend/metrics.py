@@ -0,0 +1,84 @@
+import threading
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"  # Prometheus text exposition format
+METRIC_PREFIX = "osmonitor"
+MB = 1024 * 1024
+
+_cache_lock = threading.Lock()
+_cached_sample = None
+_cached_text = None
+
+
+def _escape(value):
+    """Label value escaping per the exposition format"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _family(out, name, kind, help_text):
+    out.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}\n# TYPE {METRIC_PREFIX}_{name} {kind}\n")
+
+
+def _tab_type(info):
+    return "dashboard" if info.protected else "tab"
+
+
+def render(sample):
+    """Exposition text for one Sample. Lines are appended to one list and joined once,
+    so hundreds of tabs cost one small format per tab and no repeated string copies.
+    """
+    out = []
+    groups = sample.snapshot.groups
+
+    gauges = (
+        ("cpu_percent", "Total CPU % of all processes in the group", lambda s, d: s.cpu),
+        ("memory_bytes", "Total memory of all processes in the group (RSS, USS or PSS per MEMORY_MODE)", lambda s, d: s.memory * MB),
+        ("threads", "Total threads of all processes in the group", lambda s, d: s.threads),
+        ("processes", "Processes in the group", lambda s, d: len(s.processes)),
+        ("visible_tabs", "Visible tabs counted for anomaly detection (dashboard excluded)",
+         lambda s, d: d.get("process_count", 0)),
+        ("anomaly", "1 while the latest sample is anomalous", lambda s, d: int(d.get("status") == "ANOMALY")),
+    )
+    for name, help_text, value in gauges:
+        _family(out, name, "gauge", help_text)
+        for group, snapshot in groups.items():
+            data = sample.groups.get(group, {})
+            out.append(f'{METRIC_PREFIX}_{name}{{group="{_escape(group)}"}} {value(snapshot, data):.10g}\n')
+
+    _family(out, "anomalies_total", "counter", "Anomalous samples per group and rule since start")
+    for (group, rule), count in sorted(sample.anomalies.items()):
+        out.append(f'{METRIC_PREFIX}_anomalies_total{{group="{_escape(group)}",rule="{_escape(rule)}"}} {count}\n')
+
+    baseline = sample.data.get("baseline")
+    if baseline:
+        _family(out, "baseline_cpu_percent", "gauge", "Learned normal CPU % of the primary group")
+        out.append(f'{METRIC_PREFIX}_baseline_cpu_percent {baseline["cpu"]:.10g}\n')
+        _family(out, "baseline_memory_bytes", "gauge", "Learned normal RSS of the primary group")
+        out.append(f'{METRIC_PREFIX}_baseline_memory_bytes {baseline["mem"] * MB:.10g}\n')
+
+    _family(out, "tab_rss_bytes", "gauge", "RSS of each browser tab process")
+    for group, snapshot in groups.items():
+        prefix = f'{METRIC_PREFIX}_tab_rss_bytes{{group="{_escape(group)}",pid="'
+        for info in snapshot.tabs:
+            out.append(f'{prefix}{info.pid}",type="{_tab_type(info)}"}} {info.rss_mb * MB:.0f}\n')
+
+    interval = sample.data.get("sample_interval")
+    if interval is not None:
+        _family(out, "sample_interval_seconds", "gauge", "Current (adaptive) sampler interval")
+        out.append(f"{METRIC_PREFIX}_sample_interval_seconds {interval:.10g}\n")
+
+    _family(out, "sample_seq", "gauge", "Sequence number of the latest published sample")
+    out.append(f"{METRIC_PREFIX}_sample_seq {sample.seq}\n")
+    _family(out, "sample_timestamp_seconds", "gauge", "Unix time the latest sample was taken")
+    out.append(f"{METRIC_PREFIX}_sample_timestamp_seconds {sample.snapshot.timestamp:.3f}\n")
+    return "".join(out)
+
+
+def render_cached(sample):
+    """render() once per published sample - scrapes between ticks reuse the same text"""
+    global _cached_sample, _cached_text
+    with _cache_lock:
+        # Identity, not seq: a restarted Sampler starts counting from 1 again
+        if _cached_sample is not sample:
+            _cached_text = render(sample)
+            _cached_sample = sample
+        return _cached_text
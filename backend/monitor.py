@@ -1,30 +1,172 @@
 import psutil
-import statistics
 from datetime import datetime
+import logging
 import os
+import re
 import time
+import threading
+from collections import namedtuple
+from functools import lru_cache
+from attribution import MEMORY_MODES, MemoryAttribution
+from history import MetricHistory
+from pressure import PressureGate
+from tabs import TabHistory
+from baseline import Baseline
+from detectors import Cooldowns, DetectorSet
+from providers import GONE_ERRORS, PsutilProvider, get_provider
+from logsetup import get_logger, kv
+import perf
+
+log = get_logger("monitor")
 
 PROCESS_NAME = "chrome"
-BASELINE_SAMPLES = 3      
+TAB_MIN_MEMORY_MB = 50.0  # Renderers below this are background renderers, not tabs
+SAMPLE_INTERVAL = 2.0     # Seconds between background samples while someone is watching
+# Adaptive sampling: down to MIN_SAMPLE_INTERVAL when metrics move fast or near a threshold,
+# up to MAX_SAMPLE_INTERVAL when stable and nobody has asked for data in VIEWER_IDLE_TIMEOUT
+ADAPTIVE_SAMPLING = True
+MIN_SAMPLE_INTERVAL = 0.5
+MAX_SAMPLE_INTERVAL = 30.0
+VIEWER_IDLE_TIMEOUT = 60.0
+NEAR_THRESHOLD = 0.8      # Sample fastest once CPU or memory reaches this fraction of its threshold...
+APPROACH_RATE = 0.005     # ...while someone watches, or while it climbs this fraction of the threshold per second
+VOLATILITY_FAST = 0.02    # Halve the interval when a metric moves this fraction of its threshold per second
+INTERVAL_BACKOFF = 1.5    # Growth factor per calm tick
+# Pressure gating (Linux PSI/cgroup v2): while nobody is watching, ticks only read the kernel's
+# pressure signals and run the full scan when they rise (or every PRESSURE_FULL_SCAN_INTERVAL).
+# Without PSI every tick scans, as before. PRESSURE_GATE_WATCHED also gates watched ticks.
+PRESSURE_GATING = True
+PRESSURE_GATE_WATCHED = False
 ABSOLUTE_CPU_THRESHOLD = 500.0   
 ABSOLUTE_MEM_THRESHOLD = 3000.0  # Only YouTube + 2+ videos
 YOUTUBE_ANOMALY_PROCESS_COUNT = 8  # 8th YouTube tab triggers anomaly
+TAB_COUNT_COOLDOWN = 30.0  # Seconds between tab count anomalies
+# "rss" counts shared pages once per process (cheap, overstates totals); "uss" (private pages
+# only) or "pss" (shared pages split between sharers) attribute memory accurately but are
+# read under a per-tick budget. Thresholds and tab selection use whichever is active.
+# OSMONITOR_MEMORY_MODE picks it at startup; set_memory_mode() switches it at runtime.
+MEMORY_MODE = os.environ.get("OSMONITOR_MEMORY_MODE", "rss").lower()
+
+# Named process groups, all resolved in ONE process table pass. The first group with a
+# match pattern in the process name claims the process. Names are split into words on
+# anything that is not a letter or digit ("Google Chrome Helper", "chrome.exe", "ms-teams"),
+# and a pattern must match whole consecutive words, so "teams" never claims "steamservice".
+# classifier names an entry in TAB_CLASSIFIERS (None = no tabs, totals only); thresholds
+# are per group.
+TargetGroup = namedtuple('TargetGroup', [
+    'name',
+    'match',            # Lowercase words, or runs of words, of the process name
+    'classifier',
+    'cpu_threshold',
+    'mem_threshold',
+    'tab_threshold',    # None = no tab count anomaly for this group
+])
+
+TARGET_GROUPS = [
+    TargetGroup("chrome", (PROCESS_NAME,), "chromium",
+                ABSOLUTE_CPU_THRESHOLD, ABSOLUTE_MEM_THRESHOLD, YOUTUBE_ANOMALY_PROCESS_COUNT),
+    # Linux names Firefox's child processes by role, cut to the 15-character comm
+    TargetGroup("firefox", ("firefox", "web content", "isolated web co", "webextensions", "privileged cont",
+                            "file content"), "firefox", 500.0, 3000.0, 8),
+    TargetGroup("electron", ("electron", "slack", "discord", "discordptb", "discordcanary", "teams"),
+                "chromium", 300.0, 2000.0, None),
+    TargetGroup("java", ("java", "javaw"), None, 400.0, 4000.0, None),
+]
+PRIMARY_GROUP = "chrome"  # The group the dashboard, baseline, history and detectors follow
 
 non_localhost_tab_count = 0  # Track number of non-localhost Chrome processes (approximate tab count)
 FLASK_APP_PID = os.getpid()  # Current Flask app PID (localhost:5000)
-last_anomaly_time = 0  # Track last anomaly time to prevent spam  
+anomaly_cooldowns = Cooldowns()  # Per-rule last anomaly times to prevent spam
+
+# Localhost URLs in various formats - tabs showing these are the dashboard itself
+LOCALHOST_PATTERNS = [
+    'localhost:5000',
+    '127.0.0.1:5000',
+    'localhost%3a5000',  # URL encoded
+    '127.0.0.1%3a5000',
+    'http://localhost',
+    'http://127.0.0.1',
+]
+
+# Background process types - EXCLUDE these even if they're renderers
+BACKGROUND_TYPES = [
+    '--type=gpu',
+    '--type=utility', 
+    '--type=plugin',
+    '--type=service_worker',
+    '--type=network',
+    '--type=storage',
+    '--type=zygote',
+    '--type=ppapi',
+    '--type=extension',
+    '--type=crash-handler',
+    '--type=broker',
+    '--type=watcher',
+    '--type=devtools',
+    '--type=print',
+]
+
+# One monitored process as read by a single monitoring tick
+ProcInfo = namedtuple('ProcInfo', [
+    'proc',         # psutil.Process handle if the provider had one (see process_handle())
+    'pid',
+    'name',
+    'group',        # TargetGroup name
+    'create_time',
+    'cpu',          # CPU % since the previous snapshot
+    'rss_mb',
+    'mem_mb',       # Attributed memory under MEMORY_MODE (== rss_mb in "rss" mode)
+    'threads',
+    'is_tab',       # Real tab/worker per the group's classifier (>= TAB_MIN_MEMORY_MB)
+    'protected',    # Flask app or a tab showing the localhost dashboard
+])
+
+# Everything one tick knows about one group. Built once, read by every consumer.
+# take_snapshot() returns the PRIMARY_GROUP view with every group in `groups`.
+Snapshot = namedtuple('Snapshot', [
+    'timestamp',
+    'group',
+    'processes',    # tuple of ProcInfo, every process in the group
+    'tabs',         # tuple of ProcInfo, actual browser tabs only
+    'cpu',
+    'memory',
+    'threads',
+    'groups',       # {group name: Snapshot} from the same pass (None on the per-group views)
+])
+
+# What the sampler publishes after each tick - readers never collect anything themselves
+Sample = namedtuple('Sample', [
+    'seq',          # Increases by one per published sample
+    'snapshot',
+    'data',         # get_process_data() result for this snapshot
+    'groups',       # {group name: get_process_data() result} for every target group
+    'system',       # get_system_info() result taken on the same tick
+    'anomalies',    # {(group, rule): anomalous samples since start} - "threshold" or a detector rule
+])
+
+_provider = get_provider()  # Reads the process table (procfs fast path or psutil)
+_snapshot_lock = threading.Lock()
+_last_cpu_times = {}        # (pid, create_time) -> cpu seconds at the previous snapshot
+_last_snapshot_time = None
+if MEMORY_MODE not in MEMORY_MODES:
+    log.warning("unknown OSMONITOR_MEMORY_MODE, using rss", extra=kv(mode=MEMORY_MODE, expected=",".join(MEMORY_MODES)))
+    MEMORY_MODE = "rss"
+_attribution = MemoryAttribution(MEMORY_MODE) if MEMORY_MODE != "rss" else None
+
+# Process type never changes while a process lives, so classify each one once.
+# Keyed by (pid, create_time) so a reused PID never gets a dead process's answer.
+Classification = namedtuple('Classification', ['is_renderer', 'is_localhost'])
+_classification_cache = {}
 
 def find_process():
     """Find Chrome process (returns any Chrome process - we'll scan all in get_process_data)"""
     try:
-        for p in psutil.process_iter(['pid', 'name']):
-            try:
-                if p.info['name'] and PROCESS_NAME.lower() in p.info['name'].lower():
-                    return p
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
+        for info in take_snapshot().processes:
+            p = process_handle(info)
+            if p is not None:
+                return p
     except Exception as e:
-        print(f"[ERROR] Finding process: {e}")
+        log.error("finding process failed: %s", e)
     return None
 
 def is_protected_process(p):
@@ -47,85 +189,291 @@ def is_protected_process(p):
         # Protect Chrome tabs displaying localhost (the dashboard)
         if PROCESS_NAME.lower() in p.name().lower():
             try:
-                cmdline = p.cmdline()
-                cmdline_str = ' '.join(cmdline).lower()
-                
-                # Check for localhost URLs in various formats
-                localhost_patterns = [
-                    'localhost:5000',
-                    '127.0.0.1:5000',
-                    'localhost%3a5000',  # URL encoded
-                    '127.0.0.1%3a5000',
-                    'http://localhost',
-                    'http://127.0.0.1',
-                ]
-                
-                for pattern in localhost_patterns:
-                    if pattern in cmdline_str:
-                        print(f"[PROTECTED] Tab PID={p.pid} is displaying localhost dashboard")
-                        return True
+                if classify_process(p).is_localhost:
+                    log.debug("tab is displaying the localhost dashboard", extra=kv(pid=p.pid))
+                    return True
             except:
-                pass
+                perf.count("swallowed.is_protected_process")
     except:
-        pass
+        perf.count("swallowed.is_protected_process")
+    return False
+
+def is_localhost_cmdline(cmdline_str):
+    """Check a lowercased command line for localhost dashboard URLs"""
+    for pattern in LOCALHOST_PATTERNS:
+        if pattern in cmdline_str:
+            return True
     return False
 
-def get_all_chrome_processes():
+def is_renderer_cmdline(cmdline_str):
+    """Check a lowercased command line for a foreground renderer (tab candidate)"""
+    # MUST be a renderer process to be considered a tab
+    if '--type=renderer' not in cmdline_str:
+        return False
+    
+    # Check if it's a background process type
+    for bg_type in BACKGROUND_TYPES:
+        if bg_type in cmdline_str:
+            return False
+    return True
+
+def is_firefox_tab_cmdline(cmdline_str):
+    """Check a lowercased command line for a Firefox web content (tab) process"""
+    return '-contentproc' in cmdline_str and cmdline_str.endswith(' tab')
+
+TAB_CLASSIFIERS = {
+    "chromium": is_renderer_cmdline,   # Chrome, Edge, Electron apps
+    "firefox": is_firefox_tab_cmdline,
+}
+
+def get_target_group(name=None):
+    """Look up a TargetGroup by name (default: PRIMARY_GROUP)"""
+    name = name or PRIMARY_GROUP
+    for group in TARGET_GROUPS:
+        if group.name == name:
+            return group
+    return None
+
+_NAME_SEPARATORS = re.compile(r"[^a-z0-9]+")
+
+@lru_cache(maxsize=4096)
+def match_target_group(process_name):
+    """First TargetGroup with a match pattern among the process name's words (cached per name)"""
+    # Padding turns "whole consecutive words" into a plain substring test
+    words = f" {' '.join(_NAME_SEPARATORS.split(process_name.lower()))} "
+    for group in TARGET_GROUPS:
+        for pattern in group.match:
+            if f" {pattern} " in words:
+                return group
+    return None
+
+def classify_process(p, create_time=None, classifier="chromium"):
+    """Classify a process from its command line (cached per process lifetime)"""
+    if create_time is None:
+        create_time = p.create_time()
+    return _classify((p.pid, create_time), classifier, lambda: ' '.join(p.cmdline()).lower())
+
+def _classify(key, classifier, read_cmdline):
+    """Cached classification for key=(pid, create_time); read_cmdline() only runs on a miss"""
+    cached = _classification_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    cmdline_str = read_cmdline()
+    is_tab_cmdline = TAB_CLASSIFIERS.get(classifier)
+    classification = Classification(
+        is_renderer=bool(is_tab_cmdline and is_tab_cmdline(cmdline_str)),
+        is_localhost=is_localhost_cmdline(cmdline_str),
+    )
+    _classification_cache[key] = classification
+    return classification
+
+def get_provider_name():
+    return _provider.name
+
+def default_pressure_gate():
+    """PressureGate for the real machine, or None (gating off, no PSI, or a synthetic provider)"""
+    if not PRESSURE_GATING or _provider.name == "synthetic":
+        return None
+    gate = PressureGate()
+    if not gate.available:
+        log.info("pressure stall information unavailable, scanning every tick")
+        return None
+    return gate
+
+def set_provider(provider):
+    """Swap the process table provider (drops per-process state tied to the old one)"""
+    global _provider, _last_cpu_times, _last_snapshot_time, _attribution
+    with _snapshot_lock:
+        _provider = provider
+        _last_cpu_times = {}
+        _last_snapshot_time = None
+        _classification_cache.clear()
+        if _attribution is not None:
+            _attribution = MemoryAttribution(_attribution.mode, _attribution.budget)
+
+def set_memory_mode(mode, budget=None):
+    """Switch memory attribution: "rss", "uss" or "pss" (budget = seconds per tick)"""
+    global MEMORY_MODE, _attribution
+    if mode not in MEMORY_MODES:
+        raise ValueError(f"Unknown memory mode {mode!r}, expected one of {MEMORY_MODES}")
+    with _snapshot_lock:
+        if mode == "rss":
+            _attribution = None
+        else:
+            _attribution = MemoryAttribution(mode, budget) if budget is not None else MemoryAttribution(mode)
+        MEMORY_MODE = mode
+
+def get_memory_attribution():
+    """-> {"mode", "coverage"} - coverage is the share of processes measured so far"""
+    attribution = _attribution
+    return {
+        "mode": MEMORY_MODE,
+        # _last_cpu_times holds every process seen by the latest pass
+        "coverage": round(attribution.coverage(list(_last_cpu_times)), 3) if attribution is not None else 1.0,
+    }
+
+def process_handle(info):
+    """psutil.Process for a ProcInfo, created on demand (None if it exited or the PID was reused)"""
+    if info.proc is not None:
+        return info.proc
+    return _provider.process(info.pid, info.create_time)
+
+def get_all_chrome_processes(snapshot=None):
     """Get ALL Chrome processes"""
-    chrome_procs = []
+    if snapshot is None:
+        snapshot = take_snapshot()
+    handles = [process_handle(info) for info in snapshot.processes]
+    return [p for p in handles if p is not None]
+
+def _enumerate(provider):
+    """Stage 1: read every monitored process from the provider -> [(TargetGroup, RawProc)]"""
+    return list(provider.scan(match_target_group))
+
+def _classify_all(provider, enumerated):
+    """Stage 2: attach the (cached) classification -> [(TargetGroup, RawProc, Classification)]"""
+    classified = []
+    hits = gone = 0
+    for group, raw in enumerated:
+        key = (raw.pid, raw.create_time)
+        if key in _classification_cache:
+            hits += 1
+        try:
+            # Only new processes pay for cmdline() and the pattern scans
+            classification = _classify(key, group.classifier, lambda: provider.cmdline(raw.pid))
+        except GONE_ERRORS:
+            gone += 1
+            continue
+        classified.append((group, raw, classification))
+    # Counted once per pass - the probes must stay cheap at 10k processes
+    perf.count("classify.cache_hits", hits)
+    perf.count("classify.cache_misses", len(enumerated) - hits)
+    perf.count("classify.processes_gone", gone)
+    return classified
+
+def _aggregate(classified, elapsed):
+    """Stage 3: CPU % deltas and per-group ProcInfo lists -> ({group: [ProcInfo]}, cpu_times)"""
+    cpu_times = {}
+    by_group = {group.name: [] for group in TARGET_GROUPS}
+    
+    for group, raw, classification in classified:
+        # CPU % is the CPU time used since the previous snapshot, like cpu_percent()
+        key = (raw.pid, raw.create_time)
+        cpu_times[key] = raw.cpu_time
+        previous = _last_cpu_times.get(key)
+        cpu = 0.0
+        if previous is not None and elapsed:
+            cpu = max(raw.cpu_time - previous, 0.0) / elapsed * 100
+        
+        by_group[group.name].append(ProcInfo(
+            proc=raw.handle,
+            pid=raw.pid,
+            name=raw.name,
+            group=group.name,
+            create_time=raw.create_time,
+            cpu=cpu,
+            rss_mb=raw.rss_mb,
+            mem_mb=_attribution.memory(key, raw.rss_mb) if _attribution is not None else raw.rss_mb,
+            threads=raw.threads,
+            is_tab=classification.is_renderer and raw.rss_mb >= TAB_MIN_MEMORY_MB,
+            protected=raw.pid == FLASK_APP_PID or classification.is_localhost,
+        ))
+    return by_group, cpu_times
+
+def _build_snapshot(by_group, now):
+    """Stage 4: per-group totals -> the PRIMARY_GROUP Snapshot with every group attached"""
+    groups = {}
+    for group_name, processes in by_group.items():
+        groups[group_name] = Snapshot(
+            timestamp=now,
+            group=group_name,
+            processes=tuple(processes),
+            tabs=tuple(info for info in processes if info.is_tab),
+            cpu=sum(info.cpu for info in processes),
+            memory=sum(info.mem_mb for info in processes),
+            threads=sum(info.threads for info in processes),
+            groups=None,
+        )
+    
+    primary = groups.get(PRIMARY_GROUP) or next(iter(groups.values()))
+    return primary._replace(groups=groups)
+
+def _scan(provider, elapsed):
+    """One provider pass -> ({group: [ProcInfo]}, {(pid, create_time): cpu seconds})"""
+    with perf.probe("snapshot.enumerate"):
+        enumerated = _enumerate(provider)
+    with perf.probe("snapshot.classify"):
+        classified = _classify_all(provider, enumerated)
+    if _attribution is not None:
+        with perf.probe("snapshot.attribution"):
+            _attribution.refresh(provider, {(raw.pid, raw.create_time) for _, raw, _ in classified})
+    with perf.probe("snapshot.aggregate"):
+        result = _aggregate(classified, elapsed)
+    perf.count("snapshot.processes_scanned", len(enumerated))
+    return result
+
+def _collect_snapshot():
+    """Walk the process table once through the provider"""
+    global _provider, _last_cpu_times, _last_snapshot_time
+    
+    now = time.time()
+    elapsed = now - _last_snapshot_time if _last_snapshot_time else None
+    by_group = {group.name: [] for group in TARGET_GROUPS}
+    cpu_times = {}
+    
     try:
-        for p in psutil.process_iter(['pid', 'name']):
-            try:
-                if p.info['name'] and PROCESS_NAME.lower() in p.info['name'].lower():
-                    chrome_procs.append(p)
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
+        by_group, cpu_times = _scan(_provider, elapsed)
     except Exception as e:
-        print(f"[ERROR] Getting Chrome processes: {e}")
-    return chrome_procs
+        perf.count("snapshot.scan_errors")
+        if isinstance(_provider, PsutilProvider):
+            log.error("getting monitored processes failed: %s", e)
+        else:
+            # Fast path broke (unexpected /proc layout, ...) - psutil always works
+            log.warning("%s provider failed (%s), falling back to psutil", _provider.name, e)
+            _provider = PsutilProvider()
+            _last_cpu_times = {}
+            _classification_cache.clear()
+            return _collect_snapshot()
+    
+    # Evict processes that have exited (cpu_times has every process seen this pass)
+    for key in [key for key in list(_classification_cache) if key not in cpu_times]:
+        del _classification_cache[key]
+    
+    _last_cpu_times = cpu_times
+    _last_snapshot_time = now
+    
+    with perf.probe("snapshot.build"):
+        return _build_snapshot(by_group, now)
+
+def take_snapshot():
+    """Take one immutable snapshot of ALL target groups (single process table walk)"""
+    waited = time.perf_counter()
+    with _snapshot_lock:
+        # A slow tick can hide behind another caller's scan (e.g. /kill_process)
+        perf.observe("snapshot.lock_wait", time.perf_counter() - waited)
+        with perf.probe("snapshot.total"):
+            if _last_snapshot_time is None:
+                # CPU % needs two readings - prime the counters on the very first tick
+                _collect_snapshot()
+                time.sleep(0.1)
+            return _collect_snapshot()
 
 def is_chrome_tab_process(p):
     """Identify if a Chrome process is an actual BROWSER TAB (renderer process)
     VERY STRICT filtering - only count actual user-visible tabs
     """
     try:
-        # Get command line arguments to check process type
-        cmdline = p.cmdline()
-        cmdline_str = ' '.join(cmdline).lower()
-        
-        # MUST be a renderer process to be considered a tab
-        if '--type=renderer' not in cmdline_str:
+        # Process type comes from the command line (classified once per process)
+        if not classify_process(p).is_renderer:
             return False
         
-        # Background process types - EXCLUDE these even if they're renderers
-        background_types = [
-            '--type=gpu',
-            '--type=utility', 
-            '--type=plugin',
-            '--type=service_worker',
-            '--type=network',
-            '--type=storage',
-            '--type=zygote',
-            '--type=ppapi',
-            '--type=extension',
-            '--type=crash-handler',
-            '--type=broker',
-            '--type=watcher',
-            '--type=devtools',
-            '--type=print',
-        ]
-        
-        # Check if it's a background process type
-        for bg_type in background_types:
-            if bg_type in cmdline_str:
-                return False
-        
         # Only count if it has significant memory usage (real tabs use memory)
         try:
             mem_mb = p.memory_info().rss / (1024 * 1024)
-            if mem_mb < 50:  # Less than 50MB is likely a background renderer
+            if mem_mb < TAB_MIN_MEMORY_MB:  # Likely a background renderer
                 return False
         except:
+            perf.count("swallowed.is_chrome_tab_process")
             return False
         
         # If we get here, it's likely a real browser tab
@@ -134,183 +482,116 @@ def is_chrome_tab_process(p):
     except (psutil.NoSuchProcess, psutil.AccessDenied):
         return False
     except Exception as e:
+        perf.count("swallowed.is_chrome_tab_process")
         return False
 
-def get_actual_browser_tabs():
+def get_actual_browser_tabs(snapshot=None):
     """Get ONLY actual browser tabs (renderer processes visible in taskbar)
     Excludes ALL background processes, utilities, workers, extensions, GPU, etc.
     """
-    procs = get_all_chrome_processes()
-    
-    if not procs:
-        return []
-    
-    actual_tabs = []
-    for p in procs:
-        try:
-            if is_chrome_tab_process(p):
-                actual_tabs.append(p)
-        except:
-            pass
-    
-    return actual_tabs
+    if snapshot is None:
+        snapshot = take_snapshot()
+    handles = [process_handle(info) for info in snapshot.tabs]
+    return [p for p in handles if p is not None]
 
-def get_visible_tab_count():
+def get_visible_tab_count(snapshot=None):
     """Count only ACTUAL BROWSER TABS (renderer processes)
     No dummy values, no background processes - ONLY tabs visible in taskbar.
     EXCLUDES localhost tabs from anomaly detection.
     """
-    actual_tabs = get_actual_browser_tabs()
+    if snapshot is None:
+        snapshot = take_snapshot()
+    
+    actual_tabs = snapshot.tabs
     
     # Filter out localhost tabs for anomaly detection
-    non_localhost_tabs = []
-    for p in actual_tabs:
-        try:
-            if not is_protected_process(p):
-                non_localhost_tabs.append(p)
-        except:
-            pass
+    non_localhost_tabs = [info for info in actual_tabs if not info.protected]
     
     tab_count = len(non_localhost_tabs)
     
-    print(f"\n[DEBUG] Total Chrome processes found: {len(get_all_chrome_processes())}")
-    print(f"[DEBUG] Actual browser tabs (renderer): {len(actual_tabs)}")
-    print(f"[DEBUG] Protected tabs (localhost): {len(actual_tabs) - len(non_localhost_tabs)}")
-    print(f"[DEBUG] Non-localhost tabs for anomaly: {tab_count}")
-    
-    print(f"\n[ACTUAL TABS ONLY] Found {len(actual_tabs)} real browser tabs (renderer processes)")
-    print(f"[ANOMALY DETECTION] {tab_count} non-localhost tabs counted (localhost excluded)")
-    for i, p in enumerate(actual_tabs, 1):
-        try:
-            mem = p.memory_info().rss / (1024 * 1024)
-            protected = " (localhost - protected)" if is_protected_process(p) else ""
-            print(f"  {i}. Tab: PID={p.pid}, Memory={mem:.1f}MB{protected}")
-        except:
-            pass
-    print()
+    # Hot path: build nothing unless someone asked for DEBUG
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("tab count", extra=kv(
+            group=snapshot.group,
+            processes=len(snapshot.processes),
+            tabs=len(actual_tabs),
+            protected=len(actual_tabs) - tab_count,
+            counted=tab_count,
+        ))
+        for info in actual_tabs:
+            log.debug("tab", extra=kv(pid=info.pid, memory_mb=round(info.mem_mb, 1), protected=info.protected))
     
     return tab_count
 
-def get_total_chrome_metrics():
+def get_total_chrome_metrics(snapshot=None):
     """Get TOTAL CPU, memory, and threads for ALL Chrome processes"""
-    procs = get_all_chrome_processes()
-    
-    if not procs:
-        return 0, 0, 0
-    
-    total_cpu = 0
-    total_mem = 0
-    total_threads = 0
-    
-    # Call cpu_percent() once first to initialize, then again for actual value
-    for p in procs:
-        try:
-            p.cpu_percent()  # Initialize
-        except:
-            pass
-    
-    time.sleep(0.1)  # Small delay for accurate CPU measurement
-    
-    for p in procs:
-        try:
-            total_cpu += p.cpu_percent()  # Get actual CPU usage
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            pass
-        
-        try:
-            total_mem += p.memory_info().rss / (1024 * 1024)
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            pass
-        
-        try:
-            total_threads += p.num_threads()
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            pass
-    
-    return total_cpu, total_mem, total_threads
-
-def learn_baseline(process):
-    """Learn baseline CPU and memory from ALL Chrome processes"""
-    cpu_samples = []
-    mem_samples = []
+    if snapshot is None:
+        snapshot = take_snapshot()
+    return snapshot.cpu, snapshot.memory, snapshot.threads
 
-    for i in range(BASELINE_SAMPLES):
-        try:
-            cpu, mem, threads = get_total_chrome_metrics()
-            
-            cpu_samples.append(cpu)
-            mem_samples.append(mem)
-            print(f"[BASELINE {i+1}/{BASELINE_SAMPLES}] CPU: {cpu:.2f}%, Memory: {mem:.2f}MB, Threads: {threads}")
-            
-            if i < BASELINE_SAMPLES - 1:  # Don't sleep after last sample
-                time.sleep(1.0)  # Wait 1 second between samples
-        except Exception as e:
-            print(f"[ERROR] Baseline sampling: {e}")
-            continue
+def evaluate_thresholds(target, cpu, mem, visible_tab_count, cooldowns, now, tab_cooldown=TAB_COUNT_COOLDOWN):
+    """The threshold rules for one group's totals -> (status, reason)
+    Pure apart from `cooldowns` (marked when the tab count rule fires), so replay.py can
+    run recorded samples through exactly what the live monitor runs.
+    """
+    # Simple thresholds (per target group)
+    cpu_anomaly = cpu > target.cpu_threshold
+    mem_anomaly = mem > target.mem_threshold
+    # YouTube tab anomaly: too many VISIBLE tabs (not background processes, excludes localhost)
+    youtube_anomaly = target.tab_threshold is not None and visible_tab_count >= target.tab_threshold
 
-    try:
-        avg_cpu = statistics.mean(cpu_samples) if cpu_samples else 5.0
-        avg_mem = statistics.mean(mem_samples) if mem_samples else 150.0
-        
-        # Ensure minimums
-        avg_cpu = max(avg_cpu, 5.0)
-        avg_mem = max(avg_mem, 300.0)
+    status = "NORMAL"
+    reason = "Process operating normally"
 
-        print(f"[BASELINE FINAL] Avg CPU: {avg_cpu:.2f}%, Avg Memory: {avg_mem:.2f}MB\n")
-        return avg_cpu, avg_mem
-    except Exception as e:
-        print(f"[ERROR] Calculating baseline: {e}")
-        return 5.0, 300.0
+    # Prevent anomaly spam - wait tab_cooldown seconds between tab count anomalies
+    tab_rule_ready = cooldowns.ready(f"{target.name}_tab_count", tab_cooldown, now)
+    
+    if (cpu_anomaly and mem_anomaly) or (youtube_anomaly and tab_rule_ready):
+        status = "ANOMALY"
+        if cpu_anomaly and mem_anomaly:
+            reason = f"HIGH CPU & MEMORY: CPU {cpu:.1f}% + Memory {mem:.1f}MB (Visible tabs: {visible_tab_count})"
+        elif cpu_anomaly:
+            reason = f"HIGH CPU: {cpu:.1f}% (threshold: {target.cpu_threshold}%) - {visible_tab_count} visible tabs"
+        elif mem_anomaly:
+            reason = f"HIGH MEMORY: {mem:.1f}MB (threshold: {target.mem_threshold}MB) - {visible_tab_count} visible tabs"
+        elif youtube_anomaly:
+            reason = f"HIGH TAB COUNT: {visible_tab_count} VISIBLE tabs detected ({target.tab_threshold}+ tab anomaly) - Recommended: Close most recent YouTube tab"
+            cooldowns.mark(f"{target.name}_tab_count", now)
+    return status, reason
 
-def get_process_data(process, avg_cpu, avg_mem):
-    """Get current process data and detect anomalies (from ALL Chrome processes)"""
-    global last_anomaly_time
+def get_process_data(process, avg_cpu, avg_mem, snapshot=None, target=None):
+    """Get current process data and detect anomalies (from ALL processes of one group)"""
     try:
+        # One process table walk feeds every metric below
+        if snapshot is None:
+            snapshot = take_snapshot()
+        if target is None:
+            target = get_target_group(snapshot.group)
+        
         # Get TOTAL metrics for all Chrome processes
-        cpu, mem, threads = get_total_chrome_metrics()
+        cpu, mem, threads = get_total_chrome_metrics(snapshot)
         
         # Count VISIBLE TABS ONLY (filters background processes and localhost)
-        visible_tab_count = get_visible_tab_count()
-
-        # Simple thresholds
-        cpu_anomaly = cpu > ABSOLUTE_CPU_THRESHOLD
-        mem_anomaly = mem > ABSOLUTE_MEM_THRESHOLD
-        # YouTube tab anomaly: 3+ VISIBLE tabs (not background processes, excludes localhost)
-        youtube_anomaly = visible_tab_count >= YOUTUBE_ANOMALY_PROCESS_COUNT
+        visible_tab_count = get_visible_tab_count(snapshot)
 
-        status = "NORMAL"
-        reason = "Process operating normally"
-
-        current_time = time.time()
-        # Prevent anomaly spam - wait 30 seconds between tab count anomalies
-        time_since_last = current_time - last_anomaly_time
-        
-        if (cpu_anomaly and mem_anomaly) or (youtube_anomaly and time_since_last > 30):  # Add cooldown
-            status = "ANOMALY"
-            if cpu_anomaly and mem_anomaly:
-                reason = f"HIGH CPU & MEMORY: CPU {cpu:.1f}% + Memory {mem:.1f}MB (Visible tabs: {visible_tab_count})"
-            elif cpu_anomaly:
-                reason = f"HIGH CPU: {cpu:.1f}% (threshold: {ABSOLUTE_CPU_THRESHOLD}%) - {visible_tab_count} visible tabs"
-            elif mem_anomaly:
-                reason = f"HIGH MEMORY: {mem:.1f}MB (threshold: {ABSOLUTE_MEM_THRESHOLD}MB) - {visible_tab_count} visible tabs"
-            elif youtube_anomaly:
-                reason = f"HIGH TAB COUNT: {visible_tab_count} VISIBLE tabs detected (8+ tab anomaly) - Recommended: Close most recent YouTube tab"
-                last_anomaly_time = current_time  # Update last anomaly time
-            
-            print(f"[ANOMALY DETECTED] {reason}")
-            print(f"[VISIBLE TAB COUNT] {visible_tab_count} actual tabs detected (background processes excluded)")
+        status, reason = evaluate_thresholds(target, cpu, mem, visible_tab_count, anomaly_cooldowns, time.time())
+        if status == "ANOMALY":
+            log.warning("anomaly detected", extra=kv(group=target.name, reason=reason, visible_tabs=visible_tab_count))
         
         return {
+            "group": target.name,
             "cpu": round(cpu, 2),
             "memory": round(mem, 2),
             "threads": threads,
             "status": status,
             "reason": reason,
             "process_count": visible_tab_count,
+            "memory_mode": MEMORY_MODE,
             "note": "Localhost (Flask dashboard) and background processes excluded from monitoring"
         }
     except Exception as e:
-        print(f"[ERROR] Getting process data: {e}")
+        perf.count("swallowed.get_process_data")
+        log.error("getting process data failed: %s", e)
         return {
             "cpu": 0,
             "memory": 0,
@@ -320,61 +601,324 @@ def get_process_data(process, avg_cpu, avg_mem):
             "process_count": 0
         }
 
-def get_timestamp():
-    """Get current timestamp"""
-    return datetime.now().strftime("%H:%M:%S")
+def apply_alerts(data, alerts):
+    """Merge statistical detector alerts into a get_process_data() result"""
+    if not alerts:
+        return data
+    
+    data["alerts"] = [alert._asdict() for alert in alerts]
+    if data["status"] == "NORMAL":
+        data["status"] = "ANOMALY"
+        data["reason"] = "; ".join(alert.reason for alert in alerts)
+        log.warning("statistical anomaly detected", extra=kv(group=data.get("group"),
+                                                               rules=",".join(alert.rule for alert in alerts),
+                                                               reason=data["reason"]))
+    return data
 
-def find_heaviest_child_process(parent_process):
-    """Find the HEAVIEST BROWSER TAB to close
-    ONLY terminates actual browser tabs (renderer processes visible in taskbar)
-    EXCLUDES: localhost, background processes, utilities, workers, extensions, GPU, etc.
+def get_timestamp(ts=None):
+    """Get current timestamp (or format a time.time() value)"""
+    when = datetime.fromtimestamp(ts) if ts is not None else datetime.now()
+    return when.strftime("%H:%M:%S")
+
+def get_system_info():
+    """Get system-wide info without blocking (CPU % is measured since the last call)"""
+    return _provider.system_info()
+
+class Sampler:
+    """Background thread that collects one snapshot per interval and publishes it.
+    HTTP handlers only read latest(), so collection cost is the same for 1 viewer or 50.
     """
-    print("\n[TAB CLOSURE] Looking for heaviest browser tab to close...")
     
-    actual_tabs = get_actual_browser_tabs()
+    def __init__(self, interval=SAMPLE_INTERVAL, history=None, baseline=None, detectors=None, tabs=None,
+                 events=None, recorder=None, publisher=None, pressure=None, adaptive=ADAPTIVE_SAMPLING, min_interval=MIN_SAMPLE_INTERVAL,
+                 max_interval=MAX_SAMPLE_INTERVAL):
+        self.interval = interval            # Current interval (changes when adaptive)
+        self.base_interval = interval       # Calm interval while someone is watching
+        self.adaptive = adaptive
+        self.min_interval = min(min_interval, interval)
+        self.max_interval = max(max_interval, interval)
+        self.history = history if history is not None else MetricHistory()
+        self.detectors = detectors if detectors is not None else DetectorSet()
+        self.tabs = tabs if tabs is not None else TabHistory()   # Per-tab series for /tabs
+        self.events = events    # Optional EventStore - anomalies are recorded when they start
+        self.recorder = recorder    # Optional RecordingWriter - every sample also goes to disk
+        self.publisher = publisher  # Optional SharedPublisher - every sample also goes to the HTTP workers
+        # First-stage detector deciding when a tick needs the full scan (None = always scan)
+        self.pressure = pressure if pressure is not None else default_pressure_gate()
+        # Learned from the samples we take anyway - no request ever waits on it
+        self.baseline = baseline if baseline is not None else Baseline()
+        self._latest = None
+        self._seq = 0
+        self._published = threading.Condition()
+        self._chrome_running = False
+        self._anomalies = {}
+        self._anomalous = set()             # Groups over their thresholds on the last tick
+        self._previous = {}                 # group -> (timestamp, cpu, memory) of the last tick
+        self._viewers = 0                   # Open /stream connections
+        self._last_viewed = time.time()
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._wake = threading.Event()      # Cuts a long idle sleep short when a viewer shows up
+        self._thread = None
     
-    if not actual_tabs:
-        print("[NO TABS FOUND] No actual browser tabs available to close")
-        print("[PROTECTED] All processes are background services or localhost\n")
-        return None
+    def start(self):
+        """Start sampling in a daemon thread (no-op if already running)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="chrome-sampler", daemon=True)
+        self._thread.start()
     
-    # Get memory for each actual tab
-    tab_memory = []
-    for p in actual_tabs:
-        try:
-            if is_protected_process(p):
-                print(f"[PROTECTED] Skipping tab PID={p.pid} (localhost protected)")
-                continue
+    def stop(self, timeout=None):
+        """Ask the sampling thread to finish and wait for it"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+    
+    def latest(self, timeout=None):
+        """Latest published sample; waits for the first one if nothing is published yet"""
+        if self._latest is None:
+            self._ready.wait(timeout)
+        return self._latest
+    
+    def touch(self):
+        """Someone asked for data - leave idle back-off (and wake up now if we were asleep)"""
+        self._last_viewed = time.time()
+        if self.interval > self.base_interval:
+            self.interval = self.base_interval
+            self._wake.set()
+    
+    def add_viewer(self):
+        with self._published:
+            self._viewers += 1
+        self.touch()
+    
+    def remove_viewer(self):
+        with self._published:
+            self._viewers = max(self._viewers - 1, 0)
+        self._last_viewed = time.time()
+    
+    def viewers_active(self):
+        return self._viewers > 0 or time.time() - self._last_viewed < VIEWER_IDLE_TIMEOUT
+    
+    def wait_for_sample(self, after_seq, timeout=None):
+        """Block until a sample newer than after_seq is published (or timeout); returns latest"""
+        with self._published:
+            self._published.wait_for(
+                lambda: self._latest is not None and self._latest.seq > after_seq, timeout)
+            return self._latest
+    
+    def tick(self):
+        """Collect one snapshot and publish it (called by the thread, usable directly too)"""
+        with perf.probe("tick.total"):
+            return self._tick()
+    
+    def _tick(self):
+        if self.pressure is not None and not self._needs_scan():
+            perf.count("tick.quiet")
+            return self._latest
+        
+        snapshot = take_snapshot()
+        
+        chrome_running = bool(snapshot.processes)
+        if self.pressure is not None:
+            # The gate's cgroup signals must describe the browser, not this process
+            browser = min(snapshot.processes, key=lambda info: info.create_time) if chrome_running else None
+            self.pressure.watch(browser.pid if browser is not None else None)
+        if chrome_running and not self._chrome_running and self.baseline.count:
+            log.info("Chrome restarted, relearning baseline")
+            self.baseline.reset()
+        self._chrome_running = chrome_running
+        
+        with perf.probe("tick.process_data"):
+            data = get_process_data(None, self.baseline.cpu, self.baseline.mem, snapshot)
+            data["baseline"] = self.baseline.to_dict()
+            if self.pressure is not None:
+                data["pressure"] = self.pressure.to_dict()
             
-            mem = p.memory_info().rss / (1024 * 1024)
-            tab_memory.append((p, mem))
-        except:
-            pass
+            # Other target groups come from the same pass - static per-group thresholds only
+            groups = {}
+            for name, group_snapshot in snapshot.groups.items():
+                if name == snapshot.group:
+                    groups[name] = data
+                else:
+                    groups[name] = get_process_data(None, None, None, group_snapshot)
+        
+        with perf.probe("tick.system_info"):
+            system = get_system_info()
+        
+        with perf.probe("tick.tabs"):
+            self.tabs.update(snapshot.timestamp, [info for group_snapshot in snapshot.groups.values()
+                                                  for info in group_snapshot.tabs])
+        
+        anomalous = set()
+        for name, group_data in groups.items():
+            if group_data["status"] == "ANOMALY":
+                anomalous.add(name)
+                self._count_anomaly(name, "threshold")
+                if name not in self._anomalous:
+                    self._record_event("anomaly", group_data["reason"], group=name, rule="threshold",
+                                       data={"cpu": group_data["cpu"], "memory": group_data["memory"],
+                                             "tabs": group_data["process_count"]})
+        self._anomalous = anomalous
+        
+        if data["status"] != "ERROR" and chrome_running:
+            self.history.append(snapshot.timestamp, data["cpu"], data["memory"],
+                                data["threads"], data["process_count"])
+            if self.recorder is not None:
+                self._record_sample(snapshot.timestamp, data)
+            with perf.probe("tick.detectors"):
+                alerts = self.detectors.evaluate_history(self.history, snapshot.timestamp)
+            apply_alerts(data, alerts)
+            for alert in alerts:
+                self._count_anomaly(snapshot.group, alert.rule)
+                self._record_event("anomaly", alert.reason, group=snapshot.group, rule=alert.rule,
+                                   data={"column": alert.column, "value": alert.value, "score": alert.score})
+            # Anomalous samples would drag "normal" toward the anomaly
+            if data["status"] == "NORMAL":
+                self.baseline.update(data["cpu"], data["memory"])
+        
+        self.interval = self._next_interval(snapshot, groups)
+        data["sample_interval"] = round(self.interval, 3)
+        
+        with self._published:
+            self._seq += 1
+            # Single reference assignment - readers see the old sample or the new one, never a mix
+            self._latest = Sample(seq=self._seq, snapshot=snapshot, data=data,
+                                  groups=groups, system=system, anomalies=dict(self._anomalies))
+            self._ready.set()
+            self._published.notify_all()
+        if self.publisher is not None:
+            self.publisher.publish(self, self._latest)
+        return self._latest
     
-    if not tab_memory:
-        print("[NO CLOSEABLE TABS] All tabs are protected\n")
-        return None
+    def _needs_scan(self):
+        """Pressure gate for this tick - watched or anomalous ticks always scan"""
+        latest = self._latest
+        force = latest is None or (self.viewers_active() and not PRESSURE_GATE_WATCHED) or any(
+            group_data["status"] == "ANOMALY" for group_data in latest.groups.values())
+        return self.pressure.should_scan(time.time(), force=force)
     
-    # Sort by memory (find heaviest tab)
-    tab_memory.sort(key=lambda x: x[1], reverse=True)
+    def _next_interval(self, snapshot, groups):
+        """Interval until the next tick from threshold proximity, volatility and viewers"""
+        if not self.adaptive:
+            return self.interval
+        
+        near = False        # A group near (or over) its thresholds
+        approaching = 0.0   # Fraction of a threshold climbed per second, worst group near one
+        volatility = 0.0    # Fraction of a threshold moved per second, worst group
+        previous, self._previous = self._previous, {}
+        for name, group_snapshot in snapshot.groups.items():
+            target = get_target_group(name)
+            if not group_snapshot.processes or target is None:
+                continue
+            group_near = groups.get(name, {}).get("status") == "ANOMALY" or max(
+                group_snapshot.cpu / target.cpu_threshold, group_snapshot.memory / target.mem_threshold) >= NEAR_THRESHOLD
+            near = near or group_near
+            last = previous.get(name)
+            if last is not None:
+                dt = max(group_snapshot.timestamp - last[0], 1e-3)
+                cpu_rate = (group_snapshot.cpu - last[1]) / target.cpu_threshold / dt
+                mem_rate = (group_snapshot.memory - last[2]) / target.mem_threshold / dt
+                volatility = max(volatility, abs(cpu_rate), abs(mem_rate))
+                if group_near:
+                    approaching = max(approaching, cpu_rate, mem_rate)
+            self._previous[name] = (group_snapshot.timestamp, group_snapshot.cpu, group_snapshot.memory)
+        
+        watched = self.viewers_active()
+        # Sitting near a threshold is only worth fast ticks if someone sees them or it is still climbing
+        if near and (watched or approaching >= APPROACH_RATE):
+            return self.min_interval
+        if volatility >= VOLATILITY_FAST:
+            return max(self.interval / 2, self.min_interval)
+        # With a pressure gate, unwatched ticks are cheap - keep checking at the watched rate
+        ceiling = self.base_interval if watched or self.pressure is not None else self.max_interval
+        return min(self.interval * INTERVAL_BACKOFF, ceiling) if self.interval < ceiling else ceiling
     
-    print(f"[ACTUAL TABS] Found {len(tab_memory)} real browser tabs:")
-    for i, (p, mem) in enumerate(tab_memory, 1):
+    def _record_sample(self, ts, data):
         try:
-            label = "← WILL CLOSE" if i == 1 else ""
-            print(f"  {i}. {mem:.1f}MB {label}")
-        except:
-            pass
+            with perf.probe("tick.recording"):
+                self.recorder.append(ts, data["cpu"], data["memory"], data["threads"], data["process_count"])
+        except OSError as e:
+            # A full disk must not stop monitoring - stop recording instead
+            log.error("recording failed, disabling it: %s", e)
+            self.recorder = None
     
-    # Return the heaviest tab
-    if tab_memory:
-        heaviest_p, heaviest_mem = tab_memory[0]
-        try:
-            print(f"[TARGET] Closing heaviest tab: PID={heaviest_p.pid}, Memory={heaviest_mem:.1f}MB")
-        except:
-            pass
-        print()
-        return heaviest_p
+    def _record_event(self, kind, message, **fields):
+        if self.events is not None:
+            self.events.record(kind, message, **fields)
     
-    print()
-    return None
+    def _count_anomaly(self, group, rule):
+        key = (group, rule)
+        self._anomalies[key] = self._anomalies.get(key, 0) + 1
+    
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.time()
+            try:
+                self.tick()
+            except Exception as e:
+                perf.count("tick.errors")
+                log.exception("sampler tick failed: %s", e)
+            elapsed = time.time() - started
+            if elapsed > self.interval:
+                perf.count("tick.overruns")
+                log.warning("sampler tick overran its interval", extra=kv(elapsed=round(elapsed, 3),
+                                                                        interval=self.interval))
+            self._wake.wait(max(self.interval - elapsed, 0))
+            self._wake.clear()
+
+def find_heaviest_tab(snapshot=None):
+    """Find the HEAVIEST BROWSER TAB to close -> ProcInfo (or None)
+    ONLY considers actual browser tabs (renderer processes visible in taskbar)
+    EXCLUDES: localhost, background processes, utilities, workers, extensions, GPU, etc.
+    """
+    if snapshot is None:
+        snapshot = take_snapshot()
+    actual_tabs = snapshot.tabs
+    
+    if not actual_tabs:
+        log.info("no browser tabs available to close (all background services or localhost)")
+        return None
+    
+    # Memory for each actual tab was read with the snapshot
+    tab_memory = []
+    for info in actual_tabs:
+        if info.protected:
+            log.debug("skipping protected tab", extra=kv(pid=info.pid))
+            continue
+        tab_memory.append((info, info.mem_mb))
+    
+    if not tab_memory:
+        log.info("no closeable tabs: all tabs are protected")
+        return None
+    
+    # One pass for the heaviest tab - no need to sort them all
+    heaviest, heaviest_mem = max(tab_memory, key=lambda x: x[1])
+    log.info("heaviest tab selected", extra=kv(pid=heaviest.pid, memory_mb=round(heaviest_mem, 1),
+                                              candidates=len(tab_memory)))
+    return heaviest
+
+def find_heaviest_child_process(parent_process, snapshot=None):
+    """Find the HEAVIEST BROWSER TAB to close -> process handle (or None)"""
+    heaviest = find_heaviest_tab(snapshot)
+    return process_handle(heaviest) if heaviest is not None else None
+
+def close_tab(info):
+    """Terminate one tab through the provider -> (success, method used / error message)"""
+    if info.protected or info.pid == FLASK_APP_PID:
+        return False, "protected"
+    return _provider.terminate(info.pid, info.create_time)
+
+def close_tabs(infos):
+    """Terminate several tabs concurrently (one bounded wait) -> {pid: (success, method / error)}"""
+    results = {}
+    allowed = []
+    for info in infos:
+        if info.protected or info.pid == FLASK_APP_PID:
+            results[info.pid] = (False, "protected")
+        else:
+            allowed.append((info.pid, info.create_time))
+    results.update(_provider.terminate_many(allowed))
+    return results
@@ -0,0 +1,101 @@
+import json
+import threading
+from collections import OrderedDict, namedtuple
+
+DATA_DELTA_DEPTH = 64   # Recent samples per group a ?since_seq= delta can start from
+
+# One /data document for one sample and group, serialized once for every request
+Payload = namedtuple('Payload', [
+    'seq',
+    'etag',
+    'status',       # HTTP status build_data() chose
+    'body',         # Serialized document
+    'data',         # The document itself (delta base for later samples)
+    'tabs',         # {pid (str): {name, memory, cpu}} of the group's counted tabs
+    'deltas',       # {since_seq: serialized delta} built so far
+])
+
+
+def sample_etag(sample, group):
+    """seq alone repeats after a restart - the snapshot time tells the runs apart"""
+    return f"{sample.seq}-{int(sample.snapshot.timestamp * 1000):x}-{group}"
+
+
+def tab_fields(snapshot):
+    return {str(info.pid): {"name": info.name, "memory": round(info.mem_mb, 2), "cpu": round(info.cpu, 2)}
+            for info in snapshot.tabs if not info.protected}
+
+
+class PayloadCache:
+    """/data bodies per (sample, group), plus the recent ones ?since_seq= deltas are taken against"""
+
+    def __init__(self, build, dumps, depth=DATA_DELTA_DEPTH):
+        self._build = build     # (sample, group) -> (document, status)
+        self._dumps = dumps
+        self.depth = depth
+        self._recent = {}       # group -> OrderedDict(seq -> Payload), oldest first
+        self._frames = {}       # group -> (etag, SSE frame) of the latest sample streamed
+        self._lock = threading.Lock()
+
+    def get(self, sample, group):
+        """Payload for this sample and group (built on the first request for it)"""
+        etag = sample_etag(sample, group)
+        with self._lock:
+            recent = self._recent.get(group)
+            payload = recent.get(sample.seq) if recent else None
+            if payload is not None and payload.etag == etag:
+                return payload
+            data, status = self._build(sample, group)
+            snapshot = sample.snapshot.groups.get(group)
+            payload = Payload(seq=sample.seq, etag=etag, status=status, body=self._dumps(data), data=data,
+                              tabs=tab_fields(snapshot) if snapshot is not None else {}, deltas={})
+            if group not in sample.groups:
+                # Unknown group names come straight from the query string - never keep them
+                return payload
+            if recent is None or (recent and next(reversed(recent)) >= sample.seq):
+                # First request for the group, or the sampler restarted and seq began again
+                recent = self._recent[group] = OrderedDict()
+            recent[sample.seq] = payload
+            while len(recent) > self.depth:
+                recent.popitem(last=False)
+            return payload
+
+    def frame(self, payload, group):
+        """/stream event for payload's sample - built once, whatever the number of open streams"""
+        with self._lock:
+            cached = self._frames.get(group)
+            if cached is not None and cached[0] == payload.etag:
+                return cached[1]
+            data = dict(payload.data)
+            data.pop("note", None)  # Constant text - the page already shows it
+            # Plain json.dumps: an SSE data line must not contain newlines (app dumps may indent)
+            frame = f"id: {payload.seq}\ndata: {json.dumps(data)}\n\n".encode()
+            if group in self._recent:
+                self._frames[group] = (payload.etag, frame)
+            return frame
+
+    def delta(self, payload, since_seq, group):
+        """Serialized changes from sample since_seq to payload's sample.
+        full is true (and everything is listed) when since_seq is no longer held.
+        """
+        with self._lock:
+            body = payload.deltas.get(since_seq)
+            if body is not None:
+                return body
+            recent = self._recent.get(group)
+            base = recent.get(since_seq) if recent else None
+            base_data, base_tabs = (base.data, base.tabs) if base is not None else ({}, {})
+            body = self._dumps({
+                "seq": payload.seq,
+                "since_seq": since_seq,
+                "full": base is None,
+                "changed": {key: value for key, value in payload.data.items() if base_data.get(key) != value},
+                "removed": [key for key in base_data if key not in payload.data],
+                "tabs": {
+                    "changed": {pid: fields for pid, fields in payload.tabs.items() if base_tabs.get(pid) != fields},
+                    "closed": [pid for pid in base_tabs if pid not in payload.tabs],
+                },
+            })
+            if base is not None or len(payload.deltas) < self.depth:
+                payload.deltas[since_seq] = body
+            return body
@@ -0,0 +1,125 @@
+import bisect
+import os
+import threading
+import time
+
+PERF_ENABLED = os.environ.get("OSMONITOR_PERF", "1") != "0"  # Probes cost ~1us; set to 0 to skip them entirely
+# Upper bounds (ms) of the latency buckets - fixed, so recording never allocates
+BUCKET_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_started = time.time()
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (counts per BUCKET_BOUNDS_MS bucket, plus overflow)"""
+
+    __slots__ = ('counts', 'count', 'total', 'max', 'last')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.last = ms
+        if ms > self.max:
+            self.max = ms
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (None above the last bound)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKET_BOUNDS_MS, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return None
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 4) if self.count else None,
+            "max_ms": round(self.max, 4),
+            "last_ms": round(self.last, 4),
+            "p50_le_ms": self.quantile(0.50),
+            "p99_le_ms": self.quantile(0.99),
+            # Cumulative, Prometheus style: observations <= each bound
+            "buckets": dict(zip([str(bound) for bound in BUCKET_BOUNDS_MS] + ["+Inf"],
+                                _cumulative(self.counts))),
+        }
+
+
+def _cumulative(counts):
+    total = 0
+    out = []
+    for n in counts:
+        total += n
+        out.append(total)
+    return out
+
+
+def observe(name, seconds):
+    """Record one duration (seconds) into the histogram `name`"""
+    if not PERF_ENABLED:
+        return
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.observe(seconds * 1000.0)
+
+
+def count(name, n=1):
+    """Add n to the counter `name`"""
+    if not PERF_ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+class probe:
+    """Time a block into a histogram: `with probe("snapshot.enumerate"): ...`"""
+
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.started)
+        return False
+
+
+def snapshot():
+    """Every histogram and counter as plain JSON-ready dicts"""
+    with _lock:
+        return {
+            "enabled": PERF_ENABLED,
+            "uptime": round(time.time() - _started, 1),
+            "bucket_bounds_ms": list(BUCKET_BOUNDS_MS),
+            "timings": {name: h.to_dict() for name, h in sorted(_histograms.items())},
+            "counters": dict(sorted(_counters.items())),
+        }
+
+
+def reset():
+    """Forget everything recorded so far"""
+    global _started
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _started = time.time()
@@ -0,0 +1,183 @@
+import os
+from logsetup import get_logger, kv
+import perf
+
+log = get_logger("pressure")
+
+PSI_ROOT = "/proc/pressure"
+PROC_ROOT = "/proc"
+CGROUP_ROOT = "/sys/fs/cgroup"
+# cgroup v2 directory to watch; unset = the monitored browser's cgroup (none while it is not running)
+PRESSURE_CGROUP = os.environ.get("OSMONITOR_CGROUP")
+
+PSI_MEMORY_SOME = 5.0       # % of the last 10s some task stalled on memory - at or above it, scan
+PSI_CPU_SOME = 50.0         # Same for CPU (runnable but waiting)
+PSI_RISE = 2.0              # avg10 rise in points since the last scan that also counts as pressure
+CGROUP_MEMORY_HIGH = 0.9    # memory.current / memory.max at or above this counts as pressure
+PRESSURE_FULL_SCAN_INTERVAL = 30.0  # Seconds between scans while everything is quiet
+
+# memory.events counters whose increase means the cgroup hit (or went over) a limit
+CGROUP_PRESSURE_EVENTS = ("high", "max", "oom", "oom_kill")
+
+
+def read_psi(resource, root=PSI_ROOT):
+    """{"some": avg10, "full": avg10} from /proc/pressure/<resource>, None if unavailable"""
+    try:
+        with open(os.path.join(root, resource)) as f:
+            text = f.read()
+    except OSError:
+        # Not Linux, kernel < 4.20, or booted with psi=0 (the file exists but reads fail)
+        return None
+    result = {}
+    for line in text.splitlines():
+        kind, _, fields = line.partition(" ")
+        for field in fields.split():
+            key, _, value = field.partition("=")
+            if key == "avg10":
+                result[kind] = float(value)
+    return result if "some" in result else None
+
+
+def find_cgroup(pid="self", root=CGROUP_ROOT, proc_root=PROC_ROOT):
+    """A process's cgroup v2 directory that accounts memory (walking up), None if there is none"""
+    try:
+        with open(os.path.join(proc_root, str(pid), "cgroup")) as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    path = next((line[3:] for line in lines if line.startswith("0::")), None)
+    if path is None:
+        return None
+    for base in (root, os.path.join(root, "unified")):
+        current = path
+        while True:
+            candidate = os.path.join(base, current.lstrip("/"))
+            if os.path.exists(os.path.join(candidate, "memory.current")):
+                return candidate
+            if current in ("", "/"):
+                break
+            current = os.path.dirname(current)
+    return None
+
+
+def read_cgroup(path):
+    """(current bytes, limit bytes or None, {event: count}) for a cgroup v2 directory"""
+    with open(os.path.join(path, "memory.current")) as f:
+        current = int(f.read())
+    try:
+        with open(os.path.join(path, "memory.max")) as f:
+            value = f.read().strip()
+        limit = None if value == "max" else int(value)
+    except OSError:
+        limit = None
+    events = {}
+    try:
+        with open(os.path.join(path, "memory.events")) as f:
+            for line in f:
+                key, _, value = line.partition(" ")
+                events[key] = int(value)
+    except OSError:
+        pass
+    return current, limit, events
+
+
+class PressureGate:
+    """First-stage detector: a few small kernel files per tick decide whether the full
+    per-process scan is needed. Quiet system -> scan only every full_scan_interval.
+    Without PSI, available is False and callers should scan every tick as before.
+    PSI is system-wide; the cgroup signals come from the browser's cgroup (see watch()),
+    or from `cgroup` when one is given. Without either, only system-wide PSI counts.
+    """
+
+    def __init__(self, psi_root=PSI_ROOT, cgroup=PRESSURE_CGROUP, full_scan_interval=PRESSURE_FULL_SCAN_INTERVAL,
+                 cgroup_root=CGROUP_ROOT, proc_root=PROC_ROOT):
+        self.psi_root = psi_root
+        self.cgroup_root = cgroup_root
+        self.proc_root = proc_root
+        self.full_scan_interval = full_scan_interval
+        self.available = read_psi("memory", psi_root) is not None
+        self.reading = {}           # Latest signals, for /debug and the published sample
+        self.reason = None          # Why the last scan ran
+        self._at_scan = None        # Signals when the last scan ran (rises are measured from here)
+        self._last_scan = None
+        self._pinned = cgroup is not None   # Explicit cgroup: watch() leaves it alone
+        self._watched_pid = None
+        self.cgroup = self._usable(cgroup)
+
+    def _usable(self, cgroup):
+        if cgroup is None:
+            return None
+        try:
+            read_cgroup(cgroup)
+        except (OSError, ValueError) as e:
+            log.info("cgroup memory signals unavailable: %s", e, extra=kv(cgroup=cgroup))
+            return None
+        return cgroup
+
+    def watch(self, pid):
+        """Take the cgroup signals from the cgroup of pid, the monitored browser (None = not running)"""
+        if self._pinned or pid == self._watched_pid:
+            return
+        self._watched_pid = pid
+        cgroup = self._usable(find_cgroup(pid, self.cgroup_root, self.proc_root)) if pid is not None else None
+        if cgroup != self.cgroup:
+            log.info("watching cgroup", extra=kv(cgroup=cgroup, pid=pid))
+            self.cgroup = cgroup
+            if self._at_scan:
+                # Event counters of another cgroup are no baseline for this one
+                self._at_scan = {key: value for key, value in self._at_scan.items() if not key.startswith("cgroup_")}
+
+    def read(self):
+        """Current signals: PSI avg10 values plus cgroup usage and limit events"""
+        reading = {}
+        for resource in ("memory", "cpu"):
+            psi = read_psi(resource, self.psi_root)
+            if psi is not None:
+                reading[f"{resource}_some"] = psi["some"]
+                if "full" in psi:
+                    reading[f"{resource}_full"] = psi["full"]
+        if self.cgroup is not None:
+            try:
+                current, limit, events = read_cgroup(self.cgroup)
+                reading["cgroup_memory_mb"] = round(current / (1024 * 1024), 1)
+                reading["cgroup_limit_mb"] = round(limit / (1024 * 1024), 1) if limit else None
+                reading["cgroup_usage"] = round(current / limit, 3) if limit else None
+                reading["cgroup_events"] = sum(events.get(key, 0) for key in CGROUP_PRESSURE_EVENTS)
+            except (OSError, ValueError):
+                pass
+        return reading
+
+    def should_scan(self, now, force=False):
+        """Read the signals and decide whether this tick runs the full scan"""
+        with perf.probe("tick.pressure"):
+            reading = self.reading = self.read()
+        reason = "forced" if force else self._pressure(reading, now)
+        if reason is None:
+            return False
+        self.reason = reason
+        self._at_scan = reading
+        self._last_scan = now
+        return True
+
+    def _pressure(self, reading, now):
+        """Why a scan is needed now, or None"""
+        if not self.available or "memory_some" not in reading:
+            return "no psi"
+        if self._last_scan is None or now - self._last_scan >= self.full_scan_interval:
+            return "interval"
+        if reading["memory_some"] >= PSI_MEMORY_SOME:
+            return "memory pressure"
+        if reading.get("cpu_some", 0.0) >= PSI_CPU_SOME:
+            return "cpu pressure"
+        before = self._at_scan or {}
+        for key in ("memory_some", "cpu_some"):
+            if key in reading and reading[key] - before.get(key, reading[key]) >= PSI_RISE:
+                return f"{key.split('_')[0]} pressure rising"
+        if reading.get("cgroup_events", 0) > before.get("cgroup_events", reading.get("cgroup_events", 0)):
+            return "cgroup limit hit"
+        if (reading.get("cgroup_usage") or 0.0) >= CGROUP_MEMORY_HIGH:
+            return "cgroup near limit"
+        return None
+
+    def to_dict(self):
+        return dict(self.reading, scan_reason=self.reason, gating=self.available, cgroup=self.cgroup)
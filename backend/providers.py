@@ -0,0 +1,469 @@
+import os
+import sys
+import time
+import random
+import subprocess
+import psutil
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from logsetup import get_logger
+import perf
+
+log = get_logger("providers")
+
+PROVIDER = "auto"   # "auto" (procfs on Linux, else psutil), "procfs", "psutil" or "synthetic"
+TERMINATE_TIMEOUT = 1.0  # Seconds to wait for a closed process to actually exit
+
+# The attributes one tick needs from a process, however they were read
+RawProc = namedtuple('RawProc', [
+    'pid',
+    'name',
+    'create_time',  # Seconds since the epoch - (pid, create_time) identifies a process
+    'rss_mb',
+    'threads',
+    'cpu_time',     # user + system CPU seconds since the process started
+    'handle',       # psutil.Process if the provider already has one, else None
+])
+
+# Errors that just mean "this process went away (or is not ours to read)" mid-scan
+GONE_ERRORS = (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess,
+               FileNotFoundError, ProcessLookupError, PermissionError)
+
+
+class ProcessProvider(ABC):
+    """Everything the monitor needs from the OS: enumeration, attribute reads, termination.
+    Subclasses implement scan() and cmdline(); the real providers share the rest.
+    """
+
+    name = None
+
+    @abstractmethod
+    def scan(self, match):
+        """Yield (match(name), RawProc) for every process whose name match() accepts"""
+
+    @abstractmethod
+    def cmdline(self, pid):
+        """Lowercased, space-joined command line"""
+
+    def process(self, pid, create_time=None):
+        """psutil.Process handle for a pid (None if it is gone or the pid was reused)"""
+        return _checked_handle(pid, create_time)
+
+    def full_memory(self, pid, create_time=None):
+        """(USS MB, PSS MB or None) - pages only this process holds, and its share of shared ones.
+        Expensive (walks every mapping), so callers budget how many they read per tick.
+        """
+        p = self.process(pid, create_time)
+        if p is None:
+            raise psutil.NoSuchProcess(pid)
+        info = p.memory_full_info()
+        pss = getattr(info, 'pss', None)    # Linux only
+        return info.uss / (1024 * 1024), pss / (1024 * 1024) if pss is not None else None
+
+    def terminate(self, pid, create_time=None, timeout=TERMINATE_TIMEOUT):
+        """Close one process -> (success, method used / error message)"""
+        p = self.process(pid, create_time)
+        if p is None:
+            return True, "already exited"
+
+        # Windows: taskkill is the most reliable way to close a Chrome tab
+        if os.name == "nt":
+            result = subprocess.run(["taskkill", "/PID", str(pid), "/F"],
+                                    capture_output=True, text=True)
+            if result.returncode == 0:
+                return True, "taskkill"
+            log.warning("taskkill failed: %s", result.stderr.strip())
+
+        try:
+            p.kill()
+            p.wait(timeout)
+            return True, "kill"
+        except psutil.NoSuchProcess:
+            return True, "already exited"
+        except Exception as e:
+            # Last resort: gentle terminate
+            perf.count("provider.kill_failures")
+            try:
+                p.terminate()
+                p.wait(timeout)
+                return True, "terminate"
+            except psutil.NoSuchProcess:
+                return True, "already exited"
+            except Exception:
+                return False, str(e)
+
+    def terminate_many(self, targets, timeout=TERMINATE_TIMEOUT):
+        """Close several processes at once: signal all, then ONE bounded wait for the lot.
+        targets: iterable of (pid, create_time) -> {pid: (success, method used / error message)}
+        """
+        results = {}
+        signalled = []
+        for pid, create_time in targets:
+            p = self.process(pid, create_time)
+            if p is None:
+                results[pid] = (True, "already exited")
+                continue
+            try:
+                p.kill()
+                signalled.append(p)
+            except psutil.NoSuchProcess:
+                results[pid] = (True, "already exited")
+            except Exception as e:
+                perf.count("provider.kill_failures")
+                results[pid] = (False, str(e))
+
+        gone, alive = psutil.wait_procs(signalled, timeout=timeout)
+        for p in gone:
+            results[p.pid] = (True, "kill")
+        for p in alive:
+            results[p.pid] = (False, f"still running after {timeout}s")
+        return results
+
+    def system_info(self):
+        """System-wide info without blocking (CPU % is measured since the last call)"""
+        return {
+            "cpu_count": psutil.cpu_count(),
+            "cpu_percent": psutil.cpu_percent(interval=None),
+            "memory_percent": psutil.virtual_memory().percent,
+            "processes": len(psutil.pids())
+        }
+
+
+class PsutilProvider(ProcessProvider):
+    """Portable provider: one psutil.Process.oneshot() per matching process"""
+
+    name = "psutil"
+
+    def scan(self, match):
+        """Yield (match(name), RawProc) for every process whose name match() accepts"""
+        for p in psutil.process_iter(['pid', 'name']):
+            name = p.info['name']
+            target = match(name) if name else None
+            if target is None:
+                continue
+            try:
+                with p.oneshot():
+                    create_time = p.create_time()
+                    rss_mb = p.memory_info().rss / (1024 * 1024)
+                    threads = p.num_threads()
+                    times = p.cpu_times()
+            except GONE_ERRORS:
+                perf.count("provider.processes_gone")
+                continue
+            yield target, RawProc(p.pid, name, create_time, rss_mb, threads,
+                                  times.user + times.system, p)
+
+    def cmdline(self, pid):
+        """Lowercased, space-joined command line"""
+        return ' '.join(psutil.Process(pid).cmdline()).lower()
+
+
+class ProcfsProvider(ProcessProvider):
+    """Linux fast path: parses /proc/<pid>/stat directly into reused buffers.
+    stat alone carries name, threads, utime/stime, start time and RSS, so a
+    process costs one open/read/close per tick; cmdline is only read when the
+    classification cache misses.
+    """
+
+    name = "procfs"
+
+    def __init__(self, root="/proc"):
+        self.root = root
+        self._stat_buf = bytearray(4096)
+        self._cmdline_buf = bytearray(65536)
+        self._clock_ticks = os.sysconf('SC_CLK_TCK')
+        self._page_mb = os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+        self._boot_time = self._read_boot_time()
+
+    @staticmethod
+    def available(root="/proc"):
+        return sys.platform.startswith("linux") and os.path.exists(os.path.join(root, "self", "stat"))
+
+    def _read_boot_time(self):
+        with open(os.path.join(self.root, "stat"), "rb") as f:
+            for line in f:
+                if line.startswith(b"btime"):
+                    return float(line.split()[1])
+        return psutil.boot_time()
+
+    def _read(self, path, buf):
+        """Read a whole /proc file into buf (growing it only if it does not fit) -> bytes read"""
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            n = os.readv(fd, [buf])
+            while n == len(buf):
+                # Rare: a huge cmdline - read the rest in chunks
+                chunk = os.read(fd, len(buf))
+                if not chunk:
+                    break
+                buf.extend(chunk)
+                n += len(chunk)
+            return n
+        finally:
+            os.close(fd)
+
+    def scan(self, match):
+        """Yield (match(name), RawProc) for every process whose name match() accepts"""
+        buf = self._stat_buf
+        for entry in os.listdir(self.root):
+            if not entry.isdigit():
+                continue
+            try:
+                n = self._read(f"{self.root}/{entry}/stat", buf)
+            except GONE_ERRORS:
+                perf.count("provider.processes_gone")
+                continue
+
+            data = bytes(buf[:n])
+            # comm can contain spaces and parentheses - it ends at the LAST ')'
+            rparen = data.rfind(b')')
+            name = data[data.find(b'(') + 1:rparen].decode('utf-8', 'replace')
+            target = match(name) if name else None
+            if target is None:
+                continue
+
+            # Fields after comm start at field 3 (state); see proc(5)
+            fields = data[rparen + 2:].split()
+            try:
+                utime, stime = int(fields[11]), int(fields[12])
+                threads = int(fields[17])
+                start_ticks = int(fields[19])
+                rss_pages = int(fields[21])
+            except (IndexError, ValueError):
+                perf.count("provider.parse_errors")
+                continue
+
+            yield target, RawProc(
+                pid=int(entry),
+                name=name,
+                create_time=self._boot_time + start_ticks / self._clock_ticks,
+                rss_mb=rss_pages * self._page_mb,
+                threads=threads,
+                cpu_time=(utime + stime) / self._clock_ticks,
+                handle=None,
+            )
+
+    def cmdline(self, pid):
+        """Lowercased, space-joined command line"""
+        n = self._read(f"{self.root}/{pid}/cmdline", self._cmdline_buf)
+        return bytes(self._cmdline_buf[:n]).rstrip(b'\0').replace(b'\0', b' ').decode('utf-8', 'replace').lower()
+
+    def full_memory(self, pid, create_time=None):
+        """(USS MB, PSS MB) from /proc/<pid>/smaps_rollup - the kernel sums the mappings for us"""
+        try:
+            with open(f"{self.root}/{pid}/smaps_rollup", "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            if not os.path.exists(f"{self.root}/{pid}"):
+                raise
+            # Kernel older than 4.14: psutil walks the full smaps instead
+            return super().full_memory(pid, create_time)
+        pss_kb = private_kb = 0
+        for line in data.splitlines():
+            if line.startswith(b'Pss:'):
+                pss_kb = int(line.split()[1])
+            elif line.startswith((b'Private_Clean:', b'Private_Dirty:')):
+                private_kb += int(line.split()[1])
+        return private_kb / 1024, pss_kb / 1024
+
+
+SyntheticMemInfo = namedtuple('SyntheticMemInfo', ['rss'])
+
+
+class SyntheticProcess:
+    """One fake process - mutable, owned by SyntheticProvider"""
+
+    __slots__ = ('pid', 'kind', 'name', 'create_time', 'cmdline', 'rss_mb', 'threads',
+                 'cpu_time', 'cpu_rate', 'growth_mb')
+
+    def __init__(self, pid, kind, name, create_time, cmdline, rss_mb, threads, cpu_rate, growth_mb):
+        self.pid = pid
+        self.kind = kind            # "browser", "background", "small", "tab" or "localhost"
+        self.name = name
+        self.create_time = create_time
+        self.cmdline = cmdline
+        self.rss_mb = rss_mb
+        self.threads = threads
+        self.cpu_time = 0.0
+        self.cpu_rate = cpu_rate    # CPU seconds used per wall second (1.0 = 100%)
+        self.growth_mb = growth_mb  # Memory added per scan (leaking tabs > 0)
+
+
+class SyntheticHandle:
+    """The slice of the psutil.Process API the monitor and routes use, for fake processes"""
+
+    def __init__(self, provider, pid):
+        self._provider = provider
+        self.pid = pid
+
+    def _proc(self):
+        proc = self._provider.processes.get(self.pid)
+        if proc is None:
+            raise psutil.NoSuchProcess(self.pid)
+        return proc
+
+    def name(self):
+        return self._proc().name
+
+    def create_time(self):
+        return self._proc().create_time
+
+    def cmdline(self):
+        return self._proc().cmdline.split()
+
+    def memory_info(self):
+        return SyntheticMemInfo(rss=int(self._proc().rss_mb * 1024 * 1024))
+
+    def is_running(self):
+        return self.pid in self._provider.processes
+
+    def kill(self):
+        self._provider.terminate(self.pid)
+
+    terminate = kill
+
+    def wait(self, timeout=None):
+        return None
+
+
+class SyntheticProvider(ProcessProvider):
+    """Deterministic fake process tree for tests, benchmarks and load runs.
+    Generates a browser with `renderers` tabs (some showing the localhost dashboard),
+    background helper processes and tiny renderers, with optional churn (processes
+    exiting and being replaced) and per-tab memory curves (noise plus leaking tabs).
+    Nothing here touches the real OS.
+    """
+
+    name = "synthetic"
+
+    BACKGROUND_ARGS = ['--type=gpu-process', '--type=utility', '--type=network',
+                       '--type=renderer --type=extension', '--type=crash-handler']
+
+    def __init__(self, renderers=20, background=10, localhost_tabs=1, small_renderers=2,
+                 process_name="chrome", churn=0.0, leaking_tabs=0, leak_mb=5.0,
+                 tab_mem_mb=(60.0, 600.0), noise_mb=2.0, cpu_rate=(0.0, 0.3),
+                 seed=0, start_pid=10000):
+        self.process_name = process_name
+        self.churn = churn                  # Chance per scan that a tab exits and is replaced
+        self.leak_mb = leak_mb
+        self.tab_mem_mb = tab_mem_mb
+        self.noise_mb = noise_mb
+        self.cpu_rate = cpu_rate
+        self.random = random.Random(seed)
+        self.processes = {}
+        self._next_pid = start_pid
+        self._last_scan = None
+        self._clock = 1_700_000_000.0       # Fake epoch: create times are reproducible per seed
+
+        self._spawn("browser", f"{process_name} --no-startup-window", 150.0, 30, 0.02)
+        for _ in range(background):
+            args = self.random.choice(self.BACKGROUND_ARGS)
+            self._spawn("background", f"{process_name} {args}", self.random.uniform(20.0, 200.0), 12, 0.01)
+        for _ in range(small_renderers):
+            self._spawn("small", f"{process_name} --type=renderer --renderer-client-id=0",
+                        self.random.uniform(10.0, 40.0), 8, 0.0)
+        for i in range(renderers):
+            self._spawn_tab(leaking=i < leaking_tabs)
+        for _ in range(localhost_tabs):
+            self._spawn_tab(url="http://localhost:5000/")
+
+    def _spawn(self, kind, cmdline, rss_mb, threads, cpu_rate, growth_mb=0.0):
+        pid = self._next_pid
+        self._next_pid += 1
+        self._clock += 0.01
+        self.processes[pid] = SyntheticProcess(pid, kind, self.process_name, self._clock, cmdline,
+                                               rss_mb, threads, cpu_rate, growth_mb)
+        return pid
+
+    def _spawn_tab(self, leaking=False, url=None):
+        cmdline = f"{self.process_name} --type=renderer --renderer-client-id={self._next_pid}"
+        if url:
+            cmdline += f" {url}"
+        return self._spawn("localhost" if url else "tab", cmdline, self.random.uniform(*self.tab_mem_mb),
+                           self.random.randint(10, 30), self.random.uniform(*self.cpu_rate),
+                           self.leak_mb if leaking else 0.0)
+
+    def _advance(self):
+        """Move the fake world forward one scan: CPU time, memory curves, churn"""
+        now = time.time()
+        elapsed = now - self._last_scan if self._last_scan is not None else 0.0
+        self._last_scan = now
+        rnd = self.random
+
+        for proc in list(self.processes.values()):
+            proc.cpu_time += proc.cpu_rate * elapsed
+            proc.rss_mb = max(proc.rss_mb + proc.growth_mb + rnd.uniform(-self.noise_mb, self.noise_mb), 1.0)
+            # Closed tabs are replaced by new ones, so the tab count stays put while PIDs turn over
+            if self.churn and proc.kind == "tab" and rnd.random() < self.churn:
+                del self.processes[proc.pid]
+                self._spawn_tab()
+
+    def scan(self, match):
+        self._advance()
+        for proc in list(self.processes.values()):
+            target = match(proc.name)
+            if target is None:
+                continue
+            yield target, RawProc(proc.pid, proc.name, proc.create_time, proc.rss_mb,
+                                  proc.threads, proc.cpu_time, None)
+
+    def cmdline(self, pid):
+        proc = self.processes.get(pid)
+        if proc is None:
+            raise psutil.NoSuchProcess(pid)
+        return proc.cmdline.lower()
+
+    def process(self, pid, create_time=None):
+        proc = self.processes.get(pid)
+        if proc is None or (create_time is not None and abs(proc.create_time - create_time) > 1.0):
+            return None
+        return SyntheticHandle(self, pid)
+
+    def terminate(self, pid, create_time=None, timeout=TERMINATE_TIMEOUT):
+        proc = self.processes.get(pid)
+        if proc is None or (create_time is not None and abs(proc.create_time - create_time) > 1.0):
+            return True, "already exited"
+        del self.processes[pid]
+        return True, "synthetic"
+
+    def full_memory(self, pid, create_time=None):
+        proc = self.processes.get(pid)
+        if proc is None:
+            raise psutil.NoSuchProcess(pid)
+        # Pretend a fixed share of every process is pages shared with its siblings
+        return proc.rss_mb * 0.6, proc.rss_mb * 0.8
+
+    def terminate_many(self, targets, timeout=TERMINATE_TIMEOUT):
+        return {pid: self.terminate(pid, create_time, timeout) for pid, create_time in targets}
+
+    def system_info(self):
+        return {
+            "cpu_count": os.cpu_count(),
+            "cpu_percent": round(sum(p.cpu_rate for p in self.processes.values()) * 100 / (os.cpu_count() or 1), 1),
+            "memory_percent": 0.0,
+            "processes": len(self.processes)
+        }
+
+
+def _checked_handle(pid, create_time):
+    try:
+        p = psutil.Process(pid)
+        # Different clocks round differently - a second is far below PID reuse timescales
+        if create_time is not None and abs(p.create_time() - create_time) > 1.0:
+            return None
+        return p
+    except GONE_ERRORS:
+        return None
+
+
+def get_provider(kind=None):
+    """Provider for `kind` (default PROVIDER), falling back to psutil when procfs is unusable"""
+    kind = kind or PROVIDER
+    if kind == "synthetic":
+        return SyntheticProvider()
+    if kind in ("auto", "procfs") and ProcfsProvider.available():
+        try:
+            return ProcfsProvider()
+        except (OSError, ValueError) as e:
+            log.warning("/proc provider unavailable, using psutil: %s", e)
+    return PsutilProvider()
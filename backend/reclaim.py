@@ -0,0 +1,123 @@
+import heapq
+import re
+import monitor
+from logsetup import get_logger, kv
+
+log = get_logger("reclaim")
+
+RECLAIM_MAX_KILLS = 10     # Never close more tabs than this in one reclaim, whatever the target
+POLICIES = ("heaviest", "fewest", "oldest")
+
+_SIZE_RE = re.compile(r'^\s*([0-9]*\.?[0-9]+)\s*([kmgt]?i?b?)?\s*$', re.IGNORECASE)
+_SIZE_UNITS_MB = {"": 1.0, "k": 1 / 1024, "m": 1.0, "g": 1024.0, "t": 1024.0 * 1024}
+
+
+def parse_size_mb(value):
+    """"1.5GB", "800MB", "800" or 800 -> megabytes (bare numbers are MB)"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _SIZE_RE.match(str(value))
+    if not match:
+        raise ValueError(f"Unrecognised size {value!r}, expected e.g. 800MB or 1.5GB")
+    return float(match.group(1)) * _SIZE_UNITS_MB[(match.group(2) or "")[:1].lower()]
+
+
+def candidates(snapshot):
+    """Tabs a reclaim may close - the dashboard tab and the Flask app are never candidates"""
+    return [info for info in snapshot.tabs if not info.protected]
+
+
+def _pop_until(heap, need_mb, max_kills):
+    """Pop (key, i, info) entries until need_mb is covered or max_kills reached"""
+    chosen = []
+    freed = 0.0
+    while heap and freed < need_mb and len(chosen) < max_kills:
+        info = heapq.heappop(heap)[2]
+        chosen.append(info)
+        freed += info.mem_mb
+    return chosen
+
+
+def select(tabs, need_mb, policy="heaviest", max_kills=RECLAIM_MAX_KILLS):
+    """Pick the tabs to close for need_mb under `policy` -> [ProcInfo] in close order.
+    heapify + k pops is O(n + k log n) - no full sort of every tab.
+
+    heaviest: largest tabs first
+    fewest:   same (minimal) number of kills as heaviest, but the last pick is the
+              smallest tab that still covers what is left - less collateral damage
+    oldest:   longest-running tabs first, whatever their size
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown policy {policy!r}, expected one of {POLICIES}")
+    if need_mb <= 0 or not tabs or max_kills <= 0:
+        return []
+
+    if policy == "oldest":
+        heap = [(info.create_time, i, info) for i, info in enumerate(tabs)]
+        heapq.heapify(heap)
+        return _pop_until(heap, need_mb, max_kills)
+
+    heap = [(-info.mem_mb, i, info) for i, info in enumerate(tabs)]
+    heapq.heapify(heap)
+    chosen = _pop_until(heap, need_mb, max_kills)
+    if policy == "fewest" and chosen:
+        # Every other pick is forced; swap the last for the smallest tab that still suffices
+        last = chosen[-1]
+        remaining = need_mb - (sum(info.mem_mb for info in chosen) - last.mem_mb)
+        smaller = [entry[2] for entry in heap if remaining <= entry[2].mem_mb < last.mem_mb]
+        if smaller:
+            chosen[-1] = min(smaller, key=lambda info: info.mem_mb)
+    return chosen
+
+
+def need_for_threshold(snapshot, threshold_mb):
+    """MB to free to get the group's total memory back under threshold_mb"""
+    return max(snapshot.memory - threshold_mb, 0.0)
+
+
+def reclaim(free_mb=None, policy="heaviest", group=None, max_kills=RECLAIM_MAX_KILLS, dry_run=False):
+    """Close tabs until free_mb is recovered (default: back under the group's memory threshold).
+    Returns a report with the plan, per-tab results and the memory actually recovered.
+    """
+    snapshot = monitor.take_snapshot()
+    target = monitor.get_target_group(group)
+    if target is None:
+        raise ValueError(f"Unknown group {group!r}")
+    before = snapshot.groups[target.name]
+
+    need_mb = free_mb if free_mb is not None else need_for_threshold(before, target.mem_threshold)
+    chosen = select(candidates(before), need_mb, policy, max_kills)
+    expected_mb = sum(info.mem_mb for info in chosen)
+    report = {
+        "group": target.name,
+        "policy": policy,
+        "requested_mb": round(need_mb, 2),
+        "expected_mb": round(expected_mb, 2),
+        "shortfall_mb": round(max(need_mb - expected_mb, 0.0), 2),
+        "dry_run": dry_run,
+        "memory_before": round(before.memory, 2),
+        "selected": [{"pid": info.pid, "name": info.name, "memory": round(info.mem_mb, 2),
+                      "create_time": info.create_time} for info in chosen],
+    }
+    if dry_run or not chosen:
+        report["success"] = dry_run or need_mb <= 0
+        if not report["success"]:
+            report["message"] = "No closeable tabs"
+        return report
+
+    log.info("reclaiming memory", extra=kv(group=target.name, policy=policy, requested_mb=round(need_mb, 1),
+                                           tabs=len(chosen)))
+    results = monitor.close_tabs(chosen)
+    closed = [info for info in chosen if results[info.pid][0]]
+    after = monitor.take_snapshot().groups[target.name]
+
+    report["results"] = [{"pid": pid, "success": ok, "method": method} for pid, (ok, method) in results.items()]
+    report["closed"] = len(closed)
+    report["freed_mb"] = round(sum(info.mem_mb for info in closed), 2)
+    # Measured on a fresh scan - shared pages and respawned helpers make this differ from freed_mb
+    report["memory_after"] = round(after.memory, 2)
+    report["recovered_mb"] = round(before.memory - after.memory, 2)
+    report["success"] = len(closed) == len(chosen)
+    log.info("reclaim finished", extra=kv(group=target.name, closed=len(closed), freed_mb=report["freed_mb"],
+                                          recovered_mb=report["recovered_mb"]))
+    return report
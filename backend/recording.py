@@ -0,0 +1,187 @@
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+from history import COLUMNS, HISTORY_MAX_POINTS, downsample
+from logsetup import get_logger
+
+log = get_logger("recording")
+
+RECORDING_DIR = os.environ.get("OSMONITOR_RECORDING_DIR")  # Unset = recording off
+RECORDING_MAX_BYTES = 64 * 1024 * 1024      # Rotate after this much data...
+RECORDING_MAX_AGE = 24 * 3600.0             # ...or this many seconds, whichever comes first
+RECORDING_RETENTION = 28 * 24 * 3600.0      # Delete files whose data ended longer ago than this (None = keep)
+
+MAGIC = b"OSMREC01"
+HEADER_SIZE = 256   # MAGIC + JSON layout description, zero padded - records start here
+SUFFIX = ".osr"
+
+# One fixed-width record per sample: the MetricHistory columns, ts in float64 (24 bytes)
+RECORD_DTYPE = np.dtype([('ts', '<f8')] + [(name, '<f4') for name in COLUMNS])
+
+
+def _header():
+    layout = json.dumps({"columns": list(RECORD_DTYPE.names), "dtype": RECORD_DTYPE.descr}).encode()
+    header = MAGIC + layout
+    if len(header) > HEADER_SIZE:
+        raise ValueError("Recording layout does not fit in the header")
+    return header.ljust(HEADER_SIZE, b"\0")
+
+
+class RecordingWriter:
+    """Appends samples to <directory>/metrics-<start>.osr, rotating by size and age.
+    Append-only and fixed-width: a crash loses at most the record being written,
+    and readers can map the file while it grows.
+    """
+
+    def __init__(self, directory=RECORDING_DIR, max_bytes=RECORDING_MAX_BYTES, max_age=RECORDING_MAX_AGE,
+                 retention=RECORDING_RETENTION):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.retention = retention
+        self._file = None
+        self._opened = None
+        self._size = 0
+        self._record = np.zeros(1, dtype=RECORD_DTYPE)   # Reused buffer for one record
+        os.makedirs(directory, exist_ok=True)
+
+    def append(self, ts, cpu, memory, threads, tabs):
+        """Write one sample (rotating first if the current file is full or old)"""
+        if self._file is None or self._size >= self.max_bytes or ts - self._opened >= self.max_age:
+            self._rotate(ts)
+        self._record[0] = (ts, cpu, memory, threads, tabs)
+        self._file.write(self._record.tobytes())
+        # One record per tick - let the OS have it now so readers see it
+        self._file.flush()
+        self._size += RECORD_DTYPE.itemsize
+
+    def _rotate(self, ts):
+        self.close()
+        path = os.path.join(self.directory, f"metrics-{ts:.3f}{SUFFIX}")
+        self._file = open(path, "xb")
+        self._file.write(_header())
+        self._opened = ts
+        self._size = 0
+        log.info("recording to %s", path)
+        if self.retention is not None:
+            self._expire(ts - self.retention)
+
+    def _expire(self, before):
+        """Delete files whose newest sample is older than `before`"""
+        for path, start in recording_files(self.directory)[:-1]:
+            records = open_records(path)
+            newest = float(records['ts'][-1]) if len(records) else start
+            del records
+            if newest < before:
+                os.remove(path)
+                log.info("deleted expired recording %s", path)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def recording_files(directory):
+    """[(path, start ts)] of every recording in directory, oldest first"""
+    if not directory or not os.path.isdir(directory):
+        return []
+    files = []
+    for name in os.listdir(directory):
+        if name.startswith("metrics-") and name.endswith(SUFFIX):
+            try:
+                files.append((os.path.join(directory, name), float(name[len("metrics-"):-len(SUFFIX)])))
+            except ValueError:
+                continue
+    return sorted(files, key=lambda item: item[1])
+
+
+def open_records(path):
+    """Read-only structured memmap over a recording's complete records (nothing is copied)"""
+    with open(path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+    if not header.startswith(MAGIC):
+        raise ValueError(f"{path} is not a metrics recording")
+    layout = json.loads(header[len(MAGIC):].rstrip(b"\0"))
+    dtype = np.dtype([tuple(field) for field in layout["dtype"]])
+    # A record being written right now (or cut off by a crash) is left out
+    count = (os.path.getsize(path) - HEADER_SIZE) // dtype.itemsize
+    if count <= 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=HEADER_SIZE, shape=(count,))
+
+
+class RecordingReader:
+    """Range queries over a directory of recordings - only the pages in range are read"""
+
+    def __init__(self, directory=RECORDING_DIR):
+        self.directory = directory
+
+    def window(self, since=None, until=None):
+        """Samples in [since, until] as (timestamps, values) arrays like MetricHistory.window()"""
+        files = recording_files(self.directory)
+        ts_parts, value_parts = [], []
+        for i, (path, start) in enumerate(files):
+            # The next file's start bounds this one's end - skip files entirely out of range
+            next_start = files[i + 1][1] if i + 1 < len(files) else None
+            if until is not None and start > until:
+                break
+            if since is not None and next_start is not None and next_start < since:
+                continue
+            records = open_records(path)
+            if not len(records):
+                continue
+            ts = records['ts']
+            lo = np.searchsorted(ts, since, side='left') if since is not None else 0
+            hi = np.searchsorted(ts, until, side='right') if until is not None else len(ts)
+            if hi > lo:
+                chunk = records[lo:hi]
+                ts_parts.append(np.array(chunk['ts'], dtype=np.float64))
+                value_parts.append(np.column_stack([chunk[name] for name in COLUMNS]).astype(np.float64))
+        if not ts_parts:
+            return np.empty(0), np.empty((0, len(COLUMNS)))
+        return np.concatenate(ts_parts), np.concatenate(value_parts)
+
+    def downsample(self, since=None, resolution=None, until=None, max_points=HISTORY_MAX_POINTS):
+        """Same result shape as MetricHistory.downsample(), from the recordings"""
+        ts, values = self.window(since, until)
+        return downsample(ts, values, resolution, max_points)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or export metrics recordings")
+    parser.add_argument("directory", nargs="?", default=RECORDING_DIR)
+    parser.add_argument("--since", type=float, help="unix seconds (negative = seconds ago)")
+    parser.add_argument("--until", type=float)
+    parser.add_argument("--csv", help="write the selected samples to this CSV file ('-' = stdout)")
+    args = parser.parse_args(argv)
+    if not args.directory:
+        parser.error("no directory given and OSMONITOR_RECORDING_DIR is not set")
+
+    since = time.time() + args.since if args.since is not None and args.since < 0 else args.since
+    reader = RecordingReader(args.directory)
+    if args.csv:
+        ts, values = reader.window(since, args.until)
+        out = sys.stdout if args.csv == "-" else open(args.csv, "w")
+        try:
+            np.savetxt(out, np.column_stack((ts, values)), delimiter=",", fmt="%.3f",
+                       header=",".join(("ts",) + COLUMNS), comments="")
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        return 0
+
+    for path, start in recording_files(args.directory):
+        records = open_records(path)
+        end = float(records['ts'][-1]) if len(records) else start
+        print(f"{os.path.basename(path)}  {len(records)} samples  "
+              f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start))} -> "
+              f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(end))}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
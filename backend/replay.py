@@ -0,0 +1,192 @@
+import argparse
+import itertools
+import json
+import sqlite3
+import sys
+import time
+import numpy as np
+from multiprocessing import Pool
+from detectors import Cooldowns
+from history import COLUMNS
+from monitor import PRIMARY_GROUP, TAB_COUNT_COOLDOWN, evaluate_thresholds, get_target_group
+from recording import RECORDING_DIR, RecordingReader
+
+LEAD_WINDOW = 600.0     # An alert this many seconds (or less) before an incident counts as catching it
+REPLAY_CHUNKSIZE = 4    # Parameter sets handed to a worker at a time
+
+# Per worker process, set by _init_worker()
+_trace = None           # (ts, cpu, memory, tabs) arrays
+_incidents = None       # Sorted incident times, None = no ground truth
+_lead_window = LEAD_WINDOW
+
+
+def load_trace(directory, since=None, until=None):
+    """Recorded primary-group samples -> (ts, cpu, memory, tabs) float64 arrays"""
+    ts, values = RecordingReader(directory).window(since, until)
+    return (ts,) + tuple(np.ascontiguousarray(values[:, COLUMNS.index(name)]) for name in ("cpu", "memory", "tabs"))
+
+
+def load_incidents(path=None, events_db=None, since=None, until=None):
+    """Sorted incident times: first column of a text/CSV file, and/or kill events from the event store"""
+    times = []
+    if path:
+        with open(path) as f:
+            for line in f:
+                field = line.split("#", 1)[0].split(",", 1)[0].strip()
+                if field:
+                    try:
+                        times.append(float(field))
+                    except ValueError:
+                        continue    # Header row
+    if events_db:
+        conn = sqlite3.connect(f"file:{events_db}?mode=ro", uri=True)
+        try:
+            times.extend(row[0] for row in conn.execute("SELECT ts FROM events WHERE type = 'kill'"))
+        finally:
+            conn.close()
+    incidents = np.sort(np.asarray(times, dtype=np.float64))
+    lo = np.searchsorted(incidents, since, side='left') if since is not None else 0
+    hi = np.searchsorted(incidents, until, side='right') if until is not None else len(incidents)
+    return incidents[lo:hi]
+
+
+def replay(trace, target, tab_cooldown=TAB_COUNT_COOLDOWN):
+    """Run a trace through the live threshold rules -> (alert start times, anomalous samples).
+    Samples no rule can fire on are NORMAL whatever the cooldowns say, so only the rest
+    go through evaluate_thresholds() - in order, so cooldowns behave as they did live.
+    """
+    ts, cpu, memory, tabs = trace
+    candidates = (cpu > target.cpu_threshold) & (memory > target.mem_threshold)
+    if target.tab_threshold is not None:
+        candidates |= tabs >= target.tab_threshold
+
+    cooldowns = Cooldowns()
+    anomalous = np.zeros(len(ts), dtype=bool)
+    for i in np.flatnonzero(candidates):
+        status, _ = evaluate_thresholds(target, float(cpu[i]), float(memory[i]), int(tabs[i]),
+                                        cooldowns, float(ts[i]), tab_cooldown)
+        anomalous[i] = status == "ANOMALY"
+    # The Sampler records an alert (and the dashboard offers a kill) when a group turns anomalous
+    starts = anomalous & ~np.concatenate(([False], anomalous[:-1]))
+    return ts[starts], int(anomalous.sum())
+
+
+def score(alerts, incidents, lead_window=LEAD_WINDOW):
+    """Alerts vs incidents: caught incidents with lead times, and alerts no incident followed"""
+    result = {"alerts": len(alerts)}
+    if incidents is None:
+        return result
+    # Alert is a true positive if an incident follows within the lead window
+    nxt = np.searchsorted(incidents, alerts, side='left')
+    followed = nxt < len(incidents)
+    followed[followed] = incidents[nxt[followed]] - alerts[followed] <= lead_window
+    # Incident is caught by the earliest alert in the window before it
+    first = np.searchsorted(alerts, incidents - lead_window, side='left')
+    caught = first < len(alerts)
+    caught[caught] = alerts[first[caught]] <= incidents[caught]
+    leads = incidents[caught] - alerts[first[caught]]
+
+    false_alerts = int((~followed).sum())
+    result.update({
+        "incidents": len(incidents),
+        "caught": int(caught.sum()),
+        "missed": int((~caught).sum()),
+        "false_alerts": false_alerts,
+        # Share of alerts that were false (the false discovery rate - there are no true negatives to count)
+        "false_discovery_rate": round(false_alerts / len(alerts), 4) if len(alerts) else 0.0,
+        "median_lead_s": round(float(np.median(leads)), 1) if len(leads) else None,
+        "min_lead_s": round(float(leads.min()), 1) if len(leads) else None,
+    })
+    return result
+
+
+def _init_worker(directory, since, until, incidents, lead_window):
+    global _trace, _incidents, _lead_window
+    _trace = load_trace(directory, since, until)
+    _incidents = incidents
+    _lead_window = lead_window
+
+
+def _run(params):
+    cpu, mem, tabs, cooldown = params
+    target = get_target_group(PRIMARY_GROUP)._replace(cpu_threshold=cpu, mem_threshold=mem, tab_threshold=tabs)
+    alerts, anomalous = replay(_trace, target, cooldown)
+    result = {"cpu_threshold": cpu, "mem_threshold": mem, "tab_threshold": tabs, "tab_cooldown": cooldown,
+              "anomalous_samples": anomalous}
+    result.update(score(alerts, _incidents, _lead_window))
+    return result
+
+
+def sweep(directory, grid, since=None, until=None, incidents=None, lead_window=LEAD_WINDOW, workers=None):
+    """Replay every (cpu, mem, tabs, cooldown) in grid over the recordings, in parallel"""
+    initargs = (directory, since, until, incidents, lead_window)
+    if workers == 1:
+        _init_worker(*initargs)
+        return [_run(params) for params in grid]
+    # Each worker maps the recordings itself - nothing big is pickled across
+    with Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+        return pool.map(_run, grid, chunksize=REPLAY_CHUNKSIZE)
+
+
+def _values(text, cast, allow_none=False):
+    """"400,500" -> [400.0, 500.0]; "none" disables the tab rule (allow_none) and is refused elsewhere"""
+    values = []
+    for item in text.split(","):
+        if item.strip().lower() != "none":
+            values.append(cast(item))
+        elif allow_none:
+            values.append(None)
+        else:
+            raise argparse.ArgumentTypeError(f"'none' is only allowed for --tabs (got {text!r})")
+    return values
+
+
+def main(argv=None):
+    target = get_target_group(PRIMARY_GROUP)
+    parser = argparse.ArgumentParser(description="Replay recordings through the threshold rules and sweep their parameters")
+    parser.add_argument("directory", nargs="?", default=RECORDING_DIR)
+    parser.add_argument("--since", type=float, help="unix seconds (negative = seconds ago)")
+    parser.add_argument("--until", type=float)
+    parser.add_argument("--cpu", default=str(target.cpu_threshold), help="CPU thresholds, e.g. 400,500,600")
+    parser.add_argument("--mem", default=str(target.mem_threshold), help="memory thresholds (MB)")
+    parser.add_argument("--tabs", default=str(target.tab_threshold), help="tab count thresholds ('none' = rule off)")
+    parser.add_argument("--cooldown", default=str(TAB_COUNT_COOLDOWN), help="tab count rule cooldowns (seconds)")
+    parser.add_argument("--incidents", help="file of incident times (unix seconds, first column)")
+    parser.add_argument("--events", help="event database whose kill events count as incidents")
+    parser.add_argument("--lead-window", type=float, default=LEAD_WINDOW)
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: one per CPU)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+    if not args.directory:
+        parser.error("no directory given and OSMONITOR_RECORDING_DIR is not set")
+
+    since = time.time() + args.since if args.since is not None and args.since < 0 else args.since
+    try:
+        grid = list(itertools.product(_values(args.cpu, float), _values(args.mem, float),
+                                      _values(args.tabs, int, allow_none=True), _values(args.cooldown, float)))
+    except (argparse.ArgumentTypeError, ValueError) as e:
+        parser.error(str(e))
+    incidents = None
+    if args.incidents or args.events:
+        incidents = load_incidents(args.incidents, args.events, since, args.until)
+
+    started = time.perf_counter()
+    results = sweep(args.directory, grid, since, args.until, incidents, args.lead_window, args.workers)
+    elapsed = time.perf_counter() - started
+
+    if args.json:
+        print(json.dumps({"elapsed_s": round(elapsed, 3), "results": results}, indent=2))
+        return 0
+
+    columns = ["cpu_threshold", "mem_threshold", "tab_threshold", "tab_cooldown", "alerts", "anomalous_samples"]
+    if incidents is not None:
+        columns += ["caught", "missed", "false_alerts", "false_discovery_rate", "median_lead_s"]
+    print("  ".join(columns))
+    for result in results:
+        print("  ".join(f"{str(result[name]):>{len(name)}}" for name in columns))
+    print(f"{len(results)} parameter sets in {elapsed:.1f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
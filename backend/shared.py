@@ -0,0 +1,587 @@
+import json
+import os
+import signal
+import struct
+import sys
+import threading
+import time
+import numpy as np
+import psutil
+from multiprocessing import resource_tracker, shared_memory
+from history import COLUMNS, HISTORY_CAPACITY, HISTORY_MAX_POINTS, downsample
+from logsetup import get_logger, kv, setup_logging
+from monitor import ProcInfo, Sample, Snapshot
+import perf
+
+log = get_logger("shared")
+
+SHARED_NAME = os.environ.get("OSMONITOR_SHARED")  # Segment name; unset = single-process mode
+SHARED_PAYLOAD_MAX = 8 * 1024 * 1024    # Bytes reserved for one sample's JSON document
+SHARED_POLL_INTERVAL = 0.05             # Seconds between seq checks while a reader waits
+SHARED_CHECK_INTERVAL = 1.0             # Seconds between a worker's checks that its collector is alive
+SHARED_STALE_AFTER = 5.0                # Collector heartbeat older than this = collector gone
+VIEWER_POLL_INTERVAL = 0.25             # Seconds between collector heartbeats / checks for worker activity
+READ_RETRIES = 1000                     # Torn reads retried before giving up
+
+MAGIC = b"OSMSHM02"
+LAYOUT_VERSION = 2
+
+# Layout: 128-byte header, the history ring (float64 ts column, then one float64 row of
+# COLUMNS per slot), then the latest sample as a UTF-8 JSON document (PAYLOAD_FORMAT).
+# Header fields are little endian. seq is a seqlock: odd while the collector is writing,
+# bumped to the next even number when the write is complete. Readers copy what they
+# need and keep the copy only if seq was even and unchanged across the copy.
+OFF_MAGIC = 0               # 8s
+OFF_VERSION = 8             # u32 layout version
+OFF_SEQ = 16                # u64
+OFF_PAYLOAD_LEN = 24        # u64
+OFF_HIST_NEXT = 32          # u64 ring slot the next history row goes to
+OFF_HIST_COUNT = 40         # u64 valid history rows
+OFF_HIST_CAPACITY = 48      # u64
+OFF_PAYLOAD_CAPACITY = 56   # u64
+OFF_COLLECTOR_PID = 64      # u64
+OFF_LAST_VIEWED = 72        # f64 - the only field workers write (a heartbeat, last writer wins)
+OFF_HEARTBEAT = 80          # f64 unix time the collector last showed it is alive
+OFF_SAMPLE_SEQ = 88         # u64 Sample.seq of the payload
+OFF_SAMPLE_TS = 96          # f64 snapshot timestamp of the payload
+OFF_INTERVAL = 104          # f64 sampler interval when the payload was written
+HEADER_SIZE = 128
+
+# Payload document (version 1), everything a route reads from a Sampler:
+#   {"format": 1, "sample": {seq, data, groups, system, anomalies: [[group, rule, n]],
+#    snapshot: {timestamp, group, groups: {name: {cpu, memory, threads, processes: [[ProcInfo
+#    fields except proc]]}}}}, "tabs", "tab_series": {pid: series}, "baseline", "adaptive",
+#    "viewers_active"}
+PAYLOAD_FORMAT = 1
+PROC_FIELDS = ProcInfo._fields[1:]
+
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+_F64 = struct.Struct("<d")
+
+
+def _segment_size(history_capacity, payload_capacity):
+    return HEADER_SIZE + history_capacity * 8 * (1 + len(COLUMNS)) + payload_capacity
+
+
+def _open(name, create=False, size=0):
+    shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+    if not create and sys.version_info < (3, 13):
+        # Before 3.13 every attach is tracked, and the tracker would unlink the
+        # collector's segment when this process exits
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def _check_owner(shm):
+    """Refuse a segment someone else could have written: not ours, or group/world accessible.
+    Segment names are predictable, so without this any local user could plant one.
+    """
+    fd = getattr(shm, "_fd", -1)
+    if fd < 0:
+        return      # Windows: named sections are not files in a shared directory
+    st = os.fstat(fd)
+    if st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise PermissionError(f"Shared segment {shm.name!r} is owned by uid {st.st_uid} "
+                              f"with mode {st.st_mode & 0o777:o} - refusing it")
+
+
+def _header_pid(shm):
+    if shm.size < HEADER_SIZE or bytes(shm.buf[OFF_MAGIC:OFF_MAGIC + 8]) != MAGIC:
+        return 0
+    return _U64.unpack_from(shm.buf, OFF_COLLECTOR_PID)[0]
+
+
+def collector_pid(name):
+    """Pid of the collector publishing under name (0 if there is none we may trust)"""
+    try:
+        shm = _open(name)
+    except FileNotFoundError:
+        return 0
+    try:
+        _check_owner(shm)
+        return _header_pid(shm)
+    except PermissionError:
+        return 0
+    finally:
+        shm.close()
+
+
+def _inode(shm):
+    fd = getattr(shm, "_fd", -1)
+    return os.fstat(fd).st_ino if fd >= 0 else None
+
+
+class _Segment:
+    """Typed views over the shared block (both sides use the same layout)"""
+
+    def __init__(self, shm, history_capacity, payload_capacity):
+        self.shm = shm
+        self.buf = shm.buf
+        self.inode = _inode(shm)
+        offset = HEADER_SIZE
+        self.ts = np.ndarray((history_capacity,), dtype='<f8', buffer=shm.buf, offset=offset)
+        offset += history_capacity * 8
+        self.values = np.ndarray((history_capacity, len(COLUMNS)), dtype='<f8', buffer=shm.buf, offset=offset)
+        offset += history_capacity * 8 * len(COLUMNS)
+        self.payload_offset = offset
+        self.history_capacity = history_capacity
+        self.payload_capacity = payload_capacity
+
+    def get(self, fmt, offset):
+        return fmt.unpack_from(self.buf, offset)[0]
+
+    def put(self, fmt, offset, value):
+        fmt.pack_into(self.buf, offset, value)
+
+    def release(self):
+        # numpy views hold exports of the buffer - drop them before closing
+        self.ts = self.values = self.buf = None
+        self.shm.close()
+
+
+class SharedPublisher:
+    """Collector side: owns the segment and publishes every sample the Sampler produces"""
+
+    def __init__(self, name=SHARED_NAME, history_capacity=HISTORY_CAPACITY, payload_capacity=SHARED_PAYLOAD_MAX):
+        size = _segment_size(history_capacity, payload_capacity)
+        try:
+            shm = _open(name, create=True, size=size)
+        except FileExistsError:
+            self._remove_stale(name)
+            shm = _open(name, create=True, size=size)
+        self.name = name
+        self._segment = _Segment(shm, history_capacity, payload_capacity)
+        self._seq = 0
+        self._last_history_ts = None
+        self._next = 0
+        self._count = 0
+
+        seg = self._segment
+        seg.buf[:HEADER_SIZE] = bytes(HEADER_SIZE)
+        seg.put(_U32, OFF_VERSION, LAYOUT_VERSION)
+        seg.put(_U64, OFF_HIST_CAPACITY, history_capacity)
+        seg.put(_U64, OFF_PAYLOAD_CAPACITY, payload_capacity)
+        seg.put(_U64, OFF_COLLECTOR_PID, os.getpid())
+        seg.put(_F64, OFF_LAST_VIEWED, 0.0)
+        seg.put(_F64, OFF_HEARTBEAT, time.time())
+        # Magic last: a reader that sees it sees a fully initialised header
+        seg.buf[OFF_MAGIC:OFF_MAGIC + 8] = MAGIC
+
+    @staticmethod
+    def _remove_stale(name):
+        """Unlink a segment left by a collector that died - only if it is ours and nobody publishes to it"""
+        stale = _open(name)
+        try:
+            _check_owner(stale)
+            pid = _header_pid(stale)
+            if pid and pid != os.getpid() and psutil.pid_exists(pid):
+                raise RuntimeError(f"Another collector (pid {pid}) is publishing to {name!r}")
+        finally:
+            stale.close()
+        log.info("removing stale shared segment", extra=kv(segment=name))
+        stale.unlink()
+
+    def publish(self, sampler, sample):
+        """Write one sample (plus what the routes read off the Sampler) into the segment"""
+        with perf.probe("shared.publish"):
+            try:
+                payload = json.dumps(encode_state(sampler, sample), separators=(",", ":"),
+                                     default=_json_default).encode()
+            except (TypeError, ValueError) as e:
+                perf.count("shared.encode_errors")
+                log.error("sample could not be encoded for the workers: %s", e)
+                return False
+            seg = self._segment
+            if len(payload) > seg.payload_capacity:
+                perf.count("shared.payload_too_large")
+                log.error("sample does not fit the shared segment", extra=kv(bytes=len(payload),
+                                                                            capacity=seg.payload_capacity))
+                return False
+
+            ts, values = sampler.history.tail(1)
+            new_row = len(ts) and ts[0] != self._last_history_ts
+
+            seg.put(_U64, OFF_SEQ, self._seq + 1)  # Odd: write in progress
+            start = seg.payload_offset
+            seg.buf[start:start + len(payload)] = payload
+            seg.put(_U64, OFF_PAYLOAD_LEN, len(payload))
+            seg.put(_U64, OFF_SAMPLE_SEQ, sample.seq)
+            seg.put(_F64, OFF_SAMPLE_TS, sample.snapshot.timestamp)
+            seg.put(_F64, OFF_INTERVAL, sampler.interval)
+            if new_row:
+                seg.ts[self._next] = ts[0]
+                seg.values[self._next] = values[0]
+                self._next = (self._next + 1) % seg.history_capacity
+                self._count = min(self._count + 1, seg.history_capacity)
+                seg.put(_U64, OFF_HIST_NEXT, self._next)
+                seg.put(_U64, OFF_HIST_COUNT, self._count)
+                self._last_history_ts = ts[0]
+            self._seq += 2
+            seg.put(_U64, OFF_SEQ, self._seq)       # Even: consistent again
+            self.heartbeat()
+            return True
+
+    def heartbeat(self):
+        """Tell the workers this collector is alive (quiet ticks publish nothing)"""
+        self._segment.put(_F64, OFF_HEARTBEAT, time.time())
+
+    def last_viewed(self):
+        """Latest worker heartbeat (unix time a worker served a viewer)"""
+        return self._segment.get(_F64, OFF_LAST_VIEWED)
+
+    def close(self):
+        self._segment.release()
+        try:
+            self._segment.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _json_default(value):
+    # numpy scalars from the detectors
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode_state(sampler, sample):
+    """The payload document for one sample (see PAYLOAD_FORMAT)"""
+    snapshot = sample.snapshot
+    tabs = sampler.tabs.top()
+    pids = {tab["pid"] for tab in tabs["top_memory"] + tabs["top_growth"]}
+    return {
+        "format": PAYLOAD_FORMAT,
+        "sample": {
+            "seq": sample.seq,
+            "data": sample.data,
+            "groups": sample.groups,
+            "system": sample.system,
+            "anomalies": [[group, rule, n] for (group, rule), n in sample.anomalies.items()],
+            "snapshot": {
+                "timestamp": snapshot.timestamp,
+                "group": snapshot.group,
+                "groups": {name: {
+                    "cpu": group.cpu,
+                    "memory": group.memory,
+                    "threads": group.threads,
+                    "processes": [info[1:] for info in group.processes],
+                } for name, group in snapshot.groups.items()},
+            },
+        },
+        "tabs": tabs,
+        "tab_series": {str(pid): sampler.tabs.series(pid) for pid in pids},
+        "baseline": sampler.baseline.to_dict(),
+        "adaptive": sampler.adaptive,
+        "viewers_active": sampler.viewers_active(),
+    }
+
+
+def decode_state(document):
+    """Payload document -> state dict with "sample" rebuilt as a Sample (ValueError if malformed)"""
+    if not isinstance(document, dict) or document.get("format") != PAYLOAD_FORMAT:
+        raise ValueError("unknown payload format")
+    try:
+        raw = document["sample"]
+        raw_snapshot = raw["snapshot"]
+        timestamp = float(raw_snapshot["timestamp"])
+        groups = {}
+        for name, group in raw_snapshot["groups"].items():
+            processes = tuple(ProcInfo(None, *fields) for fields in group["processes"]
+                              if len(fields) == len(PROC_FIELDS))
+            groups[name] = Snapshot(timestamp=timestamp, group=name, processes=processes,
+                                    tabs=tuple(info for info in processes if info.is_tab),
+                                    cpu=group["cpu"], memory=group["memory"], threads=group["threads"],
+                                    groups=None)
+        snapshot = groups[raw_snapshot["group"]]._replace(groups=groups)
+        sample = Sample(seq=int(raw["seq"]), snapshot=snapshot, data=raw["data"], groups=raw["groups"],
+                        system=raw["system"], anomalies={(group, rule): n for group, rule, n in raw["anomalies"]})
+        return dict(document, sample=sample)
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        raise ValueError(f"malformed payload: {e!r}") from None
+
+
+def _attach(name):
+    shm = _open(name)
+    try:
+        _check_owner(shm)
+        if shm.size < HEADER_SIZE or bytes(shm.buf[OFF_MAGIC:OFF_MAGIC + 8]) != MAGIC:
+            raise ValueError(f"Shared segment {name!r} is not initialised yet")
+        version = _U32.unpack_from(shm.buf, OFF_VERSION)[0]
+        if version != LAYOUT_VERSION:
+            raise ValueError(f"Shared segment {name!r} has layout {version}, expected {LAYOUT_VERSION}")
+        history_capacity = _U64.unpack_from(shm.buf, OFF_HIST_CAPACITY)[0]
+        payload_capacity = _U64.unpack_from(shm.buf, OFF_PAYLOAD_CAPACITY)[0]
+        if shm.size < _segment_size(history_capacity, payload_capacity):
+            raise ValueError(f"Shared segment {name!r} is smaller than its header says")
+    except Exception:
+        shm.close()
+        raise
+    return _Segment(shm, history_capacity, payload_capacity)
+
+
+def _consistent_read(segment, read):
+    """(seq, read()) for a copy taken while no write was in progress"""
+    for _ in range(READ_RETRIES):
+        before = segment.get(_U64, OFF_SEQ)
+        if before & 1:
+            time.sleep(0)
+            continue
+        result = read()
+        if segment.get(_U64, OFF_SEQ) == before:
+            return before, result
+        perf.count("shared.torn_reads")
+    raise RuntimeError("Shared segment kept changing while being read")
+
+
+class SharedHistory:
+    """Read side of the history ring - the MetricHistory query API over the segment"""
+
+    def __init__(self, segment):
+        self._segment = segment     # Callable -> the current _Segment (it changes on re-attach)
+
+    def _copy(self, seg):
+        next_slot = seg.get(_U64, OFF_HIST_NEXT)
+        count = min(seg.get(_U64, OFF_HIST_COUNT), seg.history_capacity)
+        if count < seg.history_capacity:
+            return seg.ts[:count].copy(), seg.values[:count].copy()
+        return (np.concatenate((seg.ts[next_slot:], seg.ts[:next_slot])),
+                np.concatenate((seg.values[next_slot:], seg.values[:next_slot])))
+
+    def __len__(self):
+        return self._segment().get(_U64, OFF_HIST_COUNT)
+
+    def window(self, since=None, until=None):
+        seg = self._segment()
+        _, (ts, values) = _consistent_read(seg, lambda: self._copy(seg))
+        lo = np.searchsorted(ts, since, side='left') if since is not None else 0
+        hi = np.searchsorted(ts, until, side='right') if until is not None else len(ts)
+        return ts[lo:hi], values[lo:hi]
+
+    def tail(self, n):
+        ts, values = self.window()
+        return ts[-n:], values[-n:]
+
+    def oldest(self):
+        ts, _ = self.window()
+        return float(ts[0]) if len(ts) else None
+
+    def downsample(self, since=None, resolution=None, until=None, max_points=HISTORY_MAX_POINTS):
+        ts, values = self.window(since, until)
+        return downsample(ts, values, resolution, max_points)
+
+
+class _PublishedBaseline:
+    """The collector's baseline as of the latest sample (None before the first one)"""
+
+    def __init__(self, state):
+        self._state = state
+
+    def to_dict(self):
+        state = self._state()
+        return state["baseline"] if state else None
+
+    @property
+    def cpu(self):
+        baseline = self.to_dict()
+        return baseline["cpu"] if baseline else None
+
+    @property
+    def mem(self):
+        baseline = self.to_dict()
+        return baseline["mem"] if baseline else None
+
+
+class _PublishedTabs:
+    """The collector's per-tick tab ranking (series only for the ranked tabs)"""
+
+    def __init__(self, state):
+        self._state = state
+
+    def top(self, n=None, group=None):
+        state = self._state()
+        if state is None:
+            return {"tracked": 0, "capacity": 0, "dropped": 0, "top_memory": [], "top_growth": []}
+        result = dict(state["tabs"])
+        for key in ("top_memory", "top_growth"):
+            tabs = [tab for tab in result[key] if group is None or tab["group"] == group]
+            result[key] = tabs[:n] if n else tabs
+        return result
+
+    def series(self, pid):
+        state = self._state()
+        return state["tab_series"].get(str(pid)) if state else None
+
+
+class SharedSampler:
+    """Worker side stand-in for Sampler: the same read API, backed by the collector's segment.
+    Nothing here scans processes; each worker decodes a sample once. When the collector
+    dies or is replaced, the worker re-opens the segment under the same name.
+    """
+
+    def __init__(self, name=SHARED_NAME):
+        self.name = name
+        self._segment = _attach(name)
+        self._lock = threading.Lock()
+        self._seq = None
+        self._state = None
+        self._checked = time.monotonic()
+        self._orphaned = False
+        self.history = SharedHistory(lambda: self._segment)
+        self.baseline = _PublishedBaseline(self._current)
+        self.tabs = _PublishedTabs(self._current)
+
+    @property
+    def collector_pid(self):
+        return self._segment.get(_U64, OFF_COLLECTOR_PID)
+
+    def _check_collector(self):
+        """Re-open the segment if our collector died or stopped heartbeating"""
+        now = time.monotonic()
+        if now - self._checked < SHARED_CHECK_INTERVAL:
+            return
+        self._checked = now
+        seg = self._segment
+        if psutil.pid_exists(self.collector_pid) and time.time() - seg.get(_F64, OFF_HEARTBEAT) < SHARED_STALE_AFTER:
+            self._orphaned = False
+            return
+        try:
+            fresh = _attach(self.name)
+        except (OSError, ValueError) as e:
+            fresh = None
+            error = e
+        if fresh is None or fresh.inode == seg.inode:
+            if fresh is not None:
+                fresh.release()
+                error = "no new segment"
+            if not self._orphaned:
+                log.warning("collector is gone, serving its last sample", extra=kv(segment=self.name, error=error))
+                self._orphaned = True
+            return
+        with self._lock:
+            # The old mapping is dropped, not closed - a request may still be copying from it
+            self._segment = fresh
+            self._seq = None
+            self._orphaned = False
+        perf.count("shared.reattached")
+        log.info("attached to restarted collector", extra=kv(segment=self.name, pid=self.collector_pid))
+
+    def _current(self):
+        """Latest published state (cached until the collector publishes again)"""
+        self._check_collector()
+        seg = self._segment
+        seq = seg.get(_U64, OFF_SEQ)
+        if seq == self._seq or seq == 0:
+            return self._state
+        with self._lock:
+            if seg is self._segment and seq != self._seq:
+                def read():
+                    length = min(seg.get(_U64, OFF_PAYLOAD_LEN), seg.payload_capacity)
+                    return bytes(seg.buf[seg.payload_offset:seg.payload_offset + length])
+                seq, payload = _consistent_read(seg, read)
+                try:
+                    with perf.probe("shared.decode"):
+                        self._state = decode_state(json.loads(payload))
+                except ValueError as e:
+                    perf.count("shared.bad_payload")
+                    log.error("unreadable shared sample, keeping the previous one: %s", e)
+                self._seq = seq
+            return self._state
+
+    def start(self):
+        """Collection happens in the collector process"""
+
+    def stop(self, timeout=None):
+        self._segment.release()
+
+    @property
+    def interval(self):
+        return self._segment.get(_F64, OFF_INTERVAL) if self._current() else None
+
+    @property
+    def adaptive(self):
+        state = self._current()
+        return state["adaptive"] if state else None
+
+    def latest(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        state = self._current()
+        while state is None and (deadline is None or time.monotonic() < deadline):
+            time.sleep(SHARED_POLL_INTERVAL)
+            state = self._current()
+        return state["sample"] if state else None
+
+    def wait_for_sample(self, after_seq, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            sample = self.latest(timeout=0)
+            if sample is not None and sample.seq > after_seq:
+                return sample
+            if deadline is not None and time.monotonic() >= deadline:
+                return sample
+            # Streams stay open for a long time - keep telling the collector we are watching
+            self.touch()
+            time.sleep(SHARED_POLL_INTERVAL)
+
+    def touch(self):
+        self._segment.put(_F64, OFF_LAST_VIEWED, time.time())
+
+    def add_viewer(self):
+        self.touch()
+
+    def remove_viewer(self):
+        self.touch()
+
+    def viewers_active(self):
+        state = self._current()
+        return state["viewers_active"] if state else None
+
+
+def run_collector(name=SHARED_NAME):
+    """Single collector process: sample, record, detect and publish for every worker"""
+    from events import EventStore
+    from monitor import Sampler
+    from recording import RECORDING_DIR, RecordingWriter
+
+    setup_logging()
+    publisher = SharedPublisher(name)
+    events = None
+    try:
+        events = EventStore()
+    except Exception as e:
+        log.warning("event store unavailable, events will not be kept: %s", e)
+    recorder = None
+    if RECORDING_DIR:
+        try:
+            recorder = RecordingWriter(RECORDING_DIR)
+        except OSError as e:
+            log.warning("cannot record to %s: %s", RECORDING_DIR, e)
+    sampler = Sampler(events=events, recorder=recorder, publisher=publisher)
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    sampler.start()
+    log.info("collector publishing", extra=kv(segment=name, pid=os.getpid()))
+    seen = 0.0
+    try:
+        # Workers only leave a heartbeat - turn it into viewer activity for adaptive sampling
+        while not stop.wait(VIEWER_POLL_INTERVAL):
+            publisher.heartbeat()
+            last_viewed = publisher.last_viewed()
+            if last_viewed > seen:
+                seen = last_viewed
+                sampler.touch()
+    finally:
+        sampler.stop(timeout=5)
+        if events is not None:
+            events.close()
+        publisher.close()
+        log.info("collector stopped", extra=kv(segment=name))
+
+
+if __name__ == "__main__":
+    if not SHARED_NAME:
+        sys.exit("Set OSMONITOR_SHARED to the segment name the HTTP workers should read")
+    run_collector(SHARED_NAME)
@@ -590,99 +590,168 @@ function getStatusColor(status) {
     }
 }
 
-function fetchData() {
-    fetch("/data")
-        .then(res => res.json())
-        .then(data => {
-            // Update main metrics
-            document.getElementById("cpu").innerText = data.cpu;
-            document.getElementById("memory").innerText = data.memory;
-            document.getElementById("status").innerText = data.status;
-            document.getElementById("reason").innerText = data.reason;
-            document.getElementById("timestamp").innerText = "Last updated: " + (data.timestamp || new Date().toLocaleTimeString());
-            
-            // Update process info
-            document.getElementById("processName").innerText = data.process_name || "--";
-            document.getElementById("pid").innerText = data.pid || "--";
-            document.getElementById("threads").innerText = data.threads || "--";
-
-            // Update status box styling
-            const statusBox = document.getElementById("statusBox");
-            const statusDot = document.getElementById("statusDot");
-            const statusText = document.getElementById("statusText");
-            
-            statusBox.className = "status-box " + data.status;
-            statusDot.className = "status-dot " + data.status;
-            statusText.innerText = data.status;
-            statusDot.style.borderColor = getStatusColor(data.status);
-
-            // SHOW ANOMALY ALERT AND PLAY ALARM
-            if (data.status === "ANOMALY") {
-                showAnomalyModal(data);
-            }
+function renderData(data) {
+    // Update main metrics
+    document.getElementById("cpu").innerText = data.cpu;
+    document.getElementById("memory").innerText = data.memory;
+    document.getElementById("status").innerText = data.status;
+    document.getElementById("reason").innerText = data.reason;
+    document.getElementById("timestamp").innerText = "Last updated: " + (data.timestamp || new Date().toLocaleTimeString());
+    
+    // Update process info
+    document.getElementById("processName").innerText = data.process_name || "--";
+    document.getElementById("pid").innerText = data.pid || "--";
+    document.getElementById("threads").innerText = data.threads || "--";
+
+    // Update status box styling
+    const statusBox = document.getElementById("statusBox");
+    const statusDot = document.getElementById("statusDot");
+    const statusText = document.getElementById("statusText");
+    
+    statusBox.className = "status-box " + data.status;
+    statusDot.className = "status-dot " + data.status;
+    statusText.innerText = data.status;
+    statusDot.style.borderColor = getStatusColor(data.status);
 
-            // GENERATE AND DISPLAY SECURITY THREATS based on status
-            const securityThreats = generateSecurityThreats(data);
-            displaySecurityThreats(securityThreats);
+    // SHOW ANOMALY ALERT AND PLAY ALARM
+    if (data.status === "ANOMALY") {
+        showAnomalyModal(data);
+    }
 
-            // Update trend indicators - only if we have valid data
-            if (data.status === "NORMAL" || data.status === "ANOMALY") {
-                document.getElementById("cpuTrend").innerText = getTrendIndicator(data.cpu, prevCPU);
-                document.getElementById("memTrend").innerText = getTrendIndicator(data.memory, prevMem);
-            } else {
-                document.getElementById("cpuTrend").innerText = "⏳";
-                document.getElementById("memTrend").innerText = "⏳";
-            }
+    // GENERATE AND DISPLAY SECURITY THREATS based on status
+    const securityThreats = generateSecurityThreats(data);
+    displaySecurityThreats(securityThreats);
 
-            // Store baseline CPU on first load
-            if (baselineCPU === null && data.status === "NORMAL") {
-                baselineCPU = data.cpu;
-            }
+    // Update trend indicators - only if we have valid data
+    if (data.status === "NORMAL" || data.status === "ANOMALY") {
+        document.getElementById("cpuTrend").innerText = getTrendIndicator(data.cpu, prevCPU);
+        document.getElementById("memTrend").innerText = getTrendIndicator(data.memory, prevMem);
+    } else {
+        document.getElementById("cpuTrend").innerText = "⏳";
+        document.getElementById("memTrend").innerText = "⏳";
+    }
 
-            // Update stats
-            if (baselineCPU !== null) {
-                document.getElementById("baselineCPU").innerText = baselineCPU.toFixed(2) + "%";
-                const ratio = (data.cpu / baselineCPU).toFixed(2);
-                document.getElementById("cpuRatio").innerText = ratio + "x";
-            } else {
-                document.getElementById("baselineCPU").innerText = "--";
-                document.getElementById("cpuRatio").innerText = "--";
-            }
-            
-            document.getElementById("updateTime").innerText = new Date().toLocaleTimeString();
+    // Baseline is learned on the server; fall back to the first reading if it isn't sent
+    if (data.baseline) {
+        baselineCPU = data.baseline.cpu;
+    } else if (baselineCPU === null && data.status === "NORMAL") {
+        baselineCPU = data.cpu;
+    }
 
-            // Update chart data only for valid readings
-            if (data.status === "NORMAL" || data.status === "ANOMALY") {
-                const time = new Date().toLocaleTimeString();
+    // Update stats
+    if (baselineCPU !== null) {
+        const warming = data.baseline && data.baseline.warming_up ? " (warming up)" : "";
+        document.getElementById("baselineCPU").innerText = baselineCPU.toFixed(2) + "%" + warming;
+        const ratio = (data.cpu / baselineCPU).toFixed(2);
+        document.getElementById("cpuRatio").innerText = ratio + "x";
+    } else {
+        document.getElementById("baselineCPU").innerText = "--";
+        document.getElementById("cpuRatio").innerText = "--";
+    }
+    
+    document.getElementById("updateTime").innerText = new Date().toLocaleTimeString();
 
-                if (labels.length > 20) {
-                    labels.shift();
-                    cpuData.shift();
-                    memData.shift();
-                }
+    // Update chart data only for valid readings
+    if (data.status === "NORMAL" || data.status === "ANOMALY") {
+        const time = new Date().toLocaleTimeString();
+
+        if (labels.length > 20) {
+            labels.shift();
+            cpuData.shift();
+            memData.shift();
+        }
 
-                labels.push(time);
-                cpuData.push(data.cpu);
-                memData.push(data.memory);
+        labels.push(time);
+        cpuData.push(data.cpu);
+        memData.push(data.memory);
 
-                usageChart.update();
+        usageChart.update();
 
-                // Update previous values for next comparison
-                prevCPU = data.cpu;
-                prevMem = data.memory;
+        // Update previous values for next comparison
+        prevCPU = data.cpu;
+        prevMem = data.memory;
+    }
+}
+
+function renderFetchError(err) {
+    console.error("Error fetching data:", err);
+    document.getElementById("status").innerText = "ERROR";
+    document.getElementById("reason").innerText = "Failed to fetch data from server";
+    document.getElementById("statusBox").className = "status-box ERROR";
+    document.getElementById("statusDot").className = "status-dot ERROR";
+}
+
+function fetchData() {
+    fetch("/data")
+        .then(res => res.json())
+        .then(renderData)
+        .catch(renderFetchError);
+}
+
+// Live updates: Server-Sent Events push each sample once; poll every 2 seconds while the
+// stream is down and keep trying to get it back (backing off up to 60 seconds)
+const STREAM_RETRY_MIN_MS = 2000;
+const STREAM_RETRY_MAX_MS = 60000;
+let pollTimer = null;
+let streamRetryMs = STREAM_RETRY_MIN_MS;
+
+function startPolling() {
+    if (pollTimer !== null) return;
+    fetchData();
+    pollTimer = setInterval(fetchData, 2000);
+}
+
+function stopPolling() {
+    if (pollTimer === null) return;
+    clearInterval(pollTimer);
+    pollTimer = null;
+}
+
+function startStream() {
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+    const source = new EventSource("/stream");
+    source.onopen = function() {
+        streamRetryMs = STREAM_RETRY_MIN_MS;
+        stopPolling();
+    };
+    source.onmessage = function(event) {
+        renderData(JSON.parse(event.data));
+    };
+    source.onerror = function() {
+        startPolling();
+        // CONNECTING: the browser is already reconnecting on its own
+        if (source.readyState !== EventSource.CLOSED) return;
+        // CLOSED (e.g. an error response): the browser gave up, so retry ourselves
+        console.warn(`Live stream unavailable, polling and retrying in ${streamRetryMs / 1000}s`);
+        source.close();
+        setTimeout(startStream, streamRetryMs);
+        streamRetryMs = Math.min(streamRetryMs * 2, STREAM_RETRY_MAX_MS);
+    };
+}
+
+// Seed the chart from server-side history so a reload doesn't start empty
+function loadHistory() {
+    return fetch("/history?since=-60&resolution=2")
+        .then(res => res.json())
+        .then(history => {
+            if (!history.t) return;
+            const start = Math.max(history.t.length - 20, 0);
+            for (let i = start; i < history.t.length; i++) {
+                labels.push(new Date(history.t[i] * 1000).toLocaleTimeString());
+                cpuData.push(history.cpu.mean[i]);
+                memData.push(history.memory.mean[i]);
             }
+            usageChart.update();
         })
-        .catch(err => {
-            console.error("Error fetching data:", err);
-            document.getElementById("status").innerText = "ERROR";
-            document.getElementById("reason").innerText = "Failed to fetch data from server";
-            document.getElementById("statusBox").className = "status-box ERROR";
-            document.getElementById("statusDot").className = "status-dot ERROR";
-        });
+        .catch(err => console.error("Error fetching history:", err));
 }
 
-// Fetch data on page load and then every 2 seconds
+// Load history, show current data right away, then follow the live stream
 document.addEventListener("DOMContentLoaded", function() {
+    loadHistory();
     fetchData();
-    setInterval(fetchData, 2000);
+    startStream();
 });
@@ -34,11 +34,61 @@ function setupInteractivity() {
 }
 
 function loadAnalytics() {
-    // This function can be extended to fetch actual security data
-    console.log('📊 Security Monitoring Dashboard Loaded');
-    console.log('🛡️ Threat Categories: 6');
-    console.log('⚡ Quick Reference: Available');
-    console.log('💡 Best Practices: Loaded');
+    // Anomaly and closed-tab history recorded by the monitor (/events)
+    document.getElementById('eventType').addEventListener('change', () => loadEvents(true));
+    document.getElementById('eventRange').addEventListener('change', () => loadEvents(true));
+    document.getElementById('loadMoreEvents').addEventListener('click', () => loadEvents(false));
+    loadEvents(true);
+}
+
+let eventsCursor = null;
+
+async function loadEvents(reset) {
+    const body = document.getElementById('eventsBody');
+    const more = document.getElementById('loadMoreEvents');
+    const params = new URLSearchParams({ limit: 50 });
+    const type = document.getElementById('eventType').value;
+    const since = document.getElementById('eventRange').value;
+    if (type) params.set('type', type);
+    if (since) params.set('since', since);
+    if (!reset && eventsCursor !== null) params.set('cursor', eventsCursor);
+
+    try {
+        const response = await fetch(`/events?${params}`);
+        const data = await response.json();
+        if (!response.ok) throw new Error(data.error || `HTTP ${response.status}`);
+
+        if (reset) body.innerHTML = '';
+        data.events.forEach(event => body.appendChild(renderEventRow(event)));
+        if (reset && data.events.length === 0) {
+            body.innerHTML = '<tr><td colspan="6">No events recorded yet</td></tr>';
+        }
+        eventsCursor = data.next_cursor;
+        more.style.display = eventsCursor === null ? 'none' : 'block';
+    } catch (err) {
+        console.error('Error loading events:', err);
+        body.innerHTML = `<tr><td colspan="6">Could not load events: ${escapeHtml(err.message)}</td></tr>`;
+        more.style.display = 'none';
+    }
+}
+
+function renderEventRow(event) {
+    const row = document.createElement('tr');
+    const severity = event.type === 'kill' ? 'severity-medium' : 'severity-high';
+    row.innerHTML = `
+        <td>${new Date(event.ts * 1000).toLocaleString()}</td>
+        <td><span class="${severity}">${escapeHtml(event.type.toUpperCase())}</span></td>
+        <td>${escapeHtml(event.group || '-')}</td>
+        <td>${event.pid ?? '-'}</td>
+        <td>${escapeHtml(event.rule || '-')}</td>
+        <td>${escapeHtml(event.message || '')}</td>`;
+    return row;
+}
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = String(text);
+    return div.innerHTML;
 }
 
 // Make category cards expandable with enhanced visuals
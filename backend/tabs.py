@@ -0,0 +1,163 @@
+import threading
+import numpy as np
+
+TAB_HISTORY_TABS = 1000     # Tabs tracked at once; more are counted but not recorded
+TAB_HISTORY_LENGTH = 300    # Samples kept per tab (10 minutes at the 2s interval)
+TAB_GROWTH_WINDOW = 60      # Latest samples the growth slope is fitted over
+TAB_GROWTH_MIN_SAMPLES = 5  # Tabs younger than this have no growth rate yet
+TAB_TOP_N = 10              # Size of the rankings recomputed on every update
+
+
+class TabHistory:
+    """Per-tab memory/CPU series in one fixed (tabs x samples) matrix per metric.
+    Every tab shares the same column per tick; a tab gets a row when it first shows up
+    and gives it back when it exits, so memory is fixed however many tabs come and go.
+    """
+
+    def __init__(self, capacity=TAB_HISTORY_TABS, length=TAB_HISTORY_LENGTH, top_n=TAB_TOP_N):
+        self.capacity = capacity
+        self.length = length
+        self.top_n = top_n
+        self._ts = np.full(length, np.nan)
+        self._mem = np.full((capacity, length), np.nan, dtype=np.float32)
+        self._cpu = np.full((capacity, length), np.nan, dtype=np.float32)
+        self._rows = {}                         # (pid, create_time) -> row
+        self._meta = {}                         # row -> ProcInfo of the latest sample
+        self._free = list(range(capacity - 1, -1, -1))
+        self._next = 0                          # Column the next tick is written to
+        self._count = 0
+        self._dropped = 0                       # Tabs seen on the last tick that had no free row
+        self._top = {"memory": [], "growth": []}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def update(self, timestamp, tabs):
+        """Record one tick for every tab (ProcInfo) currently open; forget the ones that closed"""
+        with self._lock:
+            col = self._next
+            self._ts[col] = timestamp
+            self._mem[:, col] = np.nan
+            self._cpu[:, col] = np.nan
+
+            seen = {}
+            dropped = 0
+            for info in tabs:
+                key = (info.pid, info.create_time)
+                row = self._rows.get(key)
+                if row is None:
+                    if not self._free:
+                        dropped += 1
+                        continue
+                    row = self._free.pop()
+                    self._rows[key] = row
+                    self._mem[row] = np.nan
+                    self._cpu[row] = np.nan
+                seen[key] = row
+                self._meta[row] = info
+
+            # Evict exited tabs - their rows are reused by the next new ones
+            for key in [key for key in self._rows if key not in seen]:
+                row = self._rows.pop(key)
+                del self._meta[row]
+                self._free.append(row)
+
+            if seen:
+                rows = np.fromiter(seen.values(), dtype=np.intp, count=len(seen))
+                self._mem[rows, col] = [self._meta[row].mem_mb for row in rows]
+                self._cpu[rows, col] = [self._meta[row].cpu for row in rows]
+
+            self._next = (col + 1) % self.length
+            self._count = min(self._count + 1, self.length)
+            self._dropped = dropped
+            self._top = self._rank(self.top_n)
+
+    def _order(self):
+        """Column indices oldest first"""
+        if self._count < self.length:
+            return np.arange(self._count)
+        return (self._next + np.arange(self.length)) % self.length
+
+    def _growth(self, rows):
+        """Least-squares memory slope (MB/min) per row over the growth window, NaN if too young"""
+        cols = self._order()[-TAB_GROWTH_WINDOW:]
+        y = self._mem[np.ix_(rows, cols)].astype(np.float64)
+        t = (self._ts[cols] - self._ts[cols[-1]]) / 60.0 if len(cols) else np.empty(0)
+        mask = ~np.isnan(y)
+        n = mask.sum(axis=1)
+        y = np.where(mask, y, 0.0)
+        tm = np.where(mask, t[None, :], 0.0)
+        st, sy = tm.sum(axis=1), y.sum(axis=1)
+        stt, sty = (tm * tm).sum(axis=1), (tm * y).sum(axis=1)
+        denom = n * stt - st * st
+        slope = np.where(denom > 0, (n * sty - st * sy) / np.where(denom > 0, denom, 1.0), np.nan)
+        return np.where(n >= TAB_GROWTH_MIN_SAMPLES, slope, np.nan)
+
+    def _rank(self, n, group=None):
+        """Top n tabs by current memory and by growth rate (argpartition, no full sort)"""
+        rows = np.array([row for row, info in self._meta.items() if group is None or info.group == group],
+                        dtype=np.intp)
+        if not len(rows) or not self._count:
+            return {"memory": [], "growth": []}
+        col = (self._next - 1) % self.length
+        memory = self._mem[rows, col].astype(np.float64)
+        growth = self._growth(rows)
+        return {
+            "memory": [self._entry(rows[i], memory[i], growth[i]) for i in _top(memory, n)],
+            "growth": [self._entry(rows[i], memory[i], growth[i]) for i in _top(growth, n)],
+        }
+
+    def _entry(self, row, memory, growth):
+        info = self._meta[row]
+        return {
+            "pid": info.pid,
+            "group": info.group,
+            "name": info.name,
+            "create_time": info.create_time,
+            "type": "dashboard" if info.protected else "tab",
+            "memory": round(float(memory), 2),
+            "cpu": round(float(info.cpu), 2),
+            "growth_mb_per_min": None if np.isnan(growth) else round(float(growth), 2),
+            "samples": int(np.count_nonzero(~np.isnan(self._mem[row]))),
+        }
+
+    def top(self, n=None, group=None):
+        """Rankings for /tabs - the per-tick cached one unless a different n/group is asked for"""
+        with self._lock:
+            if (n is None or n == self.top_n) and group is None:
+                ranking = self._top
+            else:
+                ranking = self._rank(n or self.top_n, group)
+            return {
+                "tracked": len(self._rows),
+                "capacity": self.capacity,
+                "dropped": self._dropped,
+                "top_memory": ranking["memory"],
+                "top_growth": ranking["growth"],
+            }
+
+    def series(self, pid):
+        """Oldest-first {t, memory, cpu} for the tracked tab with this pid (None if untracked)"""
+        with self._lock:
+            row = next((row for key, row in self._rows.items() if key[0] == pid), None)
+            if row is None:
+                return None
+            cols = self._order()
+            mem = self._mem[row, cols].astype(np.float64)
+            cpu = self._cpu[row, cols].astype(np.float64)
+            present = ~np.isnan(mem)
+            return {
+                "pid": pid,
+                "t": self._ts[cols][present].tolist(),
+                "memory": np.round(mem[present], 2).tolist(),
+                "cpu": np.round(cpu[present], 2).tolist(),
+            }
+
+
+def _top(values, n):
+    """Indices of the n largest non-NaN values, largest first"""
+    valid = np.flatnonzero(~np.isnan(values))
+    if len(valid) > n:
+        valid = valid[np.argpartition(values[valid], -n)[-n:]]
+    return valid[np.argsort(values[valid])[::-1]]
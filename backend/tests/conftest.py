@@ -0,0 +1,23 @@
+import os
+import sys
+import pytest
+
+# The backend modules import each other as top-level modules (run from backend/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def use_provider():
+    """Point the monitor at a provider for one test: use_provider(SyntheticProvider(...))"""
+    import monitor
+
+    original = monitor._provider
+    monitor.anomaly_cooldowns.reset()
+
+    def use(provider):
+        monitor.set_provider(provider)
+        return provider
+
+    yield use
+    monitor.set_provider(original)
+    monitor.anomaly_cooldowns.reset()
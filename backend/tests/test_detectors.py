@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from detectors import (DEFAULT_RULES, DetectorSet, EwmaRule, RateOfChangeRule, ThresholdRule, ZScoreRule)
+from history import COLUMNS
+
+MEMORY = COLUMNS.index("memory")
+
+
+def _series(memory, step=2.0):
+    """(ts, values) with the given memory column and everything else flat"""
+    memory = np.asarray(memory, dtype=np.float64)
+    ts = 1000.0 + step * np.arange(len(memory))
+    values = np.zeros((len(memory), len(COLUMNS)))
+    values[:, MEMORY] = memory
+    return ts, values
+
+
+def _fired(rule, memory, step=2.0):
+    return [alert.rule for alert in DetectorSet([rule]).evaluate(*_series(memory, step))]
+
+
+def test_threshold_rule():
+    rule = ThresholdRule("high", "memory", 500.0)
+    assert _fired(rule, [400.0, 501.0]) == ["high"]
+    assert _fired(rule, [600.0, 500.0]) == []
+
+
+def test_zscore_rule_fires_on_a_spike_only():
+    rule = ZScoreRule("spike", "memory", window=10, z=4.0, min_std=5.0)
+    flat = [1000.0 + (i % 2) for i in range(9)]
+    assert _fired(rule, flat + [1001.0]) == []
+    assert _fired(rule, flat + [1100.0]) == ["spike"]
+    # Drops are not spikes
+    assert _fired(rule, flat + [900.0]) == []
+
+
+def test_zscore_min_std_keeps_a_flat_series_quiet():
+    rule = ZScoreRule("spike", "memory", window=10, z=4.0, min_std=20.0)
+    assert _fired(rule, [1000.0] * 9 + [1050.0]) == []
+
+
+def test_ewma_rule_fires_on_a_jump_from_the_trend():
+    rule = EwmaRule("drift", "memory", alpha=0.2, window=20, k=4.0, min_std=5.0)
+    flat = [1000.0 + (i % 3) for i in range(19)]
+    assert _fired(rule, flat + [1002.0]) == []
+    assert _fired(rule, flat + [1200.0]) == ["drift"]
+
+
+def test_rate_of_change_rule_catches_a_slow_climb():
+    rule = RateOfChangeRule("leak", "memory", window=30, max_rate=50.0)
+    # 2 MB per 2s sample = 60 MB/min, never a spike
+    assert _fired(rule, [1000.0 + 2.0 * i for i in range(30)]) == ["leak"]
+    assert _fired(rule, [1000.0 + 1.0 * i for i in range(30)]) == []
+
+
+def test_rules_need_their_window_before_firing():
+    rule = RateOfChangeRule("leak", "memory", window=30, max_rate=50.0)
+    assert _fired(rule, [1000.0 + 10.0 * i for i in range(29)]) == []
+
+
+def test_cooldown_is_per_rule():
+    detectors = DetectorSet([ThresholdRule("a", "memory", 500.0, cooldown=60.0),
+                             ThresholdRule("b", "memory", 500.0, cooldown=0.0)])
+    ts, values = _series([600.0])
+    assert [alert.rule for alert in detectors.evaluate(ts, values, now=0.0)] == ["a", "b"]
+    assert [alert.rule for alert in detectors.evaluate(ts, values, now=30.0)] == ["b"]
+    assert [alert.rule for alert in detectors.evaluate(ts, values, now=60.0)] == ["a", "b"]
+
+
+def test_alert_fields():
+    alert, = DetectorSet([ThresholdRule("high", "memory", 500.0)]).evaluate(*_series([750.0]))
+    assert (alert.column, alert.value, alert.score) == ("memory", 750.0, 1.5)
+    assert alert.reason == "MEMORY 750.0 above 500.0"
+
+
+def test_default_rules_are_quiet_on_steady_usage():
+    rng = np.random.default_rng(0)
+    memory = 2000.0 + rng.normal(0.0, 5.0, 300)
+    ts, values = _series(memory)
+    values[:, COLUMNS.index("cpu")] = 50.0 + rng.normal(0.0, 2.0, 300)
+    detectors = DetectorSet(DEFAULT_RULES)
+    assert all(detectors.evaluate(ts[:i], values[:i]) == [] for i in range(1, 301))
+
+
+def test_bad_configuration_is_refused():
+    with pytest.raises(ValueError):
+        ThresholdRule("x", "disk", 1.0)
+    with pytest.raises(ValueError):
+        DetectorSet([ThresholdRule("x", "cpu", 1.0), ThresholdRule("x", "memory", 1.0)])
@@ -0,0 +1,125 @@
+import json
+import zlib
+import pytest
+import fleet
+from fleet import FleetStore, decode_body, encode_batch
+
+
+def _record(seq, memory=1000.0, status="NORMAL"):
+    return {
+        "seq": seq,
+        "ts": 1000.0 + 2 * seq,
+        "interval": 2.0,
+        "groups": {
+            "chrome": {"cpu": 50.0, "memory": memory, "threads": 100, "process_count": 4,
+                       "status": status, "reason": None},
+            "java": {"cpu": 1.0, "memory": 200.0, "threads": 30, "process_count": 1,
+                     "status": "NORMAL", "reason": None},
+        },
+        "tabs": [[101, "chrome", "chrome", memory / 4, 10.0, 0.0]],
+        "anomalies": {},
+    }
+
+
+def _upload(records, host="ws-1", agent="agent-a"):
+    """What FleetAgent sends, through what the collector decodes"""
+    body = json.dumps({"host": host, "agent": agent, "records": encode_batch(records)}).encode()
+    return decode_body(zlib.compress(body), "deflate")
+
+
+def test_round_trip_rebuilds_every_record():
+    records = [_record(1), _record(2), _record(3, memory=4000.0, status="ANOMALY"), _record(4)]
+    records[3]["groups"].pop("java")
+    store = FleetStore(history_length=16)
+
+    assert store.ingest(_upload(records)) == 4
+    host = store.host("ws-1")
+    assert host.state == records[-1]
+    assert host.last_seq == 4
+    ts, values = host.history.window()
+    assert list(ts) == [record["ts"] for record in records]
+    assert [(a["host"], a["group"]) for a in store.anomalies()] == [("ws-1", "chrome")]
+
+
+def test_deltas_only_carry_changes():
+    encoded = encode_batch([_record(1), _record(2), _record(3, memory=1500.0)])
+    assert encoded[0]["full"]
+    assert encoded[1] == {"seq": 2, "ts": 1004.0}
+    assert encoded[2]["groups"] == {"chrome": {"memory": 1500.0}}
+
+
+def test_resent_samples_are_skipped_by_seq():
+    store = FleetStore(history_length=16)
+    assert store.ingest(_upload([_record(1), _record(2), _record(3)])) == 3
+    # The response to the first upload was lost: the agent resends with newer samples appended
+    assert store.ingest(_upload([_record(2), _record(3), _record(4), _record(5)])) == 2
+    assert store.ingest(_upload([_record(5)])) == 0
+    host = store.host("ws-1")
+    assert host.last_seq == 5
+    assert len(host.history) == 5
+
+
+def test_agent_restart_starts_seq_over():
+    store = FleetStore(history_length=16)
+    store.ingest(_upload([_record(seq) for seq in range(1, 11)]))
+    restarted = [_record(1, memory=700.0), _record(2, memory=710.0)]
+    assert store.ingest(_upload(restarted, agent="agent-b")) == 2
+    host = store.host("ws-1")
+    assert host.agent_id == "agent-b"
+    assert host.last_seq == 2
+    assert host.state["groups"]["chrome"]["memory"] == 710.0
+
+
+def test_bad_uploads_are_rejected():
+    with pytest.raises(ValueError):
+        decode_body(b"not deflate", "deflate")
+    with pytest.raises(ValueError):
+        decode_body(json.dumps({"host": "ws-1"}).encode())
+    with pytest.raises(ValueError):
+        FleetStore().ingest({"host": "ws-1", "records": [{"seq": 1, "ts": 1.0}]})
+
+
+def test_ingest_route_checks_token_and_worker_mode(monkeypatch):
+    import app
+
+    client = app.app.test_client()
+    body = zlib.compress(json.dumps({"host": "ws-9", "agent": "a", "records": encode_batch([_record(1)])}).encode())
+    headers = {"Content-Encoding": "deflate", "X-Fleet-Token": "wrong"}
+    monkeypatch.setattr(fleet, "FLEET_TOKEN", "secret")
+    assert client.post("/fleet/ingest", data=body, headers=headers).status_code == 403
+    headers["X-Fleet-Token"] = "secret"
+    assert client.post("/fleet/ingest", data=body, headers=headers).get_json() == {"accepted": 1}
+
+    monkeypatch.setattr(app, "SHARED_NAME", "osmonitor")
+    assert client.post("/fleet/ingest", data=body, headers=headers).status_code == 503
+    assert client.get("/fleet/data").status_code == 503
+
+
+def test_one_bad_record_rejects_the_whole_batch():
+    store = FleetStore(history_length=16)
+    store.ingest(_upload([_record(1)]))
+    wrong_type = _record(3)
+    wrong_type["groups"]["chrome"]["memory"] = "lots"
+    with pytest.raises(ValueError):
+        store.ingest(_upload([_record(2), wrong_type, _record(4)]))
+    missing = _record(2)
+    del missing["groups"]["java"]["status"]
+    with pytest.raises(ValueError):
+        store.ingest(_upload([missing]))
+    with pytest.raises(ValueError):
+        store.ingest(_upload([missing], host="ws-new"))
+    host = store.host("ws-1")
+    assert host.last_seq == 1
+    assert len(host.history) == 1
+    assert store.host("ws-new") is None
+
+
+def test_bad_record_is_a_400():
+    import app
+
+    broken = _record(1)
+    del broken["groups"]["chrome"]["reason"]
+    body = zlib.compress(json.dumps({"host": "ws-8", "agent": "a", "records": encode_batch([broken])}).encode())
+    response = app.app.test_client().post("/fleet/ingest", data=body, headers={"Content-Encoding": "deflate"})
+    assert response.status_code == 400
+    assert app.fleet_store.host("ws-8") is None
@@ -0,0 +1,72 @@
+import numpy as np
+from history import COLUMNS, HISTORY_MIN_RESOLUTION, MetricHistory, downsample
+
+
+def _filled(capacity, n, start=1000.0, step=2.0):
+    history = MetricHistory(capacity)
+    for i in range(n):
+        history.append(start + i * step, cpu=i, memory=100 + i, threads=10, tabs=i % 3)
+    return history
+
+
+def test_window_before_the_ring_is_full():
+    history = _filled(8, 5)
+    ts, values = history.window()
+    assert len(history) == 5
+    assert list(ts) == [1000.0, 1002.0, 1004.0, 1006.0, 1008.0]
+    assert list(values[:, COLUMNS.index("cpu")]) == [0, 1, 2, 3, 4]
+    assert history.oldest() == 1000.0
+
+
+def test_ring_wraps_and_keeps_the_newest():
+    history = _filled(8, 19)
+    ts, values = history.window()
+    assert len(history) == 8
+    assert list(ts) == [1000.0 + 2 * i for i in range(11, 19)]
+    assert list(values[:, COLUMNS.index("memory")]) == [100 + i for i in range(11, 19)]
+    assert history.oldest() == 1022.0
+
+    ts, values = history.tail(3)
+    assert list(ts) == [1032.0, 1034.0, 1036.0]
+    assert list(values[:, COLUMNS.index("cpu")]) == [16, 17, 18]
+
+
+def test_window_bounds_are_inclusive():
+    history = _filled(8, 19)
+    ts, _ = history.window(since=1026.0, until=1030.0)
+    assert list(ts) == [1026.0, 1028.0, 1030.0]
+    assert len(history.window(since=2000.0)[0]) == 0
+
+
+def test_downsample_buckets_min_max_mean():
+    ts = np.array([10.0, 11.0, 12.0, 13.0, 14.0, 15.0])
+    values = np.zeros((6, len(COLUMNS)))
+    values[:, COLUMNS.index("cpu")] = [1, 3, 5, 7, 9, 11]
+    result = downsample(ts, values, resolution=4.0)
+
+    assert result["resolution"] == 4.0
+    assert result["t"] == [8.0, 12.0]  # Aligned to multiples of the resolution
+    assert result["count"] == 2
+    assert result["cpu"] == {"min": [1.0, 5.0], "max": [3.0, 11.0], "mean": [2.0, 8.0]}
+
+
+def test_downsample_never_exceeds_max_points():
+    history = _filled(1000, 1000, step=1.0)
+    result = history.downsample(resolution=1.0, max_points=50)
+    assert result["count"] <= 51
+    assert result["resolution"] >= 999 / 50
+
+
+def test_downsample_of_nothing():
+    result = MetricHistory(4).downsample()
+    assert result["count"] == 0 and result["t"] == [] and result["memory"]["mean"] == []
+
+
+def test_default_resolution_is_never_finer_than_the_sampler():
+    # 20 samples a second apart: span / max_points would be 0.038s buckets
+    result = _filled(64, 20, step=1.0).downsample()
+    assert result["resolution"] == HISTORY_MIN_RESOLUTION
+    assert _filled(4, 1).downsample()["resolution"] == HISTORY_MIN_RESOLUTION
+    # Long histories still follow max_points; an explicit resolution is taken as asked
+    assert _filled(1000, 1000, step=1.0).downsample(max_points=50)["resolution"] == 999 / 50
+    assert _filled(64, 20, step=0.1).downsample(resolution=0.2)["resolution"] == 0.2
@@ -0,0 +1,28 @@
+import logging
+from logsetup import RateLimitFilter, kv
+
+
+def _record(msg, level=logging.WARNING, **fields):
+    record = logging.LogRecord("osmonitor.monitor", level, __file__, 1, msg, None, None)
+    record.__dict__.update(kv(**fields))
+    return record
+
+
+def test_repeats_are_suppressed_and_counted():
+    limit = RateLimitFilter(window=60)
+    assert limit.filter(_record("anomaly detected", group="chrome", reason="CPU"))
+    assert not limit.filter(_record("anomaly detected", group="chrome", reason="Memory"))
+    assert limit.filter(_record("anomaly detected", level=logging.DEBUG, group="chrome"))
+    limit.window = 0
+    record = _record("anomaly detected", group="chrome")
+    assert limit.filter(record)
+    assert record.suppressed == 1
+
+
+def test_other_groups_are_not_repeats():
+    limit = RateLimitFilter(window=60)
+    assert limit.filter(_record("anomaly detected", group="chrome"))
+    assert limit.filter(_record("anomaly detected", group="firefox"))
+    assert limit.filter(_record("statistical anomaly detected", group="chrome", rules="cpu_spike"))
+    assert limit.filter(_record("statistical anomaly detected", group="java", rules="cpu_spike"))
+    assert not limit.filter(_record("statistical anomaly detected", group="java", rules="cpu_spike"))
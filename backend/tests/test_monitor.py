@@ -0,0 +1,193 @@
+import os
+import subprocess
+import sys
+import pytest
+import monitor
+from detectors import DetectorSet, ThresholdRule, ZScoreRule
+from monitor import Sampler, get_visible_tab_count, take_snapshot
+from providers import SyntheticProcess, SyntheticProvider
+
+
+def _browser(**kwargs):
+    options = dict(renderers=5, background=4, localhost_tabs=1, small_renderers=2,
+                   tab_mem_mb=(100.0, 200.0), noise_mb=0.0, seed=7)
+    options.update(kwargs)
+    return SyntheticProvider(**options)
+
+
+def _pids(provider, kind):
+    return {proc.pid for proc in provider.processes.values() if proc.kind == kind}
+
+
+def test_snapshot_classifies_tabs(use_provider):
+    provider = use_provider(_browser())
+    snapshot = take_snapshot()
+
+    assert snapshot.group == "chrome"
+    assert {info.pid for info in snapshot.processes} == set(provider.processes)
+    # Real tabs and the dashboard tab; never background helpers or tiny renderers
+    assert {info.pid for info in snapshot.tabs} == _pids(provider, "tab") | _pids(provider, "localhost")
+    assert {info.pid for info in snapshot.processes if info.protected} == _pids(provider, "localhost")
+    assert get_visible_tab_count(snapshot) == 5
+    assert snapshot.memory == sum(info.rss_mb for info in snapshot.processes)
+    assert not snapshot.groups["firefox"].processes
+
+
+def test_tick_flags_too_many_tabs(use_provider):
+    use_provider(_browser(renderers=8))
+    sample = Sampler(detectors=DetectorSet([])).tick()
+
+    assert sample.data["status"] == "ANOMALY"
+    assert sample.data["reason"].startswith("HIGH TAB COUNT: 8 VISIBLE tabs")
+    assert sample.anomalies == {("chrome", "threshold"): 1}
+    assert sample.groups["java"]["status"] == "NORMAL"
+
+
+def test_tick_is_normal_below_thresholds(use_provider):
+    use_provider(_browser(renderers=3))
+    sampler = Sampler(detectors=DetectorSet([]))
+    for _ in range(3):
+        sample = sampler.tick()
+
+    assert sample.seq == 3
+    assert sample.data["status"] == "NORMAL"
+    assert sample.data["process_count"] == 3
+    assert "alerts" not in sample.data
+    assert len(sampler.history) == 3
+    assert sampler.baseline.count == 3
+
+
+def test_detector_alerts_reach_the_sample(use_provider):
+    provider = use_provider(_browser(renderers=3))
+    rules = [ZScoreRule("memory_spike", "memory", window=5, z=4.0, min_std=20.0, cooldown=0.0),
+             ThresholdRule("memory_high", "memory", 100000.0)]
+    sampler = Sampler(detectors=DetectorSet(rules))
+    for _ in range(5):
+        assert sampler.tick().data["status"] == "NORMAL"
+
+    # One new 2GB tab on a flat history
+    provider.tab_mem_mb = (2000.0, 2000.0)
+    heavy = provider._spawn_tab()
+    sample = sampler.tick()
+
+    assert [alert["rule"] for alert in sample.data["alerts"]] == ["memory_spike"]
+    assert sample.data["status"] == "ANOMALY"
+    assert sample.anomalies[("chrome", "memory_spike")] == 1
+    assert sampler.tabs.top()["top_memory"][0]["pid"] == heavy
+
+
+def test_tab_ranking_labels_the_dashboard_and_finds_the_leak(use_provider):
+    provider = use_provider(_browser(leaking_tabs=1, leak_mb=50.0))
+    sampler = Sampler(detectors=DetectorSet([]))
+    for _ in range(6):  # Growth needs TAB_GROWTH_MIN_SAMPLES
+        sampler.tick()
+
+    top = sampler.tabs.top()
+    ranked = {tab["pid"]: tab for tab in top["top_memory"]}
+    assert set(ranked) == _pids(provider, "tab") | _pids(provider, "localhost")
+    assert {pid for pid, tab in ranked.items() if tab["type"] == "dashboard"} == _pids(provider, "localhost")
+    leaking = min(_pids(provider, "tab"))   # leaking_tabs are spawned first
+    assert top["top_growth"][0]["pid"] == leaking
+
+
+def test_classification_is_cached_per_process(use_provider, monkeypatch):
+    provider = use_provider(_browser())
+    take_snapshot()
+    reads = []
+    original = provider.cmdline
+    monkeypatch.setattr(provider, "cmdline", lambda pid: reads.append(pid) or original(pid))
+
+    take_snapshot()
+    assert reads == []
+    assert set(monitor._classification_cache) == {(proc.pid, proc.create_time) for proc in provider.processes.values()}
+
+
+def test_reused_pid_is_classified_again(use_provider):
+    provider = use_provider(_browser())
+    tab = min(_pids(provider, "tab"))
+    take_snapshot()
+
+    # The tab exits and its PID comes back as a GPU helper
+    old = provider.processes[tab]
+    provider.processes[tab] = SyntheticProcess(tab, "background", old.name, old.create_time + 60.0,
+                                               "chrome --type=gpu-process", 300.0, 10, 0.0, 0.0)
+    snapshot = take_snapshot()
+
+    assert tab in {info.pid for info in snapshot.processes}
+    assert tab not in {info.pid for info in snapshot.tabs}
+    assert (tab, old.create_time) not in monitor._classification_cache
+
+
+def test_exited_processes_leave_the_cache(use_provider):
+    provider = use_provider(_browser())
+    take_snapshot()
+    gone = sorted(_pids(provider, "tab"))[:2]
+    for pid in gone:
+        provider.terminate(pid)
+    take_snapshot()
+
+    assert not {pid for pid, _ in monitor._classification_cache} & set(gone)
+    assert len(monitor._classification_cache) == len(provider.processes)
+
+
+@pytest.mark.parametrize("name, group", [
+    ("chrome", "chrome"),
+    ("Google Chrome Helper (Renderer)", "chrome"),
+    ("chrome.exe", "chrome"),
+    ("firefox-bin", "firefox"),
+    ("Web Content", "firefox"),
+    ("Isolated Web Co", "firefox"),    # procfs comm, cut to 15 characters
+    ("WebExtensions", "firefox"),
+    ("Slack Helper", "electron"),
+    ("ms-teams.exe", "electron"),
+    ("javaw.exe", "java"),
+    ("steamservice", None),
+    ("teamspeak3", None),
+    ("javascriptcore", None),
+    ("chromium", None),
+])
+def test_groups_match_whole_words(name, group):
+    matched = monitor.match_target_group(name)
+    assert (matched.name if matched else None) == group
+
+
+def test_firefox_content_processes_are_its_tabs(use_provider):
+    provider = use_provider(SyntheticProvider(renderers=0, background=0, localhost_tabs=0, small_renderers=0,
+                                              process_name="firefox", noise_mb=0.0))
+    content = "firefox -contentproc -childid {} -isforbrowser -prefslen 31000 -appdir /usr/lib/firefox/browser {} true tab"
+    for child, name in enumerate(["Web Content", "Isolated Web Co", "Isolated Web Co"], start=1):
+        pid = provider._spawn("tab", content.format(child, 4000), 300.0, 20, 0.0)
+        provider.processes[pid].name = name
+    extensions = provider._spawn("background", "firefox -contentproc -childid 9 -isforbrowser 4000 true extension",
+                                 120.0, 20, 0.0)
+    provider.processes[extensions].name = "WebExtensions"
+
+    snapshot = take_snapshot().groups["firefox"]
+    assert len(snapshot.processes) == 5
+    assert {info.name for info in snapshot.tabs} == {"Web Content", "Isolated Web Co"}
+    assert get_visible_tab_count(snapshot) == 3
+
+
+@pytest.mark.parametrize("mode, share", [("uss", 0.6), ("pss", 0.8)])
+def test_aggregation_uses_the_memory_mode(use_provider, mode, share):
+    use_provider(_browser())
+    monitor.set_memory_mode(mode)
+    try:
+        snapshot = take_snapshot()
+    finally:
+        monitor.set_memory_mode("rss")
+
+    assert snapshot.memory == pytest.approx(share * sum(info.rss_mb for info in snapshot.processes))
+    assert all(info.mem_mb == pytest.approx(share * info.rss_mb) for info in snapshot.processes)
+    assert monitor.get_memory_attribution()["mode"] == "rss"
+    with pytest.raises(ValueError):
+        monitor.set_memory_mode("vss")
+
+
+@pytest.mark.parametrize("value, mode", [("PSS", "pss"), ("vss", "rss")])
+def test_memory_mode_from_environment(value, mode):
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", "import monitor; print(monitor.MEMORY_MODE, monitor._attribution is None)"],
+                            cwd=backend, env=dict(os.environ, OSMONITOR_MEMORY_MODE=value),
+                            capture_output=True, text=True, timeout=60, check=True)
+    assert result.stdout.split() == [mode, str(mode == "rss")]
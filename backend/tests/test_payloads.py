@@ -0,0 +1,103 @@
+import json
+import threading
+import time
+import pytest
+import app
+from detectors import DetectorSet
+from monitor import Sampler
+from providers import SyntheticProvider
+
+
+@pytest.fixture
+def provider(use_provider):
+    return use_provider(SyntheticProvider(renderers=4, seed=5))
+
+
+@pytest.fixture
+def sampler(provider, monkeypatch):
+    sampler = Sampler(detectors=DetectorSet([]))
+    sampler.tick()
+    monkeypatch.setattr(app, "sampler", sampler)
+    monkeypatch.setattr(app, "initialized", True)
+    monkeypatch.setattr(app, "data_payloads", app.PayloadCache(app.build_data, app.app.json.dumps))
+    return sampler
+
+
+def test_etag_and_not_modified(sampler):
+    client = app.app.test_client()
+    first = client.get("/data")
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "no-cache"
+    etag = first.headers["ETag"]
+
+    assert client.get("/data", headers={"If-None-Match": etag}).status_code == 304
+    sampler.tick()
+    fresh = client.get("/data", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["ETag"] != etag
+    assert client.get("/data?group=firefox").headers.get("ETag") is None    # Errors are not cached
+
+
+def test_since_seq_delta(sampler, provider):
+    client = app.app.test_client()
+    base = client.get("/data").get_json()
+    closed = min(pid for pid, proc in provider.processes.items() if proc.kind == "tab")
+    provider.terminate(closed)
+    sampler.tick()
+
+    delta = client.get("/data?since_seq=1").get_json()
+    latest = client.get("/data").get_json()
+    assert (delta["seq"], delta["since_seq"], delta["full"]) == (2, 1, False)
+    assert str(closed) in delta["tabs"]["closed"]
+    assert delta["removed"] == []
+    # Base document plus the delta is the latest document
+    assert dict(base, **delta["changed"]) == latest
+
+    unknown = client.get("/data?since_seq=999").get_json()
+    assert unknown["full"] and unknown["changed"] == latest
+
+
+def test_stream_frame_is_built_once_per_sample(sampler):
+    sample = sampler.latest()
+    payload = app.data_payloads.get(sample, "chrome")
+    frame = app.data_payloads.frame(payload, "chrome")
+    assert app.data_payloads.frame(app.data_payloads.get(sample, "chrome"), "chrome") is frame
+
+    head, data = frame.decode().rstrip("\n").split("\n")
+    assert head == f"id: {sample.seq}"
+    assert "note" not in json.loads(data[len("data: "):])
+
+
+def test_no_sample_yet_is_a_503(provider, monkeypatch):
+    monkeypatch.setattr(app, "sampler", Sampler(detectors=DetectorSet([])))   # Never ticked
+    monkeypatch.setattr(app, "initialized", True)
+    monkeypatch.setattr(app, "FIRST_SAMPLE_TIMEOUT", 0.01)
+    client = app.app.test_client()
+    assert client.get("/data").status_code == 503
+    assert client.get("/groups").status_code == 503
+    assert client.get("/system").status_code == 503
+
+
+def test_concurrent_first_requests_initialize_once(monkeypatch):
+    started = []
+    barrier = threading.Barrier(8)
+
+    def slow_initialize():
+        started.append(threading.get_ident())
+        time.sleep(0.05)
+        monkeypatch.setattr(app, "initialized", True)
+        return True
+
+    monkeypatch.setattr(app, "initialized", False)
+    monkeypatch.setattr(app, "_initialize", slow_initialize)
+
+    def request():
+        barrier.wait()
+        app.initialize()
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert len(started) == 1
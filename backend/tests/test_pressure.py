@@ -0,0 +1,100 @@
+import pytest
+from types import SimpleNamespace
+from pressure import PressureGate, find_cgroup, read_psi
+
+QUIET_PSI = "some avg10=0.00 avg60=0.00 avg300=0.00 total=0\nfull avg10=0.00 avg60=0.00 avg300=0.00 total=0\n"
+
+
+@pytest.fixture
+def host(tmp_path):
+    """Fake /proc/pressure, /proc/<pid>/cgroup and a cgroup v2 tree"""
+    psi = tmp_path / "pressure"
+    psi.mkdir()
+    for resource in ("memory", "cpu"):
+        (psi / resource).write_text(QUIET_PSI)
+    cgroups = tmp_path / "cgroup"
+
+    def cgroup(path, current=100, limit="max", events=0):
+        directory = cgroups / path
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / "memory.current").write_text(f"{current}\n")
+        (directory / "memory.max").write_text(f"{limit}\n")
+        (directory / "memory.events").write_text(f"low 0\nhigh 0\nmax {events}\noom 0\noom_kill 0\n")
+        return str(directory)
+
+    def process(pid, path):
+        directory = tmp_path / "proc" / str(pid)
+        directory.mkdir(parents=True)
+        (directory / "cgroup").write_text(f"0::/{path}\n")
+
+    def psi_memory(avg10):
+        (psi / "memory").write_text(f"some avg10={avg10:.2f} avg60=0.00 avg300=0.00 total=0\n")
+
+    def gate(**kwargs):
+        return PressureGate(psi_root=str(psi), cgroup_root=str(cgroups), proc_root=str(tmp_path / "proc"),
+                            **kwargs)
+
+    return SimpleNamespace(cgroup=cgroup, process=process, psi_memory=psi_memory, gate=gate, cgroups=str(cgroups))
+
+
+def test_read_psi(host, tmp_path):
+    host.psi_memory(7.5)
+    assert read_psi("memory", str(tmp_path / "pressure")) == {"some": 7.5}
+    assert read_psi("io", str(tmp_path / "pressure")) is None
+
+
+def test_find_cgroup_walks_up_to_memory_accounting(host, tmp_path):
+    browser = host.cgroup("user.slice/app-chrome.scope")
+    host.process(4242, "user.slice/app-chrome.scope")
+    host.process(4243, "user.slice/app-chrome.scope/renderers")
+    proc_root = str(tmp_path / "proc")
+    assert find_cgroup(4242, host.cgroups, proc_root) == browser
+    assert find_cgroup(4243, host.cgroups, proc_root) == browser
+    assert find_cgroup(9999, host.cgroups, proc_root) is None
+
+
+def test_gate_follows_the_browser_cgroup(host):
+    host.cgroup("user.slice/app-monitor.scope", current=10)
+    browser = host.cgroup("user.slice/app-chrome.scope", current=900, limit=1000)
+    host.process(4242, "user.slice/app-chrome.scope")
+    gate = host.gate()
+    assert gate.cgroup is None
+    assert gate.read().get("cgroup_usage") is None
+
+    gate.watch(4242)
+    assert gate.cgroup == browser
+    assert gate.read()["cgroup_usage"] == 0.9
+    assert gate.should_scan(0.0)                     # First scan
+    assert gate.should_scan(1.0)                     # Browser cgroup near its limit
+    assert gate.reason == "cgroup near limit"
+
+    gate.watch(None)                                 # Browser closed: system-wide PSI only
+    assert gate.cgroup is None
+    assert not gate.should_scan(2.0)
+
+
+def test_explicit_cgroup_wins(host):
+    pinned = host.cgroup("system.slice/pinned.service")
+    host.cgroup("user.slice/app-chrome.scope")
+    host.process(4242, "user.slice/app-chrome.scope")
+    gate = host.gate(cgroup=pinned)
+    gate.watch(4242)
+    assert gate.cgroup == pinned
+
+
+def test_gate_scans_on_pressure_and_limit_events(host):
+    host.cgroup("app-chrome.scope")
+    host.process(4242, "app-chrome.scope")
+    gate = host.gate(full_scan_interval=30.0)
+    gate.watch(4242)
+    assert gate.should_scan(0.0) and gate.reason == "interval"
+    assert not gate.should_scan(5.0)
+
+    host.cgroup("app-chrome.scope", events=1)
+    assert gate.should_scan(6.0) and gate.reason == "cgroup limit hit"
+    assert not gate.should_scan(7.0)
+
+    host.psi_memory(12.0)
+    assert gate.should_scan(8.0) and gate.reason == "memory pressure"
+    host.psi_memory(0.0)
+    assert gate.should_scan(40.0) and gate.reason == "interval"
@@ -0,0 +1,72 @@
+import os
+import sys
+import pytest
+from providers import ProcfsProvider
+
+if not sys.platform.startswith("linux"):
+    pytest.skip("procfs is Linux only", allow_module_level=True)
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+PAGE_MB = os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+def _stat(pid, comm, utime=0, stime=0, threads=1, start=0, rss=0):
+    # pid (comm) state ppid pgrp session tty tpgid flags minflt cminflt majflt cmajflt
+    # utime stime cutime cstime priority nice num_threads itrealvalue starttime vsize rss ...
+    return (f"{pid} ({comm}) S 1 1 1 0 -1 4194560 100 0 0 0 {utime} {stime} 0 0 20 0 {threads} 0 "
+            f"{start} 123456789 {rss} 18446744073709551615 0 0 0 0 0 0 0 0 0 0 0 17 3 0 0 0 0 0\n")
+
+
+@pytest.fixture
+def proc_root(tmp_path):
+    (tmp_path / "stat").write_text("cpu  1 2 3 4\nbtime 1700000000\nprocesses 5\n")
+
+    def add(pid, stat, cmdline=b""):
+        directory = tmp_path / str(pid)
+        directory.mkdir()
+        (directory / "stat").write_text(stat)
+        (directory / "cmdline").write_bytes(cmdline)
+
+    add.root = str(tmp_path)
+    return add
+
+
+def _scan(root):
+    return {raw.pid: (group, raw) for group, raw in ProcfsProvider(root).scan(
+        lambda name: "browser" if "chrome" in name else None)}
+
+
+def test_stat_fields(proc_root):
+    proc_root(42, _stat(42, "chrome", utime=250, stime=50, threads=17, start=1000, rss=25600),
+              b"/opt/chrome\0--type=renderer\0")
+    group, raw = _scan(proc_root.root)[42]
+
+    assert group == "browser"
+    assert raw.name == "chrome"
+    assert raw.threads == 17
+    assert raw.cpu_time == pytest.approx(300 / CLOCK_TICKS)
+    assert raw.create_time == pytest.approx(1700000000 + 1000 / CLOCK_TICKS)
+    assert raw.rss_mb == pytest.approx(25600 * PAGE_MB)
+    assert raw.handle is None
+
+
+def test_comm_with_spaces_and_parentheses(proc_root):
+    proc_root(7, _stat(7, "chrome (x) y)", threads=3))
+    _, raw = _scan(proc_root.root)[7]
+    assert raw.name == "chrome (x) y)"
+    assert raw.threads == 3
+
+
+def test_unmatched_broken_and_vanished_processes_are_skipped(proc_root):
+    proc_root(1, _stat(1, "systemd"))
+    proc_root(2, "2 (chrome) S 1 1\n")     # Truncated
+    proc_root(3, _stat(3, "chrome"))
+    os.remove(os.path.join(proc_root.root, "3", "stat"))    # Exited between listdir and open
+    proc_root(4, _stat(4, "chrome"))
+    os.mkdir(os.path.join(proc_root.root, "self"))
+    assert set(_scan(proc_root.root)) == {4}
+
+
+def test_cmdline_is_joined_and_lowered(proc_root):
+    proc_root(9, _stat(9, "chrome"), b"/opt/Chrome\0--type=renderer\0http://LOCALHOST:5000/\0")
+    assert ProcfsProvider(proc_root.root).cmdline(9) == "/opt/chrome --type=renderer http://localhost:5000/"
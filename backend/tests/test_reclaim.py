@@ -0,0 +1,90 @@
+import pytest
+import monitor
+import reclaim
+from monitor import ProcInfo
+from providers import SyntheticProvider
+
+
+def _tab(pid, mem_mb, create_time=0.0, protected=False):
+    return ProcInfo(None, pid, "chrome", "chrome", create_time, 0.0, mem_mb, mem_mb, 10, True, protected)
+
+
+TABS = [_tab(1, 900.0, create_time=30.0), _tab(2, 500.0, create_time=10.0), _tab(3, 300.0, create_time=40.0),
+        _tab(4, 250.0, create_time=20.0), _tab(5, 100.0, create_time=50.0)]
+
+
+def _pids(tabs):
+    return [info.pid for info in tabs]
+
+
+@pytest.mark.parametrize("text, mb", [("800", 800.0), ("800MB", 800.0), ("1.5GB", 1536.0), ("1.5 GiB", 1536.0),
+                                      ("512k", 0.5), (256, 256.0)])
+def test_parse_size(text, mb):
+    assert reclaim.parse_size_mb(text) == mb
+
+
+def test_parse_size_rejects_nonsense():
+    with pytest.raises(ValueError):
+        reclaim.parse_size_mb("lots")
+
+
+def test_heaviest_closes_the_largest_first():
+    assert _pids(reclaim.select(TABS, 1000.0, "heaviest")) == [1, 2]
+
+
+def test_fewest_swaps_the_last_pick_for_the_smallest_that_suffices():
+    # 900 leaves 100 to free: tab 5 (100MB) covers it instead of tab 2 (500MB)
+    assert _pids(reclaim.select(TABS, 1000.0, "fewest")) == [1, 5]
+    assert _pids(reclaim.select(TABS, 1200.0, "fewest")) == [1, 3]
+
+
+def test_oldest_ignores_size():
+    assert _pids(reclaim.select(TABS, 600.0, "oldest")) == [2, 4]
+
+
+def test_selection_limits():
+    assert _pids(reclaim.select(TABS, 10000.0, "heaviest", max_kills=2)) == [1, 2]
+    assert reclaim.select(TABS, 0.0) == []
+    with pytest.raises(ValueError):
+        reclaim.select(TABS, 100.0, "random")
+
+
+def test_protected_tabs_are_never_candidates():
+    snapshot = monitor.Snapshot(0.0, "chrome", (), tuple(TABS) + (_tab(6, 5000.0, protected=True),),
+                                0.0, 0.0, 0, None)
+    assert 6 not in _pids(reclaim.select(reclaim.candidates(snapshot), 10000.0))
+
+
+def test_reclaim_closes_selected_tabs(use_provider):
+    provider = use_provider(SyntheticProvider(renderers=6, localhost_tabs=1, tab_mem_mb=(400.0, 800.0),
+                                              noise_mb=0.0, seed=3))
+    dashboard = next(proc.pid for proc in provider.processes.values() if proc.kind == "localhost")
+    heaviest = max((proc for proc in provider.processes.values() if proc.kind == "tab"), key=lambda proc: proc.rss_mb)
+
+    plan = reclaim.reclaim(free_mb=1.0, dry_run=True)
+    assert [tab["pid"] for tab in plan["selected"]] == [heaviest.pid]
+    assert heaviest.pid in provider.processes
+
+    report = reclaim.reclaim(free_mb=1500.0, policy="heaviest")
+    closed = [result["pid"] for result in report["results"]]
+    assert report["success"] and report["closed"] == len(closed) >= 2
+    assert heaviest.pid in closed and dashboard not in closed
+    assert not set(closed) & set(provider.processes)
+    assert report["recovered_mb"] == pytest.approx(report["freed_mb"], abs=0.1)
+
+
+def test_reclaim_defaults_to_the_memory_threshold(use_provider):
+    use_provider(SyntheticProvider(renderers=4, tab_mem_mb=(100.0, 200.0), noise_mb=0.0))
+    report = reclaim.reclaim(dry_run=True)
+    assert report["requested_mb"] == 0.0 and report["selected"] == []
+
+
+def test_reclaim_route_rejects_bad_fields(monkeypatch):
+    import app
+
+    monkeypatch.setattr(app, "initialized", True)
+    client = app.app.test_client()
+    for body in ({"max_kills": None}, {"max_kills": "two"}, {"free": [1]}, {"free": "lots"}):
+        response = client.post("/reclaim", json=body)
+        assert response.status_code == 400, body
+        assert response.get_json()["success"] is False
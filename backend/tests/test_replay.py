@@ -0,0 +1,85 @@
+import itertools
+import numpy as np
+import pytest
+import replay
+from detectors import Cooldowns
+from monitor import PRIMARY_GROUP, evaluate_thresholds, get_target_group
+from recording import RecordingWriter
+
+START = 1_700_000_000.0
+
+
+@pytest.fixture(scope="module")
+def recordings(tmp_path_factory):
+    """Two hours at 2s with CPU/memory bursts and a wandering tab count"""
+    directory = str(tmp_path_factory.mktemp("recordings"))
+    rng = np.random.default_rng(11)
+    writer = RecordingWriter(directory, retention=None)
+    for i in range(3600):
+        burst = (i // 300) % 4 == 3
+        cpu = rng.uniform(450.0, 800.0) if burst else rng.uniform(20.0, 300.0)
+        memory = rng.uniform(2500.0, 4000.0) if burst else rng.uniform(800.0, 2000.0)
+        writer.append(START + 2.0 * i, cpu, memory, 400, int(rng.integers(0, 12)))
+    writer.close()
+    return directory
+
+
+def _sequential(trace, target, tab_cooldown):
+    """Every sample through the live rules, one by one - what replay() must reproduce"""
+    cooldowns = Cooldowns()
+    anomalous = [evaluate_thresholds(target, float(cpu), float(memory), int(tabs), cooldowns, float(ts),
+                                     tab_cooldown)[0] == "ANOMALY" for ts, cpu, memory, tabs in zip(*trace)]
+    starts = [ts for ts, now, before in zip(trace[0], anomalous, [False] + anomalous[:-1]) if now and not before]
+    return starts, sum(anomalous)
+
+
+@pytest.mark.parametrize("cpu, mem, tabs, cooldown", [(500.0, 3000.0, 8, 30.0), (600.0, 3500.0, None, 30.0),
+                                                      (400.0, 2000.0, 10, 120.0)])
+def test_replay_matches_the_live_rules(recordings, cpu, mem, tabs, cooldown):
+    trace = replay.load_trace(recordings)
+    target = get_target_group(PRIMARY_GROUP)._replace(cpu_threshold=cpu, mem_threshold=mem, tab_threshold=tabs)
+    alerts, anomalous = replay.replay(trace, target, cooldown)
+    starts, expected = _sequential(trace, target, cooldown)
+    assert list(alerts) == starts
+    assert anomalous == expected
+
+
+def test_parallel_sweep_equals_sequential(recordings):
+    grid = list(itertools.product([450.0, 600.0], [2500.0, 3500.0], [8, None], [30.0]))
+    incidents = np.array([START + 600.0 * k + 590.0 for k in range(12)])
+    parallel = replay.sweep(recordings, grid, incidents=incidents, workers=2)
+    sequential = replay.sweep(recordings, grid, incidents=incidents, workers=1)
+    assert parallel == sequential
+    assert [result["cpu_threshold"] for result in parallel] == [params[0] for params in grid]
+
+
+def test_since_until_select_a_window(recordings):
+    ts, cpu, memory, tabs = replay.load_trace(recordings, since=START + 100.0, until=START + 200.0)
+    assert ts[0] == START + 100.0 and ts[-1] == START + 200.0
+    assert len(ts) == len(cpu) == len(memory) == len(tabs) == 51
+
+
+def test_score():
+    alerts = np.array([100.0, 500.0, 2000.0])
+    incidents = np.array([400.0, 1000.0, 5000.0])
+    result = replay.score(alerts, incidents, lead_window=600.0)
+    # 100 -> 400 and 500 -> 1000 are caught; 2000 is followed by nothing in time; 5000 is missed
+    assert (result["caught"], result["missed"], result["false_alerts"]) == (2, 1, 1)
+    assert result["min_lead_s"] == 300.0
+    assert result["false_discovery_rate"] == round(1 / 3, 4)
+    assert replay.score(alerts, None) == {"alerts": 3}
+
+
+def test_none_is_only_for_tabs(recordings):
+    assert replay._values("6,none", int, allow_none=True) == [6, None]
+    for flag in ("--cpu", "--mem", "--cooldown"):
+        with pytest.raises(SystemExit) as exit:
+            replay.main([recordings, flag, "400,none", "--workers", "1"])
+        assert exit.value.code == 2
+
+
+def test_incidents_file(tmp_path):
+    path = tmp_path / "incidents.csv"
+    path.write_text("ts,note\n300,oom\n# comment\n100.5,kill\n")
+    assert list(replay.load_incidents(str(path))) == [100.5, 300.0]
+    assert list(replay.load_incidents(str(path), since=200.0)) == [300.0]
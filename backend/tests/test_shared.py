@@ -0,0 +1,138 @@
+import itertools
+import multiprocessing
+import os
+import pytest
+from multiprocessing import shared_memory
+import shared
+from shared import (OFF_COLLECTOR_PID, OFF_SEQ, SharedPublisher, SharedSampler, _U64,
+                    _attach, _consistent_read, collector_pid)
+
+HISTORY = 64
+PAYLOAD = 1024 * 1024
+
+_names = itertools.count()
+
+
+@pytest.fixture
+def name():
+    name = f"osm_test_{os.getpid()}_{next(_names)}"
+    yield name
+    try:
+        leftover = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    leftover.close()
+    leftover.unlink()
+
+
+def _collect(name, ticks, ready, stop):
+    """Child process: a collector over a synthetic process tree"""
+    import monitor
+    from providers import SyntheticProvider
+
+    monitor.set_provider(SyntheticProvider(seed=1))
+    publisher = SharedPublisher(name, history_capacity=HISTORY, payload_capacity=PAYLOAD)
+    sampler = monitor.Sampler(publisher=publisher)
+    for _ in range(ticks):
+        sample = sampler.tick()
+    ready.put((os.getpid(), sample.seq, sample.snapshot.timestamp))
+    stop.wait(30)
+    publisher.close()
+
+
+def _start(name, ticks=3):
+    context = multiprocessing.get_context("fork")
+    ready, stop = context.Queue(), context.Event()
+    process = context.Process(target=_collect, args=(name, ticks, ready, stop))
+    process.start()
+    pid, seq, timestamp = ready.get(timeout=30)
+    return process, stop, pid, seq, timestamp
+
+
+def test_publish_in_one_process_read_in_another(name):
+    process, stop, pid, seq, timestamp = _start(name)
+    try:
+        assert collector_pid(name) == pid
+        sampler = SharedSampler(name)
+        sample = sampler.latest(timeout=5)
+        assert sample.seq == seq
+        assert sample.snapshot.timestamp == timestamp
+        assert sample.snapshot.processes and sample.snapshot.processes[0].proc is None
+        assert set(sample.snapshot.groups) == set(sample.groups)
+        assert all(info.is_tab for info in sample.snapshot.tabs)
+        assert sample.data["status"] in ("NORMAL", "ANOMALY")
+        assert len(sampler.history) == 3
+        assert sampler.interval > 0
+        assert "top_memory" in sampler.tabs.top()
+        sampler.stop()
+    finally:
+        stop.set()
+        process.join(10)
+
+
+def test_torn_read_is_retried(name):
+    publisher = SharedPublisher(name, history_capacity=HISTORY, payload_capacity=PAYLOAD)
+    segment = publisher._segment
+    calls = []
+
+    def read():
+        calls.append(segment.get(_U64, OFF_SEQ))
+        if len(calls) == 1:
+            # A write starts and completes while this copy is taken
+            segment.put(_U64, OFF_SEQ, calls[0] + 2)
+        return len(calls)
+
+    assert _consistent_read(segment, read) == (2, 2)
+    assert calls == [0, 2]
+    publisher.close()
+
+
+def test_write_in_progress_is_never_returned(name, monkeypatch):
+    monkeypatch.setattr(shared, "READ_RETRIES", 5)
+    publisher = SharedPublisher(name, history_capacity=HISTORY, payload_capacity=PAYLOAD)
+    publisher._segment.put(_U64, OFF_SEQ, 1)
+    with pytest.raises(RuntimeError):
+        _consistent_read(publisher._segment, lambda: pytest.fail("read during a write"))
+    publisher.close()
+
+
+def test_worker_reattaches_after_collector_restart(name, monkeypatch):
+    monkeypatch.setattr(shared, "SHARED_CHECK_INTERVAL", 0.0)
+    first, _, first_pid, _, _ = _start(name)
+    sampler = SharedSampler(name)
+    assert sampler.latest(timeout=5) is not None
+    # Crash: no clean shutdown, the worker still maps the dead collector's segment
+    first.kill()
+    first.join(10)
+
+    second, stop, second_pid, seq, timestamp = _start(name, ticks=2)
+    try:
+        sample = sampler.latest(timeout=5)
+        assert sampler.collector_pid == second_pid != first_pid
+        assert (sample.seq, sample.snapshot.timestamp) == (seq, timestamp)
+        assert len(sampler.history) == 2
+    finally:
+        stop.set()
+        second.join(10)
+
+
+def test_segment_others_can_write_is_refused(name):
+    planted = shared_memory.SharedMemory(name=name, create=True, size=4096)
+    os.fchmod(planted._fd, 0o666)
+    try:
+        with pytest.raises(PermissionError):
+            _attach(name)
+        with pytest.raises(PermissionError):
+            SharedPublisher(name, history_capacity=HISTORY, payload_capacity=PAYLOAD)
+        assert collector_pid(name) == 0
+    finally:
+        planted.close()
+
+
+def test_live_collector_is_not_replaced(name):
+    publisher = SharedPublisher(name, history_capacity=HISTORY, payload_capacity=PAYLOAD)
+    # Pretend another running process published it
+    publisher._segment.put(_U64, OFF_COLLECTOR_PID, os.getppid())
+    with pytest.raises(RuntimeError):
+        SharedPublisher(name, history_capacity=HISTORY, payload_capacity=PAYLOAD)
+    publisher.close()